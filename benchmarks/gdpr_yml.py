@@ -0,0 +1,178 @@
+"""
+Time the phases of generating gdpr.yml (load, introspect, pattern matching, merge
+and save) and the gdpr.I001 system check for synthetic apps with many models.
+
+The models are created in an isolated app registry, the project's own models
+and gdpr.yml are left alone.
+
+Usage: python -m benchmarks.gdpr_yml [--apps N] [--models N] [--fields N]
+       [--patterns N] [--repeat N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import types
+
+from unittest import mock
+
+import django
+
+from django.apps import AppConfig
+from django.apps.registry import Apps
+from django.db import models
+from django.test.utils import override_settings
+
+FIELD_TYPES = [
+    models.CharField,
+    models.TextField,
+    models.EmailField,
+    models.IntegerField,
+    models.DateField,
+]
+
+
+def create_apps(app_count, models_per_app, fields_per_model):
+    """
+    Return an isolated app registry with app_count apps of models_per_app models
+    with fields_per_model fields each (and a foreign key to the previous model).
+    """
+    app_configs = []
+    for app_index in range(app_count):
+        label = f"bench_app_{app_index}"
+        config_class = type(
+            f"BenchApp{app_index}Config",
+            (AppConfig,),
+            {"label": label, "path": tempfile.gettempdir()},
+        )
+        app_configs.append(config_class(label, types.ModuleType(label)))
+
+    registry = Apps(installed_apps=app_configs)
+    for app_config in app_configs:
+        previous_model = None
+        for model_index in range(models_per_app):
+            attrs = {
+                "__module__": app_config.name,
+                "Meta": type(
+                    "Meta", (), {"app_label": app_config.label, "apps": registry}
+                ),
+            }
+            for field_index in range(fields_per_model):
+                field_type = FIELD_TYPES[field_index % len(FIELD_TYPES)]
+                attrs[f"field_{field_index}"] = (
+                    field_type(max_length=100)
+                    if field_type is models.CharField
+                    else field_type()
+                )
+            if previous_model is not None:
+                attrs["previous"] = models.ForeignKey(
+                    previous_model, on_delete=models.CASCADE
+                )
+            previous_model = type(f"Model{model_index}", (models.Model,), attrs)
+
+    return registry
+
+
+def create_patterns(app_count, models_per_app, pattern_count):
+    """
+    Return include and exclude lists of pattern_count patterns each, a mix of
+    field, model and app patterns (some of which contain wildcards).
+    """
+    exclude_list = []
+    include_list = []
+    for index in range(pattern_count):
+        app_label = f"bench_app_{index % app_count}"
+        model_label = f"{app_label}.Model{index % models_per_app}"
+        exclude_list.append(
+            [f"{model_label}.field_{index % 7}", model_label, f"{app_label}\\.Foo.*"][
+                index % 3
+            ]
+        )
+        include_list.append(f"{model_label}.field_1{index % 10}")
+    return exclude_list, include_list
+
+
+def run_benchmark(
+    app_count=10, models_per_app=100, fields_per_model=20, pattern_count=100, repeat=3
+):
+    """
+    Return the (best of repeat) duration in seconds of each phase.
+    """
+    # Imported here, the settings have to be configured first
+    from leukeleu_django_gdpr import checks  # noqa: PLC0415
+    from leukeleu_django_gdpr.gdpr import (  # noqa: PLC0415
+        Serializer,
+        get_gdpr_yml_path,
+        get_serializer,
+    )
+
+    registry = create_apps(app_count, models_per_app, fields_per_model)
+    exclude_list, include_list = create_patterns(
+        app_count, models_per_app, pattern_count
+    )
+    durations = {}
+
+    def record(phase, duration):
+        durations[phase] = min(durations.get(phase, duration), duration)
+
+    with (
+        tempfile.TemporaryDirectory() as tmp_dir,
+        override_settings(DJANGO_GDPR_YML_DIR=tmp_dir),
+        mock.patch("leukeleu_django_gdpr.gdpr.apps", registry),
+    ):
+        # Write a gdpr.yml with the include/exclude lists to start with
+        serializer = Serializer(exclude_list=exclude_list, include_list=include_list)
+        serializer.generate_models_list()
+        with get_gdpr_yml_path().open("w") as f:
+            serializer.save(f)
+
+        all_fields = [
+            (model, field)
+            for model in registry.get_models()
+            for field in model._meta.get_fields()
+        ]
+
+        for _run in range(repeat):
+            timings = {}
+            get_serializer(save=True, timings=timings)
+            for phase, duration in timings.items():
+                record(phase, duration)
+
+            start = time.perf_counter()
+            for model, field in all_fields:
+                serializer.should_include_field(model, field)
+            record("pattern matching", time.perf_counter() - start)
+
+            start = time.perf_counter()
+            checks.check_pii_stats(None)
+            record("check", time.perf_counter() - start)
+
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--models", type=int, default=100)
+    parser.add_argument("--fields", type=int, default=20)
+    parser.add_argument("--patterns", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.test_settings")
+    django.setup()
+
+    durations = run_benchmark(
+        args.apps, args.models, args.fields, args.patterns, args.repeat
+    )
+    print(  # noqa: T201
+        f"{args.apps * args.models} models, {args.fields} fields per model,"
+        f" {args.patterns} include/exclude patterns (best of {args.repeat}):"
+    )
+    for phase, duration in durations.items():
+        print(f"  {phase:<20}{duration:.3f}s")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Measure how long starting Django (e.g. a web worker or the test runner) takes
+with leukeleu_django_gdpr installed, and which of its heavy dependencies are
+imported at startup.
+
+Usage: python -m benchmarks.import_time [--runs N] [--settings MODULE]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess  # noqa: S404
+import sys
+
+STARTUP = """
+import sys, time
+start = time.perf_counter()
+import django
+django.setup()
+print(time.perf_counter() - start)
+print(" ".join(sorted({"yaml", "faker"} & set(sys.modules))))
+"""
+
+
+def measure(settings):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings}
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", STARTUP],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+    return float(output[0]), output[1] if len(output) > 1 else ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--settings", default="tests.test_settings")
+    args = parser.parse_args()
+
+    timings = []
+    for _run in range(args.runs):
+        timing, imported = measure(args.settings)
+        timings.append(timing)
+
+    print(f"django.setup(): {statistics.median(timings) * 1000:.1f} ms (median)")  # noqa: T201
+    print(f"Imported at startup: {imported or 'neither yaml nor faker'}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
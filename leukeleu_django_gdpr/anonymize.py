@@ -1,26 +1,102 @@
 import inspect
+import json
+import random
 import uuid
 
-from collections.abc import Callable, Mapping
-from functools import partial
+from collections import defaultdict
+from collections.abc import Callable, Collection, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from functools import cached_property, partial
 from importlib import resources
+from pathlib import Path
 from types import MappingProxyType
-from typing import Any, Protocol
+from typing import Any, NamedTuple, Protocol
+from weakref import WeakKeyDictionary
 
-from faker import Faker
 from typing_extensions import TypeIs
 
 from django.apps import apps
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import serializers
 from django.core.exceptions import ImproperlyConfigured
 from django.core.files.base import ContentFile
+from django.core.management.color import no_style
 from django.core.validators import EMPTY_VALUES
-from django.db import transaction
-from django.db.models import Field, ImageField, Model, Q
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import (
+    Case,
+    F,
+    Field,
+    ImageField,
+    IntegerField,
+    Max,
+    Model,
+    Q,
+    Value,
+    When,
+)
 from django.db.models.fields.files import ImageFieldFile
+from django.utils import timezone
 
-from leukeleu_django_gdpr.gdpr import read_data
+from leukeleu_django_gdpr.column_stats import (
+    can_preserve_statistics,
+    get_column_statistics,
+    statistics_generator,
+)
+from leukeleu_django_gdpr.dump import (
+    DumpCollector,
+    get_dump_models,
+    get_dump_path,
+    read_records,
+    rename_image_field,
+    serialize_value,
+    write_record,
+)
+from leukeleu_django_gdpr.explain import (
+    ModelEstimate,
+    estimate_plan,
+    estimate_row_count,
+)
+from leukeleu_django_gdpr.fake import ThreadLocalFaker
+from leukeleu_django_gdpr.gdpr import (
+    ANONYMIZE,
+    DELETE_WHERE,
+    DOMAIN_KEY,
+    PII_PATHS_KEY,
+    SKIP,
+    STRATEGIES,
+    STRATEGY_KEY,
+    TRUNCATE,
+    WHERE_KEY,
+    get_gdpr_yml_path,
+    read_data,
+)
+from leukeleu_django_gdpr.indexes import deferred_indexes
+from leukeleu_django_gdpr.json_paths import (
+    can_update_json_paths_in_db,
+    json_paths_anonymizer,
+    update_json_paths_in_db,
+)
+from leukeleu_django_gdpr.mask import mask_html, mask_htmls, mask_text, mask_texts
+from leukeleu_django_gdpr.pools import get_value_pool
+from leukeleu_django_gdpr.pseudonymize import PseudonymCache
+from leukeleu_django_gdpr.relations import (
+    anonymizes_column,
+    batched,
+    can_truncate,
+    get_related_lookups,
+    iter_pk_batches,
+    iter_related_rows,
+    sort_models,
+)
+from leukeleu_django_gdpr.verify import (
+    Leak,
+    find_fingerprinted_values,
+    fingerprint_values,
+)
 
 from . import static
 
@@ -30,10 +106,62 @@ def get_models_from_gdpr_yml():
     return data["models"]
 
 
+ANONYMIZE_STATE_TABLE = "leukeleu_django_gdpr_anonymize_state"
+
+
+def has_anonymize_state_table(connection):
+    with connection.cursor() as cursor:
+        return ANONYMIZE_STATE_TABLE in connection.introspection.table_names(cursor)
+
+
+def read_anonymize_state(using=DEFAULT_DB_ALIAS):
+    """
+    Return the state of the previous incremental run, which is stored in the
+    anonymized database itself. A database that was restored from a backup has
+    no state (or the state of the backup), so it's fully anonymized again.
+    """
+    connection = connections[using]
+    if not has_anonymize_state_table(connection):
+        return {}
+
+    table = connection.ops.quote_name(ANONYMIZE_STATE_TABLE)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT model_name, state FROM {table}")  # noqa: S608
+        return {model_name: json.loads(state) for model_name, state in cursor}
+
+
+def write_anonymize_state(state, using=DEFAULT_DB_ALIAS):
+    """
+    Store the state of an incremental run in database `using`, creating the
+    table when needed. Call this in the transaction of the run, so the state is
+    only stored when the anonymized data is committed.
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(ANONYMIZE_STATE_TABLE)
+    create_table = not has_anonymize_state_table(connection)
+    with connection.cursor() as cursor:
+        if create_table:
+            cursor.execute(
+                f"CREATE TABLE {table} (model_name varchar(255) PRIMARY KEY,"
+                " state text NOT NULL)"
+            )
+        cursor.execute(f"DELETE FROM {table}")  # noqa: S608
+        cursor.executemany(
+            f"INSERT INTO {table} (model_name, state) VALUES (%s, %s)",  # noqa: S608
+            [
+                (model_name, json.dumps(model_state))
+                for model_name, model_state in state.items()
+            ],
+        )
+
+
 class AnonymizerFunction(Protocol):
     def __call__(self, obj: Model, field: Field) -> Any:
         """Function to anonymize the value of a field on django model.
 
+        Use the leukeleu_django_gdpr.relations.uses_related decorator to declare
+        the related objects the function reads from obj.
+
         Args:
             obj: the instance of the django model for which the field is anonymized
             field: the field on the django model which is anonymized
@@ -44,6 +172,9 @@ class AnonymizerFunction(Protocol):
 AllowedOverrides = AnonymizerFunction | Callable[[], Any]
 
 
+_anonymizer_functions = WeakKeyDictionary()
+
+
 def is_anonymizer_function(function: AllowedOverrides) -> TypeIs[AnonymizerFunction]:
     """Check whether override function is a AnonymizerFunction or plain function.
 
@@ -52,8 +183,21 @@ def is_anonymizer_function(function: AllowedOverrides) -> TypeIs[AnonymizerFunct
 
     If the function is neither a AnonymizerFunction nor a function which needs no
     arguments a TypeError is raised.
+
+    The result is cached for as long as the function exists, unless the function
+    can't be weakly referenced.
     """
+    try:
+        return _anonymizer_functions[function]
+    except KeyError:
+        result = _anonymizer_functions[function] = _is_anonymizer_function(function)
+        return result
+    except TypeError:
+        # The function can't be weakly referenced
+        return _is_anonymizer_function(function)
 
+
+def _is_anonymizer_function(function):
     parameters = inspect.signature(function).parameters
 
     if set(parameters.keys()) == {"obj", "field"}:
@@ -79,6 +223,18 @@ def is_anonymizer_function(function: AllowedOverrides) -> TypeIs[AnonymizerFunct
     )
 
 
+@anonymizes_column(mask_texts)
+def mask_text_field(obj: Model, field: Field) -> str:
+    """Function to anonymize text fields by masking their current value."""
+    return mask_text(getattr(obj, field.attname))
+
+
+@anonymizes_column(mask_htmls)
+def mask_html_field(obj: Model, field: Field) -> str:
+    """Function to anonymize rich text fields by masking their current value."""
+    return mask_html(getattr(obj, field.attname))
+
+
 def anonymize_image_field(obj: Model, field: Field) -> ImageFieldFile:
     """Function to anonymize image fields on Django models.
 
@@ -100,7 +256,112 @@ def anonymize_image_field(obj: Model, field: Field) -> ImageFieldFile:
     return current_image
 
 
-class BaseAnonymizer:
+def get_incremental_state(Model, using=DEFAULT_DB_ALIAS):  # noqa: N803
+    """
+    Return the watermark for an incremental run of Model, before it is
+    anonymized: the highest primary key (if the primary key is an integer). The
+    time it was anonymized is added afterwards.
+    """
+    model_state = {}
+    if isinstance(Model._meta.pk, IntegerField):
+        model_state["pk"] = Model._base_manager.using(using).aggregate(pk=Max("pk"))[
+            "pk"
+        ]
+    return model_state
+
+
+def sample_pks(qs, *, count=None, fraction=None, chunk_size=2000):
+    """
+    Return a random sample of count primary keys, or of about fraction of the
+    primary keys, of the rows in qs. The primary keys are streamed, only the
+    sample is kept in memory.
+    """
+    pks = qs.values_list("pk", flat=True).iterator(chunk_size=chunk_size)
+
+    if fraction is not None:
+        return {pk for pk in pks if random.random() < fraction}  # noqa: S311
+
+    # Reservoir sampling
+    sample = []
+    for i, pk in enumerate(pks):
+        if i < count:
+            sample.append(pk)
+        else:
+            j = random.randrange(i + 1)  # noqa: S311
+            if j < count:
+                sample[j] = pk
+    return set(sample)
+
+
+def truncate_table(model, using=DEFAULT_DB_ALIAS):
+    """
+    Delete all rows from the table of model with a single statement.
+    """
+    connection = connections[using]
+    statements = connection.ops.sql_flush(no_style(), [model._meta.db_table])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def run_at_once(function, qs):
+    """
+    Call function with all rows in qs, see BaseAnonymizer.apply_strategies.
+    """
+    function(qs)
+
+
+def close_connection(using):
+    """
+    Close the connection to database `using`, unless a transaction uses it.
+    """
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+def get_dump_overrides(overrides):
+    """
+    Return overrides with anonymize_image_field replaced by rename_image_field.
+    """
+    return {
+        name: rename_image_field if value_func is anonymize_image_field else value_func
+        for name, value_func in overrides.items()
+    }
+
+
+class Overrides(NamedTuple):
+    """The resolved overrides of an anonymizer."""
+
+    fieldtype: Mapping[str, AllowedOverrides]
+    qs: dict
+    field: Mapping[str, AllowedOverrides]
+
+
+class FieldPlan(NamedTuple):
+    """How to anonymize a single field."""
+
+    field: Field
+    value_func: AllowedOverrides
+    takes_arguments: bool
+    domain: str | None
+    pii_paths: list[str] | None
+
+
+def get_column_function(field_plan: FieldPlan) -> Callable[[list], list] | None:
+    """
+    Return a function that returns new values for a list of values of the field
+    of field_plan, or None if the field can only be anonymized per object.
+    """
+    if field_plan.field.is_relation:
+        return None
+    if not field_plan.takes_arguments:
+        value_func = field_plan.value_func
+        return lambda values: [value_func() for _value in values]
+    return getattr(field_plan.value_func, "column_function", None)
+
+
+class BaseAnonymizer:  # noqa: PLR0904
     """
     Base class for anonymizing data.
 
@@ -120,77 +381,1085 @@ class BaseAnonymizer:
 
         extra_field_overrides: Dict of field overrides
             example: {"app.Model.field": fake.word}
+
+        incremental_fields: Dict of fields that are updated when a row changes,
+            used to find changed rows when anonymizing incrementally
+            example: {"app.Model": "modified"}
+
+        pseudonym_cache_size: Number of original -> fake value mappings kept in
+            memory for fields with a `domain` in gdpr.yml
+
+        pseudonym_spill_path: Path of an SQLite database to store evicted
+            mappings in, so the mappings stay consistent regardless of the
+            cache size
+
+        column_engine: Anonymize models a column at a time, without model
+            instances, if none of their fields need an instance
+
+        value_pools: Fieldtype or field overrides (keys of either) whose values
+            are sampled from a pool of pregenerated values, stored in a
+            memory-mapped file that is reused by every run
+            example: ["EmailField", "auth.User.first_name"]
+
+        value_pool_dir: Directory of the value pools, defaults to a
+            .gdpr-value-pools directory next to gdpr.yml
+
+        value_pool_size: Number of values in each pool
+
+        value_pool_max_age: Pools older than this timedelta are regenerated,
+            by default pools are only regenerated when their size changes
+
+        preserve_statistics: Replace text, date and number fields without a
+            field override by values that match the statistics of the column
+            (minimum, maximum, lengths and number of distinct values)
     """
 
     excluded_fields = []
     extra_fieldtype_overrides: Mapping[str, AllowedOverrides] | None = None
     extra_qs_overrides = None
     extra_field_overrides: Mapping[str, AllowedOverrides] | None = None
+    incremental_fields: Mapping[str, str] | None = None
+    pseudonym_cache_size = 100_000
+    pseudonym_spill_path = None
+    column_engine = True
+    value_pools: Collection[str] = ()
+    value_pool_dir = None
+    value_pool_size = 100_000
+    value_pool_max_age: timedelta | None = None
+    preserve_statistics = False
 
-    def __init__(self):
-        self.fake = Faker(["nl-NL"])
+    @cached_property
+    def fake(self):
+        """
+        The Faker used by the default overrides. Every thread gets its own Faker
+        instance, which is only built (and faker imported) when it's first used.
+        """
+        return ThreadLocalFaker(["nl-NL"])
 
-    def anonymize(self):
-        fieldtype_overrides = self.get_fieldtype_overrides()
-        qs_overrides = self.get_qs_overrides()
-        field_overrides = self.get_field_overrides()
+    @cached_property
+    def overrides(self):
+        """
+        The fieldtype, queryset and field overrides, resolved once per instance
+        so they can be reused by every run.
+        """
+        return Overrides(
+            fieldtype=self.get_pooled_overrides(self.get_fieldtype_overrides()),
+            qs=self.get_qs_overrides(),
+            field=self.get_pooled_overrides(self.get_field_overrides()),
+        )
 
-        with transaction.atomic():
-            models = get_models_from_gdpr_yml()
-            for model_name, model_data in models.items():
-                print(f"Currently anonymizing: {model_name}")  # noqa: T201
+    def get_pooled_overrides(self, overrides):
+        """
+        Replace the overrides listed in value_pools by a function that samples a
+        pool of values generated by the override. Values are sampled with
+        replacement, so unique fields can't use a pool.
+        """
+        if not self.value_pools:
+            return overrides
 
-                Model = apps.get_model(model_name)
+        pool_dir = (
+            get_gdpr_yml_path().with_name(".gdpr-value-pools")
+            if self.value_pool_dir is None
+            else Path(self.value_pool_dir)
+        )
+        locale = "_".join(self.fake.locales)
 
-                # Calling .all() makes sure we are always dealing with the latest data
-                qs = qs_overrides.get(model_name, Model._base_manager).all()
+        pooled_overrides = {}
+        for key in self.value_pools:
+            if key not in overrides:
+                continue
+            value_func = overrides[key]
+            if key.endswith(".unique") or is_anonymizer_function(value_func):
+                raise ImproperlyConfigured(
+                    f"Override '{key}' can't use a value pool, only overrides of"
+                    " fields that aren't unique and that take no arguments can."
+                )
+            pooled_overrides[key] = get_value_pool(
+                pool_dir / f"{key}.{locale}.pool",
+                value_func,
+                self.value_pool_size,
+                self.value_pool_max_age,
+            ).sample
 
-                # Collect fields that actually need to be updated and skip updating
-                # entirely if the set is empty
-                fields_to_update = set()
+        return overrides | pooled_overrides
 
-                for field_name, field_data in model_data["fields"].items():
-                    field_path = f"{model_name}.{field_name}"
-                    if not field_data["pii"] or field_path in self.excluded_fields:
-                        # Leave non PII and ignored fields alone
-                        continue
+    def anonymize(
+        self,
+        *,
+        incremental=False,
+        using=DEFAULT_DB_ALIAS,
+        defer_indexes=False,
+        profiler=None,
+    ):
+        """
+        Anonymize all PII fields listed in gdpr.yml.
 
-                    field = Model._meta.get_field(field_name)
+        When incremental is True only rows that were added (or changed, see
+        incremental_fields) since the previous incremental run are anonymized.
 
-                    field_type = type(field).__name__
-                    if field.unique:
-                        field_type += ".unique"
+        When defer_indexes is True the indexes on the PII columns and the user
+        triggers of each table are dropped/disabled while the table is
+        anonymized (PostgreSQL only, see indexes.deferred_indexes).
 
-                    value_func = field_overrides.get(
-                        field_path, fieldtype_overrides.get(field_type)
+        When a profiling.Profiler is given, every model is profiled and the time
+        spent in the anonymizer function of every field is recorded.
+        """
+        self.anonymize_databases(
+            [using],
+            incremental=incremental,
+            defer_indexes=defer_indexes,
+            profiler=profiler,
+        )
+
+    def anonymize_databases(
+        self,
+        databases=None,
+        *,
+        incremental=False,
+        jobs=1,
+        defer_indexes=False,
+        profiler=None,
+    ):
+        """
+        Anonymize the databases with the given aliases, by default the databases
+        returned by get_databases. Up to `jobs` databases are anonymized at the
+        same time, each in its own thread (and database connection).
+
+        The plan is built once and used for every database. Every database is
+        anonymized in its own transaction.
+        """
+        databases = self.get_databases() if databases is None else databases
+
+        models = get_models_from_gdpr_yml()
+        strategies = self.get_strategies(models)
+        plans = self.get_plans(models, strategies)
+
+        with self.get_pseudonym_cache() as self.pseudonyms:
+            if jobs > 1:
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    futures = [
+                        executor.submit(
+                            self.anonymize_database,
+                            using,
+                            models,
+                            strategies,
+                            plans,
+                            incremental=incremental,
+                            defer_indexes=defer_indexes,
+                            profiler=profiler,
+                        )
+                        for using in databases
+                    ]
+                    for future in futures:
+                        future.result()
+            else:
+                for using in databases:
+                    self.anonymize_database(
+                        using,
+                        models,
+                        strategies,
+                        plans,
+                        incremental=incremental,
+                        defer_indexes=defer_indexes,
+                        profiler=profiler,
                     )
 
-                    if not value_func:
-                        raise ImproperlyConfigured(
-                            f"No anonymization method found for field '{field_path}' "
-                            f"with type '{field_type}'."
-                        ) from None
+    def anonymize_database(
+        self,
+        using,
+        models,
+        strategies,
+        plans,
+        *,
+        incremental,
+        defer_indexes=False,
+        profiler=None,
+    ):
+        state = read_anonymize_state(using) if incremental else None
+
+        try:
+            with transaction.atomic(using=using):
+                self.apply_strategies(
+                    using,
+                    models,
+                    strategies,
+                    plans,
+                    run_at_once,
+                    state=state,
+                    defer_indexes=defer_indexes,
+                    profiler=profiler,
+                )
+                if incremental:
+                    write_anonymize_state(state, using)
+        finally:
+            # Don't keep a connection open for every database
+            close_connection(using)
+
+    def anonymize_online(self, throttle, *, using=DEFAULT_DB_ALIAS):
+        """
+        Anonymize database `using` while it is in use, paced by a
+        throttle.Throttle.
+
+        Unlike anonymize, this does not run in a single transaction: the rows
+        are deleted and anonymized in small batches of throttle.batch_size rows,
+        each committed in its own transaction, so locks are held only briefly.
+        Tables are never truncated. When the run is interrupted the database is
+        partially anonymized, run it again to anonymize the rest.
+        """
+        models = get_models_from_gdpr_yml()
+        strategies = self.get_strategies(models)
+        plans = self.get_plans(models, strategies)
+
+        with self.get_pseudonym_cache() as self.pseudonyms:
+            self.apply_strategies(using, models, strategies, plans, throttle.run)
+
+    def apply_strategies(
+        self,
+        using,
+        models,
+        strategies,
+        plans,
+        run,
+        *,
+        state=None,
+        defer_indexes=False,
+        profiler=None,
+    ):
+        """
+        Delete the rows of the models with the truncate or delete_where strategy
+        from database `using`, then anonymize the models in plans.
+
+        run(function, qs) calls function with the rows in qs: run_at_once calls
+        it once with qs, throttle.Throttle.run with batches of rows.
+
+        With the state of the previous incremental run (see
+        read_anonymize_state) only the rows that were added or changed since are
+        anonymized, the state of this run is updated in place.
+        """
+        fieldtype_overrides, qs_overrides, field_overrides = self.overrides
+        # Values only need to be unique within a database, don't run out of them
+        self.fake.unique.clear()
+
+        suffix = "" if using == DEFAULT_DB_ALIAS else f" ({using})"
+
+        # Delete rows first, rows that are deleted don't need anonymizing
+        for model_name, strategy in strategies.items():
+            if strategy not in {TRUNCATE, DELETE_WHERE}:
+                continue
+            print(f"Currently deleting: {model_name}{suffix}")  # noqa: T201
+
+            Model = apps.get_model(model_name)
+            qs = Model._base_manager.using(using)
+            if strategy == DELETE_WHERE:
+                qs = qs.filter(**models[model_name][WHERE_KEY])
+            run(partial(self.delete_rows, Model, models[model_name]), qs)
+
+        if self.preserve_statistics:
+            # Once for the whole table, not for every batch
+            plans = self.get_statistics_plans(plans, using)
+
+        for model_name, plan in plans.items():
+            print(f"Currently anonymizing: {model_name}{suffix}")  # noqa: T201
 
-                    takes_arguments = is_anonymizer_function(value_func)
+            Model = apps.get_model(model_name)
 
-                    for obj in qs:
-                        if getattr(obj, field_name) in EMPTY_VALUES:
-                            continue
+            # Calling .using() makes sure we are always dealing with the
+            # latest data
+            qs = qs_overrides.get(model_name, Model._base_manager).using(using)
 
-                        if takes_arguments:
-                            new_value = value_func(obj=obj, field=field)
-                        else:
-                            new_value = value_func()
+            if state is not None:
+                model_state = state.get(model_name)
+                state[model_name] = get_incremental_state(Model, using)
+                qs = self.get_incremental_qs(qs, model_state)
 
-                        setattr(obj, field_name, new_value)
-                        fields_to_update.add(field_name)
+            # Tables without columns to anonymize aren't locked
+            indexes = (
+                deferred_indexes(
+                    Model, [field_plan.field.column for field_plan in plan], using
+                )
+                if defer_indexes and plan
+                else nullcontext()
+            )
+            profile = nullcontext()
+            if profiler:
+                profile = profiler.profile(
+                    model_name if using == DEFAULT_DB_ALIAS else f"{using}.{model_name}"
+                )
+            with indexes, profile:
+                run(
+                    partial(
+                        self.anonymize_model,
+                        models[model_name],
+                        fieldtype_overrides=fieldtype_overrides,
+                        field_overrides=field_overrides,
+                        plan=(
+                            profiler.time_plan(model_name, plan) if profiler else plan
+                        ),
+                    ),
+                    qs,
+                )
+            if state is not None:
+                # Only after anonymizing, so the rows the anonymizer saves itself
+                # (e.g. anonymize_image_field, which bumps auto_now fields) don't
+                # count as changed in the next run
+                state[model_name]["anonymized"] = timezone.now().isoformat()
+
+    def get_databases(self):  # noqa: PLR6301
+        """
+        Return the aliases of the databases to anonymize, e.g. one per tenant.
+        """
+        return [DEFAULT_DB_ALIAS]
+
+    def anonymize_subjects(self, subject_pks, subject_model=None, batch_size=1000):
+        """
+        Anonymize only the rows that belong to the given subjects (by default:
+        users), e.g. to handle GDPR erasure requests. These are the subjects
+        themselves and all rows that (indirectly) refer to them, see
+        relations.iter_related_rows. Rows that also refer to another subject
+        belong to that subject and are left alone.
+
+        Subjects are processed in batches of batch_size, each in its own
+        transaction, so subject_pks can be a (lazy) iterable of any length.
+
+        Unlike anonymize, this does not use the queryset overrides: all rows
+        that belong to the subjects are anonymized. Rows of models with the
+        truncate or delete_where strategy are deleted instead.
+        """
+        subject_model = subject_model or get_user_model()
+        fieldtype_overrides, _qs_overrides, field_overrides = self.overrides
 
-                if fields_to_update:
-                    Model.objects.bulk_update(
-                        qs,
-                        fields_to_update,
-                        batch_size=500,
+        models = get_models_from_gdpr_yml()
+        strategies = self.get_strategies(models)
+        model_names = [
+            model_name
+            for model_name in sort_models(models)
+            if strategies[model_name] != SKIP
+        ]
+        plans = self.get_plans(models, strategies)
+        if self.preserve_statistics:
+            plans = self.get_statistics_plans(plans, DEFAULT_DB_ALIAS)
+
+        with self.get_pseudonym_cache() as self.pseudonyms:
+            for subject_batch in batched(subject_pks, batch_size):
+                related_pks = defaultdict(list)
+                with transaction.atomic():
+                    related_rows = iter_related_rows(
+                        subject_model, subject_batch, batch_size=batch_size
                     )
+                    for model, rows in related_rows:
+                        related_pks[model._meta.label].extend(row[0] for row in rows)
+
+                    for model_name in model_names:
+                        Model = apps.get_model(model_name)
+                        for pks in batched(related_pks[model_name], batch_size):
+                            self.anonymize_subject_rows(
+                                models[model_name],
+                                Model._base_manager.filter(pk__in=pks),
+                                strategies[model_name],
+                                fieldtype_overrides,
+                                field_overrides,
+                                plan=plans.get(model_name),
+                            )
+
+    def anonymize_subject_rows(
+        self,
+        model_data,
+        qs,
+        strategy,
+        fieldtype_overrides,
+        field_overrides,
+        plan=None,
+    ):
+        if strategy == ANONYMIZE:
+            self.anonymize_model(
+                model_data, qs, fieldtype_overrides, field_overrides, plan=plan
+            )
+        else:
+            self.delete_rows(qs.model, model_data, qs)
+
+    def subset(
+        self,
+        *,
+        count=None,
+        fraction=None,
+        root_model=None,
+        using=DEFAULT_DB_ALIAS,
+        batch_size=1000,
+    ):
+        """
+        Delete all rows of root_model (by default: users), except a random
+        sample of count rows (or of about fraction of the rows) and the rows
+        that are excluded by the queryset overrides (e.g. staff users).
+
+        The rows that refer to the deleted rows are deleted (or updated)
+        according to on_delete, so only the data of the sample is left and the
+        database stays consistent. Run anonymize afterwards to anonymize it.
+
+        Rows are deleted in batches of at most batch_size rows.
+        """
+        if (count is None) == (fraction is None):
+            raise ValueError("Pass either count or fraction.")
+
+        root_model = root_model or get_user_model()
+        qs = root_model._base_manager.using(using).order_by("pk")
+
+        qs_override = self.overrides.qs.get(root_model._meta.label)
+        if qs_override is None:
+            keep = sample_pks(qs, count=count, fraction=fraction)
+        else:
+            # Sample the rows that are anonymized, keep all other rows
+            qs_override = qs_override.using(using)
+            keep = sample_pks(
+                qs.filter(pk__in=qs_override.values("pk")),
+                count=count,
+                fraction=fraction,
+            )
+            keep.update(
+                qs.exclude(pk__in=qs_override.values("pk")).values_list("pk", flat=True)
+            )
+
+        with transaction.atomic(using=using):
+            for pks in iter_pk_batches(qs, batch_size):
+                delete_pks = [pk for pk in pks if pk not in keep]
+                if delete_pks:
+                    qs.filter(pk__in=delete_pks).delete()
+
+    def dump(self, output_path, *, using=DEFAULT_DB_ALIAS, jobs=1, chunk_size=2000):
+        """
+        Write an anonymized copy of all data in database `using` to output_path,
+        in the JSON Lines format of dumpdata and loaddata. The database itself is
+        not changed, so this can read directly from (a replica of) production.
+
+        Rows are streamed in chunks of chunk_size. With jobs > 1, output_path is
+        a directory and up to `jobs` models are dumped in parallel, each to its
+        own file.
+        """
+        output_path = Path(output_path)
+        gdpr_models = get_models_from_gdpr_yml()
+        strategies = self.get_strategies(gdpr_models)
+        plans = self.get_dump_plans(gdpr_models, strategies)
+        qs_overrides = self.overrides.qs
+
+        # The rows that are deleted by the truncate and delete_where strategies,
+        # and the rows that refer to them according to on_delete
+        deletions = DumpCollector(using)
+        for model_name, strategy in strategies.items():
+            if strategy in {TRUNCATE, DELETE_WHERE}:
+                qs = apps.get_model(model_name)._base_manager.using(using)
+                if strategy == DELETE_WHERE:
+                    qs = qs.filter(**gdpr_models[model_name][WHERE_KEY])
+                deletions.collect(qs)
+        deletions.check_restricted()
+
+        dumps = []
+        for model in get_dump_models(using):
+            model_name = model._meta.label
+            if strategies.get(model_name) == TRUNCATE:
+                # Truncated models are left out of the dump
+                continue
+            dumps.append(
+                (
+                    model,
+                    {
+                        "plan": plans.get(model_name, []),
+                        "qs_override": qs_overrides.get(model_name),
+                        "deletions": deletions,
+                        "using": using,
+                        "chunk_size": chunk_size,
+                    },
+                )
+            )
+
+        with self.get_pseudonym_cache() as self.pseudonyms:
+            if jobs > 1:
+                output_path.mkdir(parents=True, exist_ok=True)
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    futures = [
+                        executor.submit(
+                            self.dump_model_to_path,
+                            model,
+                            get_dump_path(output_path, model),
+                            **kwargs,
+                        )
+                        for model, kwargs in dumps
+                    ]
+                    for future in futures:
+                        future.result()
+            else:
+                with output_path.open("w", encoding="utf-8") as f:
+                    for model, kwargs in dumps:
+                        self.dump_model(model, f, **kwargs)
+
+    def dump_model_to_path(self, model, path, *, using, **kwargs):
+        try:
+            with path.open("w", encoding="utf-8") as f:
+                self.dump_model(model, f, using=using, **kwargs)
+        finally:
+            # Every thread has its own database connection
+            connections[using].close()
+
+    def dump_model(
+        self,
+        model,
+        stream,
+        *,
+        plan=(),
+        qs_override=None,
+        deletions=None,
+        using=DEFAULT_DB_ALIAS,
+        chunk_size=2000,
+    ):
+        """
+        Write an anonymized copy of the rows of model to stream.
+
+        Rows that are not in qs_override (see get_qs_overrides) are written
+        as is, the rows collected by deletions (a dump.DumpCollector) are left
+        out.
+        """
+        qs = model._base_manager.using(using).order_by("pk")
+        if deletions:
+            qs = deletions.exclude_deleted(qs)
+
+        kept_pks = set()
+        if plan and qs_override is not None:
+            kept_pks = set(
+                qs.exclude(pk__in=qs_override.using(using).values("pk")).values_list(
+                    "pk", flat=True
+                )
+            )
+
+        select_related, prefetch_related = get_related_lookups(
+            model, [field_plan.value_func for field_plan in plan]
+        )
+        # Many-to-many relations are part of the dump of the model
+        prefetch_related += [
+            field.name
+            for field in model._meta.concrete_model._meta.local_many_to_many
+            if field.serialize and field.remote_field.through._meta.auto_created
+        ]
+        if select_related:
+            qs = qs.select_related(*select_related)
+        if prefetch_related:
+            qs = qs.prefetch_related(*prefetch_related)
+
+        for chunk in batched(qs.iterator(chunk_size=chunk_size), chunk_size):
+            objs = chunk
+            if deletions:
+                objs = [obj for obj in chunk if not deletions.is_deleted(obj)]
+                for obj in objs:
+                    deletions.update_fields(obj)
+            self.anonymize_objects(
+                [obj for obj in objs if obj.pk not in kept_pks], plan
+            )
+            serializers.serialize("jsonl", objs, stream=stream)
+
+    def dump_file(self, input_stream, output_stream):
+        """
+        Write an anonymized copy of a dump in the JSON Lines format (dumpdata
+        --format jsonl) from input_stream to output_stream.
+
+        The rows are anonymized one by one, without loading them into a
+        database, so anonymizer functions can only use the row itself and not
+        its related objects.
+
+        Rows of models with the truncate strategy are left out, which is only
+        supported for models that no other model refers to. The delete_where
+        strategy is not supported.
+        """
+        gdpr_models = get_models_from_gdpr_yml()
+        strategies = self.get_strategies(gdpr_models)
+        plans = self.get_dump_plans(gdpr_models, strategies)
+
+        if DELETE_WHERE in strategies.values():
+            raise ImproperlyConfigured(
+                "The delete_where strategy is not supported when anonymizing a dump."
+            )
+        for model_name, strategy in strategies.items():
+            # Without a database the rows that refer to the model can't be found
+            if strategy == TRUNCATE and not can_truncate(apps.get_model(model_name)):
+                raise ImproperlyConfigured(
+                    f"The truncate strategy of model '{model_name}' is not supported"
+                    " when anonymizing a dump, because other models refer to it."
+                )
+
+        with self.get_pseudonym_cache() as self.pseudonyms:
+            for record in read_records(input_stream):
+                model = apps.get_model(record["model"])
+                if strategies.get(model._meta.label) == TRUNCATE:
+                    continue
+                plan = plans.get(model._meta.label)
+                if plan:
+                    (deserialized,) = serializers.deserialize("python", [record])
+                    obj = deserialized.object
+                    self.anonymize_objects([obj], plan)
+                    for field_plan in plan:
+                        field = field_plan.field
+                        if field.name in record["fields"]:
+                            record["fields"][field.name] = serialize_value(obj, field)
+                write_record(output_stream, record)
+
+    def explain(self, using=DEFAULT_DB_ALIAS, sample_size=1000):
+        """
+        Return a ModelEstimate for each model in gdpr.yml (in the order they are
+        anonymized) without changing any data: the number of rows, the time it
+        takes to generate new values and warnings about the plan.
+        """
+        models = get_models_from_gdpr_yml()
+        strategies = self.get_strategies(models)
+        plans = self.get_plans(models, strategies)
+        qs_overrides = self.overrides.qs
+
+        estimates = []
+        for model_name in sort_models(models):
+            strategy = strategies[model_name]
+            if strategy == SKIP:
+                continue
+
+            model = apps.get_model(model_name)
+            rows = estimate_row_count(model, using)
+            seconds, warnings = None, []
+            if strategy == ANONYMIZE:
+                qs = qs_overrides.get(model_name, model._base_manager).using(using)
+                seconds, warnings = estimate_plan(
+                    qs, plans[model_name], rows, sample_size
+                )
+            estimates.append(
+                ModelEstimate(model_name, strategy, rows, seconds, warnings)
+            )
+
+        return estimates
+
+    def fingerprint(self, using=DEFAULT_DB_ALIAS):
+        """
+        Return a verify.Fingerprint of the current value of every row of every
+        field that will be anonymized (per model name and field attname), to
+        check with verify after anonymizing. Every table is read once, the
+        fingerprints use 8 bytes per row.
+
+        Models without fields to anonymize are skipped.
+        """
+        models = get_models_from_gdpr_yml()
+        plans = self.get_plans(models, self.get_strategies(models))
+
+        fingerprints = {}
+        for model_name, plan in plans.items():
+            if not plan:
+                continue
+            model = apps.get_model(model_name)
+            fingerprints[model_name] = fingerprint_values(
+                model._base_manager.using(using),
+                {field_plan.field.attname: field_plan.pii_paths for field_plan in plan},
+            )
+        return fingerprints
+
+    def verify(self, fingerprints, using=DEFAULT_DB_ALIAS):
+        """
+        Return a Leak for every field with rows that still have their value in
+        fingerprints (as returned by fingerprint). Rows that are excluded by a
+        queryset override are counted separately.
+
+        Only rows that kept their own original value are reported, but fields
+        with few distinct values (e.g. small integers) will match by chance.
+        """
+        qs_overrides = self.overrides.qs
+
+        leaks = []
+        for model_name, model_fingerprints in fingerprints.items():
+            if not model_fingerprints:
+                continue
+            model = apps.get_model(model_name)
+            qs = qs_overrides.get(model_name, model._base_manager).using(using)
+            found = find_fingerprinted_values(qs, model_fingerprints)
+            excluded_found = {}
+            if model_name in qs_overrides:
+                excluded_found = find_fingerprinted_values(
+                    model._base_manager.using(using).exclude(pk__in=qs.values("pk")),
+                    model_fingerprints,
+                )
+
+            for attname, (rows, example_pks) in found.items():
+                excluded_rows, _excluded_pks = excluded_found.get(attname, (0, []))
+                if rows or excluded_rows:
+                    leaks.append(
+                        Leak(
+                            model_name,
+                            model._meta.get_field(attname).name,
+                            rows,
+                            example_pks,
+                            excluded_rows,
+                        )
+                    )
+        return leaks
+
+    def get_plans(self, models, strategies):
+        """
+        Return the plan for each model in gdpr.yml with the anonymize strategy,
+        in the order the models are anonymized.
+        """
+        fieldtype_overrides, _qs_overrides, field_overrides = self.overrides
+
+        return {
+            model_name: self.get_model_plan(
+                apps.get_model(model_name),
+                models[model_name],
+                fieldtype_overrides,
+                field_overrides,
+            )
+            for model_name in sort_models(models)
+            if strategies[model_name] == ANONYMIZE
+        }
+
+    def get_dump_plans(self, models, strategies):
+        """
+        Return the plan for each model in gdpr.yml with the anonymize strategy
+        to anonymize a dump with.
+
+        Image fields only get a new filename in a dump, the files in the storage
+        are left alone.
+        """
+        fieldtype_overrides = get_dump_overrides(self.overrides.fieldtype)
+        field_overrides = get_dump_overrides(self.overrides.field)
+
+        return {
+            model_name: self.get_model_plan(
+                apps.get_model(model_name),
+                model_data,
+                fieldtype_overrides,
+                field_overrides,
+            )
+            for model_name, model_data in models.items()
+            if strategies[model_name] == ANONYMIZE
+        }
+
+    def get_strategies(self, models):
+        """
+        Return the strategy for each model in gdpr.yml.
+        """
+        return {
+            model_name: self.get_strategy(model_name, model_data)
+            for model_name, model_data in models.items()
+        }
+
+    def get_strategy(self, model_name, model_data):  # noqa: PLR6301
+        strategy = model_data.get(STRATEGY_KEY, ANONYMIZE)
+
+        if strategy not in STRATEGIES:
+            raise ImproperlyConfigured(
+                f"Unknown strategy '{strategy}' for model '{model_name}', use one"
+                f" of: {', '.join(STRATEGIES)}."
+            )
+
+        if strategy == DELETE_WHERE and not model_data.get(WHERE_KEY):
+            raise ImproperlyConfigured(
+                f"The delete_where strategy of model '{model_name}' requires"
+                f" '{WHERE_KEY}' lookups."
+            )
+
+        return strategy
+
+    def delete_rows(  # noqa: PLR6301
+        self, model, model_data, qs=None, using=DEFAULT_DB_ALIAS
+    ):
+        """
+        Delete the rows of model (or only the rows in qs) that its strategy
+        applies to: all rows (truncate) or the rows that match the `where`
+        lookups (delete_where).
+
+        When all rows are deleted and no other table refers to model, the table
+        is emptied with a single statement (TRUNCATE where the database supports
+        it). Otherwise the rows
+        are deleted with the ORM, so the rows that refer to them are deleted as
+        well (or a ProtectedError is raised).
+        """
+        if qs is None:
+            qs = model._base_manager.using(using)
+        if (
+            model_data[STRATEGY_KEY] == TRUNCATE
+            and not qs.query.has_filters()
+            and can_truncate(model)
+        ):
+            truncate_table(model, qs.db)
+            return
+
+        if model_data[STRATEGY_KEY] == DELETE_WHERE:
+            qs = qs.filter(**model_data[WHERE_KEY])
+
+        qs.delete()
+
+    def get_model_plan(self, model, model_data, fieldtype_overrides, field_overrides):
+        """
+        Return a FieldPlan for each field of model that should be anonymized.
+        """
+        model_name = model._meta.label
+
+        plan = []
+
+        for field_name, field_data in model_data["fields"].items():
+            field_path = f"{model_name}.{field_name}"
+            if not field_data["pii"] or field_path in self.excluded_fields:
+                # Leave non PII and ignored fields alone
+                continue
+
+            field = model._meta.get_field(field_name)
+
+            value_func = self.get_value_func(
+                field_path, field, field_data, fieldtype_overrides, field_overrides
+            )
+
+            plan.append(
+                FieldPlan(
+                    field=field,
+                    value_func=value_func,
+                    takes_arguments=is_anonymizer_function(value_func),
+                    domain=field_data.get(DOMAIN_KEY),
+                    pii_paths=(
+                        None
+                        if field_path in field_overrides
+                        else field_data.get(PII_PATHS_KEY)
+                    ),
+                )
+            )
+
+        return plan
+
+    def anonymize_model(
+        self, model_data, qs, fieldtype_overrides, field_overrides, plan=None
+    ):
+        model = qs.model
+
+        if plan is None:
+            plan = self.get_model_plan(
+                model, model_data, fieldtype_overrides, field_overrides
+            )
+
+        model_plan, plan = plan, []
+
+        for field_plan in model_plan:
+            if field_plan.pii_paths and can_update_json_paths_in_db(
+                field_plan.pii_paths, qs.db, field_plan.domain
+            ):
+                # Mask the paths in the database, without loading the documents
+                update_json_paths_in_db(qs, field_plan.field, field_plan.pii_paths)
+            else:
+                plan.append(field_plan)
+
+        if not plan:
+            return
+
+        column_functions = [get_column_function(field_plan) for field_plan in plan]
+        if self.column_engine and all(column_functions):
+            self.anonymize_columns(qs, plan, column_functions)
+            return
+
+        # Fetch the related objects the anonymizer functions need up front
+        select_related, prefetch_related = get_related_lookups(
+            model, [field_plan.value_func for field_plan in plan]
+        )
+        if select_related:
+            qs = qs.select_related(*select_related)
+        if prefetch_related:
+            qs = qs.prefetch_related(*prefetch_related)
+
+        # Only update the fields that actually changed and skip updating
+        # entirely if the set is empty
+        fields_to_update = self.anonymize_objects(qs, plan)
+
+        if fields_to_update:
+            model.objects.db_manager(qs.db).bulk_update(
+                qs,
+                fields_to_update,
+                batch_size=500,
+            )
+
+    def get_statistics_plans(self, plans, using):
+        """
+        Return plans with the statistics plan (see get_statistics_plan) of each
+        model. The statistics are computed once per model per run, the plans are
+        then used for every batch of rows.
+        """
+        return {
+            model_name: self.get_statistics_plan(
+                apps.get_model(model_name), plan, using
+            )
+            for model_name, plan in plans.items()
+        }
+
+    def get_statistics_plan(self, model, plan, using):
+        """
+        Return plan with the value functions of the fields that don't have a
+        field override replaced by functions that generate values matching the
+        statistics of all values of the field in database `using` (see
+        column_stats).
+        """
+        field_overrides = self.overrides.field
+        all_rows = model._base_manager.using(using)
+
+        statistics_plan = []
+        for field_plan in plan:
+            field = field_plan.field
+            generate = None
+            if (
+                can_preserve_statistics(field)
+                and f"{model._meta.label}.{field.name}" not in field_overrides
+            ):
+                generate = statistics_generator(
+                    field, get_column_statistics(all_rows, field)
+                )
+            statistics_plan.append(
+                field_plan._replace(value_func=generate, takes_arguments=False)
+                if generate
+                else field_plan
+            )
+        return statistics_plan
+
+    def anonymize_columns(self, qs, plan, column_functions, chunk_size=2000):
+        """
+        Anonymize the rows in qs without model instances: each chunk of rows is
+        read with values_list, the new values are generated a column at a time
+        (see get_column_function) and written with a single UPDATE.
+        """
+        model = qs.model
+        attnames = [field_plan.field.attname for field_plan in plan]
+        # Like bulk_update, stay below the database's limit on query parameters
+        chunk_size = min(
+            chunk_size,
+            connections[qs.db].ops.bulk_batch_size(
+                ["pk", "pk", *attnames], range(chunk_size)
+            ),
+        )
+        qs = qs.order_by("pk")
+        last_pk = None
+
+        while True:
+            page = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            rows = list(page.values_list("pk", *attnames)[:chunk_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            updates = {}
+            for index, (field_plan, column_function) in enumerate(
+                zip(plan, column_functions, strict=True), start=1
+            ):
+                values = {
+                    row[0]: row[index] for row in rows if row[index] not in EMPTY_VALUES
+                }
+                if not values:
+                    continue
+
+                new_values = self.anonymize_column(
+                    field_plan, column_function, list(values.values())
+                )
+                field = field_plan.field
+                updates[field.attname] = Case(
+                    *(
+                        When(pk=pk, then=Value(new_value, output_field=field))
+                        for pk, new_value in zip(values, new_values, strict=True)
+                    ),
+                    default=F(field.attname),
+                    output_field=field,
+                )
+
+            if updates:
+                model._base_manager.using(qs.db).filter(
+                    pk__in=[row[0] for row in rows]
+                ).update(**updates)
+
+    def anonymize_column(self, field_plan, column_function, values):
+        """
+        Return the new values for a list of (non-empty) values of a field.
+        """
+        if not field_plan.domain:
+            return column_function(values)
+
+        # The same original value always gets the same fake value
+        return [
+            self.pseudonyms.get(
+                field_plan.domain,
+                value,
+                lambda value=value: column_function([value])[0],
+            )
+            for value in values
+        ]
+
+    def anonymize_objects(self, objs, plan):
+        """
+        Set new values on objs (in memory) according to plan, a list of
+        FieldPlan, and return the names of the fields that were changed.
+        """
+        fields_to_update = set()
+
+        for obj in objs:
+            for field, value_func, takes_arguments, domain, _pii_paths in plan:
+                value = getattr(obj, field.name)
+                if value in EMPTY_VALUES:
+                    continue
+
+                if takes_arguments:
+                    generate = partial(value_func, obj=obj, field=field)
+                else:
+                    generate = value_func
+
+                if domain:
+                    # The same original value always gets the same fake value
+                    new_value = self.pseudonyms.get(domain, value, generate)
+                else:
+                    new_value = generate()
+
+                setattr(obj, field.name, new_value)
+                fields_to_update.add(field.name)
+
+        return fields_to_update
+
+    def get_value_func(  # noqa: PLR6301
+        self, field_path, field, field_data, fieldtype_overrides, field_overrides
+    ):
+        if field_path in field_overrides:
+            return field_overrides[field_path]
+
+        if field_data.get(PII_PATHS_KEY):
+            # Only mask the given paths of the JSON document
+            return json_paths_anonymizer(field_data[PII_PATHS_KEY])
+
+        field_type = type(field).__name__
+        if field.unique:
+            field_type += ".unique"
+
+        value_func = fieldtype_overrides.get(field_type)
+
+        if not value_func:
+            raise ImproperlyConfigured(
+                f"No anonymization method found for field '{field_path}' "
+                f"with type '{field_type}'."
+            ) from None
+
+        return value_func
+
+    def get_pseudonym_cache(self):
+        return PseudonymCache(
+            maxsize=self.pseudonym_cache_size,
+            spill_path=self.pseudonym_spill_path,
+        )
+
+    def get_incremental_qs(self, qs, model_state):
+        """
+        Restrict qs to the rows that were added or changed since the run that
+        stored model_state. Without a previous run the qs is returned as-is.
+        """
+        if not model_state or model_state.get("pk", 0) is None:
+            # There was no previous run, or the table was empty during that run
+            return qs
+
+        changed_field = (self.incremental_fields or {}).get(qs.model._meta.label)
+        anonymized = datetime.fromisoformat(model_state["anonymized"])
+
+        # Without a pk watermark or changed field the condition matches all rows
+        condition = Q()
+        if "pk" in model_state:
+            condition |= Q(pk__gt=model_state["pk"])
+        if changed_field:
+            condition |= Q(**{f"{changed_field}__gte": anonymized})
+        return qs.filter(condition)
 
     def get_fieldtype_overrides(self) -> Mapping[str, AllowedOverrides]:
         fieldtype_overrides = MappingProxyType(
@@ -225,13 +1494,13 @@ class BaseAnonymizer:
                 "PositiveIntegerField.unique": self.fake.unique.random_int,
                 "PositiveSmallIntegerField": self.fake.random_int,
                 "PositiveSmallIntegerField.unique": self.fake.unique.random_int,
-                "RichTextField": self.fake.paragraph,
+                "RichTextField": mask_html_field,
                 "RichTextField.unique": self.fake.unique.paragraph,
                 "SlugField": self.fake.pystr,
                 "SlugField.unique": self.fake.unique.pystr,
                 "SmallIntegerField": self.fake.random_int,
                 "SmallIntegerField.unique": self.fake.unique.random_int,
-                "TextField": self.fake.paragraph,
+                "TextField": mask_text_field,
                 "TextField.unique": self.fake.unique.paragraph,
                 "URLField": self.fake.url,
                 "URLField.unique": self.fake.unique.url,
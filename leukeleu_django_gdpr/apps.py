@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class GdprConfig(AppConfig):
@@ -8,3 +9,9 @@ class GdprConfig(AppConfig):
     def ready(self):  # noqa: PLR6301
         # register checks
         from . import checks  # noqa: F401, PLC0415
+
+        # Only during development, never rewrite gdpr.yml when deployed
+        if settings.DEBUG and getattr(settings, "DJANGO_GDPR_AUTOUPDATE", False):
+            from . import autoupdate  # noqa: PLC0415
+
+            autoupdate.connect()
@@ -0,0 +1,162 @@
+import atexit
+import logging
+import os
+import threading
+
+from django.apps import apps
+from django.db.models.signals import post_migrate
+from django.utils.autoreload import autoreload_started
+
+from leukeleu_django_gdpr.gdpr import (
+    Serializer,
+    get_gdpr_yml_path,
+    get_serializer,
+    read_data,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_field_names(serializer, model):
+    return [
+        field.name
+        for field in model._meta.get_fields()
+        if serializer.should_include_field(model, field)
+    ]
+
+
+def update_gdpr_yml():
+    """
+    Update the entries in gdpr.yml of the models whose fields were added or
+    removed, and remove the entries of models that no longer exist. The
+    classification is kept and the other entries are left alone.
+
+    Returns the labels of the updated (and removed) models, gdpr.yml is only
+    written when there are any.
+    """
+    path = get_gdpr_yml_path()
+    if not path.exists():
+        return list(get_serializer(save=True).models)
+
+    data = read_data()
+    existing_models = data.get("models") or {}
+    # Previous versions used "ignore", migrate to "exclude"
+    serializer = Serializer(
+        exclude_list=data.get("exclude", data.get("ignore", [])),
+        include_list=data.get("include"),
+    )
+
+    models = {}
+    changed_models = {}
+    for model in apps.get_models():
+        if model._meta.proxy:
+            continue  # Skip proxy models
+        model_label = model._meta.label
+        field_names = get_field_names(serializer, model)
+        if model_label in existing_models and field_names == list(
+            existing_models[model_label]["fields"]
+        ):
+            models[model_label] = existing_models[model_label]
+        elif field_names:
+            models[model_label] = changed_models[model_label] = serializer.handle_model(
+                model
+            )[1]
+
+    updated = [*changed_models, *(set(existing_models) - set(models))]
+    if not updated:
+        return []
+
+    # Only merge the classification of the changed models
+    serializer.models = changed_models
+    serializer.apply_existing_input_data(existing_models)
+    serializer.models = models
+
+    # Checks read gdpr.yml in other processes, never leave it half-written
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with tmp_path.open("w") as f:
+        serializer.save(f)
+    os.replace(tmp_path, path)
+
+    return updated
+
+
+class Updater:
+    """
+    Runs update_gdpr_yml in a background thread, delay seconds after the last
+    call to schedule, so a burst of changes results in a single update.
+    """
+
+    def __init__(self, delay=1.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.update_lock = threading.Lock()
+        self.timer = None
+        self.pending = False
+        self.flush_at_exit = False
+
+    def schedule(self, *, flush_at_exit=False):
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+            self.pending = True
+            self.flush_at_exit = self.flush_at_exit or flush_at_exit
+            self.timer = threading.Timer(self.delay, self.update)
+            # Never keep a process (e.g. runserver reloading) from exiting
+            self.timer.daemon = True
+            self.timer.start()
+
+    def update(self):
+        with self.lock:
+            if not self.pending:
+                return
+            self.pending = False
+
+        with self.update_lock:
+            try:
+                updated = update_gdpr_yml()
+            except Exception:
+                logger.exception("Updating gdpr.yml failed.")
+                return
+
+        if updated:
+            logger.info("Updated gdpr.yml: %s", ", ".join(updated))
+
+    def flush(self):
+        """
+        Run a pending update now.
+        """
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+        self.update()
+
+    def exit(self):
+        if self.flush_at_exit:
+            self.flush()
+
+
+updater = Updater()
+
+
+def autoreload_started_handler(sender, **kwargs):
+    # Sent by runserver in the process that is restarted on every code change
+    updater.schedule()
+
+
+def post_migrate_handler(sender, **kwargs):
+    # Sent for every app, migrate exits right afterwards
+    updater.schedule(flush_at_exit=True)
+
+
+def connect():
+    """
+    Update gdpr.yml in the background after runserver (re)starts and after
+    migrate, see the DJANGO_GDPR_AUTOUPDATE setting.
+    """
+    autoreload_started.connect(
+        autoreload_started_handler, dispatch_uid="leukeleu_django_gdpr.autoupdate"
+    )
+    post_migrate.connect(
+        post_migrate_handler, dispatch_uid="leukeleu_django_gdpr.autoupdate"
+    )
+    atexit.register(updater.exit)
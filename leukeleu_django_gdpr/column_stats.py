@@ -0,0 +1,139 @@
+import random
+
+from datetime import timedelta
+from decimal import Decimal
+from string import ascii_lowercase
+from typing import Any, NamedTuple
+
+from django.db import models
+from django.db.models import Count, Max, Min
+from django.db.models.functions import Length
+
+# Types of fields that statistics_generator can generate values for
+STATISTICS_FIELDS = (
+    models.CharField,
+    models.TextField,
+    models.DateField,
+    models.IntegerField,
+    models.FloatField,
+    models.DecimalField,
+)
+EMAIL_DOMAIN = "@example.com"
+
+
+class ColumnStatistics(NamedTuple):
+    """
+    Statistics of the values of a column, like the query planner uses. Null (and
+    empty) values are never anonymized, so the null fraction stays the same.
+    """
+
+    rows: int
+    null_fraction: float
+    distinct: int
+    min: Any
+    max: Any
+    # The number of rows per length of the (non-empty) values, for text columns
+    lengths: dict[int, int] | None
+
+
+def can_preserve_statistics(field):
+    return isinstance(field, STATISTICS_FIELDS) and not field.unique
+
+
+def get_column_statistics(qs, field):
+    """
+    Return the ColumnStatistics of field in qs, using aggregate queries.
+    """
+    attname = field.attname
+    aggregates = qs.aggregate(
+        rows=Count("pk"),
+        values=Count(attname),
+        distinct=Count(attname, distinct=True),
+        min=Min(attname),
+        max=Max(attname),
+    )
+    lengths = None
+    if isinstance(field, models.CharField | models.TextField):
+        lengths = dict(
+            qs.annotate(length=Length(attname))
+            .filter(length__gt=0)
+            .order_by()
+            .values("length")
+            .annotate(rows=Count("pk"))
+            .values_list("length", "rows")
+        )
+
+    rows = aggregates["rows"]
+    return ColumnStatistics(
+        rows=rows,
+        null_fraction=1 - aggregates["values"] / rows if rows else 0.0,
+        distinct=aggregates["distinct"],
+        min=aggregates["min"],
+        max=aggregates["max"],
+        lengths=lengths,
+    )
+
+
+def get_value_generator(field, statistics):  # noqa: PLR0911
+    """
+    Return a function that generates a random value between the minimum and
+    maximum of statistics (or with a length from its length histogram).
+    """
+    low, high = statistics.min, statistics.max
+
+    if isinstance(field, models.CharField | models.TextField):
+        if not statistics.lengths:
+            return None
+        lengths, weights = zip(*statistics.lengths.items(), strict=True)
+
+        def generate_text():
+            [length] = random.choices(lengths, weights)  # noqa: S311
+            if isinstance(field, models.EmailField):
+                local_length = max(1, length - len(EMAIL_DOMAIN))
+                return random_letters(local_length) + EMAIL_DOMAIN
+            return random_letters(length)
+
+        return generate_text
+    if isinstance(field, models.DateTimeField):
+        seconds = (high - low).total_seconds()
+        return lambda: low + timedelta(seconds=random.uniform(0, seconds))  # noqa: S311
+    if isinstance(field, models.DateField):
+        days = (high - low).days
+        return lambda: low + timedelta(days=random.randint(0, days))  # noqa: S311
+    if isinstance(field, models.IntegerField):
+        return lambda: random.randint(low, high)  # noqa: S311
+    if isinstance(field, models.FloatField):
+        return lambda: random.uniform(low, high)  # noqa: S311
+    if isinstance(field, models.DecimalField):
+        exponent = Decimal(1).scaleb(-field.decimal_places)
+
+        def generate_decimal():
+            value = random.uniform(float(low), float(high))  # noqa: S311
+            return Decimal(value).quantize(exponent)
+
+        return generate_decimal
+    return None
+
+
+def random_letters(length):
+    return "".join(random.choices(ascii_lowercase, k=length))  # noqa: S311
+
+
+def statistics_generator(field, statistics, max_pool_size=100_000):
+    """
+    Return a function (without arguments) that generates values for field that
+    match statistics (as returned by get_column_statistics): between the same
+    minimum and maximum, with the same lengths and about the same number of
+    distinct values. Returns None if there are no values to match.
+
+    The number of distinct values is kept by sampling from a pool of that many
+    generated values (up to max_pool_size).
+    """
+    if not statistics.distinct:
+        return None
+    generate = get_value_generator(field, statistics)
+    if generate is None or statistics.distinct > max_pool_size:
+        return generate
+
+    pool = [generate() for _i in range(statistics.distinct)]
+    return lambda: random.choice(pool)  # noqa: S311
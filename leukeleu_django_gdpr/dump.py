@@ -0,0 +1,196 @@
+import json
+import uuid
+
+from collections import defaultdict
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.db.models import DO_NOTHING, Field, ImageField, Model
+from django.db.models.deletion import (
+    RestrictedError,
+    get_candidate_relations_to_delete,
+)
+from django.utils.encoding import is_protected_type
+
+from leukeleu_django_gdpr.relations import batched, can_truncate
+
+
+def get_dump_models(using):
+    """
+    Return the models that dumpdata dumps for database `using`.
+    """
+    return [
+        model
+        for model in apps.get_models()
+        if not model._meta.proxy and router.allow_migrate_model(using, model)
+    ]
+
+
+def get_dump_path(output_dir, model):
+    return output_dir / f"{model._meta.label_lower}.jsonl"
+
+
+def rename_image_field(obj: Model, field: Field) -> str:
+    """Function to anonymize image fields in a dump.
+
+    Generates an anonymized filename in the same directory, like
+    anonymize_image_field, but leaves the files in the storage alone.
+    """
+
+    if not isinstance(field, ImageField):
+        raise TypeError
+
+    current_name = getattr(obj, field.name).name
+    return str(PurePosixPath(current_name).with_name(f"{uuid.uuid4()}.png"))
+
+
+def serialize_value(obj, field):
+    """
+    Return the value of field on obj the way the dumpdata serializers do.
+    """
+    value = field.value_from_object(obj)
+    return value if is_protected_type(value) else field.value_to_string(obj)
+
+
+def read_records(stream):
+    """
+    Read the records of a dump in the JSON Lines format (dumpdata --format jsonl).
+    """
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_record(stream, record):
+    """
+    Write a record in the JSON Lines format, like dumpdata --format jsonl.
+    """
+    json.dump(
+        record,
+        stream,
+        separators=(",", ": "),
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+    )
+    stream.write("\n")
+
+
+class DumpCollector:
+    """
+    Collects the rows that are left out of a dump because they are deleted by
+    the truncate or delete_where strategy, and the rows that refer to them, the
+    way they would be deleted (or updated) in the database according to their
+    on_delete. Like django.db.models.deletion.Collector, which the on_delete
+    handlers call back into, but the database is left alone.
+
+    Only the primary keys of the rows are kept in memory. Rows of models that
+    no other model refers to are kept as querysets instead. Generic relations
+    are not followed.
+    """
+
+    def __init__(self, using, batch_size=1000):
+        self.using = using
+        self.batch_size = batch_size
+        self.deleted_pks = defaultdict(set)
+        self.deleted_querysets = defaultdict(list)
+        # The new values of the fields of the rows that refer to collected rows
+        self.field_updates = defaultdict(dict)
+        self.restricted = []
+
+    def collect(self, objs, **kwargs):
+        """
+        Collect the rows in queryset objs, and the rows that refer to them.
+        """
+        model = objs.model._meta.concrete_model
+        if can_truncate(model):
+            self.deleted_querysets[model].append(objs)
+            return
+
+        pks = set(objs.values_list("pk", flat=True)) - self.deleted_pks[model]
+        self.deleted_pks[model].update(pks)
+        for batch in batched(pks, self.batch_size):
+            # Deleting a child deletes its parents as well
+            for parent_model, parent_link in model._meta.parents.items():
+                if parent_link:
+                    self.collect(
+                        parent_model._base_manager.using(self.using).filter(
+                            pk__in=batch
+                        )
+                    )
+
+            for relation in get_candidate_relations_to_delete(model._meta):
+                field = relation.field
+                if (
+                    field.remote_field.on_delete is DO_NOTHING
+                    # The rows of auto-created many-to-many tables are part of
+                    # the dump of the models, see is_deleted
+                    or relation.related_model._meta.auto_created
+                ):
+                    continue
+                sub_objs = relation.related_model._base_manager.using(
+                    self.using
+                ).filter(**{f"{field.name}__in": batch})
+                if sub_objs.exists():
+                    field.remote_field.on_delete(self, field, sub_objs, self.using)
+
+    def add_field_update(self, field, value, objs):
+        if isinstance(value, Model):
+            value = value.pk
+        updates = self.field_updates[field.model._meta.concrete_model]
+        for pk in objs.values_list("pk", flat=True):
+            updates.setdefault(pk, {})[field.attname] = value
+
+    def add_restricted_objects(self, field, objs):
+        self.restricted.append((field, objs))
+
+    def add_dependency(self, model, dependency, **kwargs):
+        pass
+
+    def check_restricted(self):
+        """
+        Raise a RestrictedError for rows that refer to collected rows with
+        on_delete=RESTRICT and are not collected themselves.
+        """
+        for field, objs in self.restricted:
+            restricted_objs = [obj for obj in objs if not self.is_deleted(obj)]
+            if restricted_objs:
+                raise RestrictedError(
+                    f"Cannot leave out some instances of model"
+                    f" '{field.remote_field.model.__name__}' because they are"
+                    f" referenced through restricted foreign key"
+                    f" '{field.model.__name__}.{field.name}'.",
+                    set(restricted_objs),
+                )
+
+    def exclude_deleted(self, qs):
+        """
+        Exclude the collected rows that are kept as querysets from qs, use
+        is_deleted for the other collected rows.
+        """
+        for deleted_qs in self.deleted_querysets[qs.model._meta.concrete_model]:
+            qs = qs.exclude(pk__in=deleted_qs.values("pk"))
+        return qs
+
+    def is_deleted(self, obj):
+        return obj.pk in self.deleted_pks[obj._meta.concrete_model]
+
+    def update_fields(self, obj):
+        """
+        Set the foreign keys of obj that refer to collected rows to their new
+        values (SET_NULL, SET_DEFAULT and SET), and leave the collected rows
+        out of its prefetched many-to-many relations.
+        """
+        updates = self.field_updates[obj._meta.concrete_model].get(obj.pk, {})
+        for attname, value in updates.items():
+            setattr(obj, attname, value)
+
+        # The serializers use the prefetched querysets (which must stay
+        # querysets) instead of querying the relations
+        for related_objs in getattr(obj, "_prefetched_objects_cache", {}).values():
+            related_objs._result_cache = [  # noqa: SLF001
+                related_obj
+                for related_obj in related_objs
+                if not self.is_deleted(related_obj)
+            ]
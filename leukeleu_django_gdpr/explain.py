@@ -0,0 +1,135 @@
+import time
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from django.core.validators import EMPTY_VALUES
+from django.db import connections
+
+
+class ModelEstimate(NamedTuple):
+    """The estimated cost of applying the strategy of a model."""
+
+    model_name: str
+    strategy: str
+    rows: int
+    # Seconds to generate the new values, None if nothing is generated
+    seconds: float | None
+    warnings: list[str]
+
+
+def estimate_row_count(model, using):
+    """
+    Return the (estimated) number of rows in the table of model. On PostgreSQL
+    this comes from the catalog statistics, without scanning the table. Other
+    databases (and tables that were never analyzed) use COUNT.
+    """
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return int(row[0])
+    return model._base_manager.using(using).count()
+
+
+def sample_values(function, count):
+    # Imported here, faker is only required to anonymize
+    from faker.exceptions import UniquenessException  # noqa: PLC0415
+
+    values = []
+    start = time.perf_counter()
+    try:
+        while len(values) < count:
+            values.append(function())
+    except UniquenessException:
+        # Faker's unique proxy ran out of values
+        pass
+    return values, (time.perf_counter() - start) / max(len(values), 1)
+
+
+def sample_function(function, count):
+    """
+    Call function (which takes no arguments) up to count times. Return the
+    values and the average duration of a call.
+
+    The calls are made in a new thread, which gets its own Faker (see
+    fake.ThreadLocalFaker): sampling doesn't use up the values of the unique
+    proxy of the run. Sampling stops early if the unique proxy runs out of
+    values.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(sample_values, function, count).result()
+
+
+def estimate_domain_size(values):
+    """
+    Estimate the number of distinct values a generator returns from a sample of
+    its values. A sample of n values from d distinct values has about
+    n * (n - 1) / (2 * d) pairs of equal values (the birthday problem).
+
+    Returns None if all values are distinct, the generator then has (many) more
+    distinct values than the sample size.
+    """
+    counts = Counter(repr(value) for value in values)
+    pairs = sum(count * (count - 1) // 2 for count in counts.values())
+    if not pairs:
+        return None
+    return round(len(values) * (len(values) - 1) / (2 * pairs))
+
+
+def estimate_plan(qs, plan, rows, sample_size=1000):
+    """
+    Estimate the time it takes to generate the new values of rows rows of qs
+    according to plan, by timing the generation of sample_size values per field.
+    Return the estimate and a list of warnings.
+
+    Unique fields are checked for generators with fewer distinct values than
+    there are rows. Anonymizer functions that need model instances are not
+    called, they could change the data (e.g. the files of image fields).
+    """
+    seconds = 0.0
+    warnings = []
+
+    for field_plan in plan:
+        field = field_plan.field
+        if not field_plan.takes_arguments:
+            values, duration = sample_function(field_plan.value_func, sample_size)
+            # A unique proxy that ran out returned all its distinct values
+            domain_size = (
+                estimate_domain_size(values)
+                if len(values) == sample_size
+                else len(values)
+            )
+            if field.unique and domain_size is not None and domain_size < rows:
+                warnings.append(
+                    f"{field.name} is unique, but its generator only returns about"
+                    f" {domain_size} distinct values for {rows} rows."
+                )
+        elif column_function := getattr(field_plan.value_func, "column_function", None):
+            values = [
+                value
+                for value in qs.values_list(field.attname, flat=True)[:sample_size]
+                if value not in EMPTY_VALUES
+            ]
+            if not values:
+                continue
+            start = time.perf_counter()
+            column_function(values)
+            duration = (time.perf_counter() - start) / len(values)
+        else:
+            warnings.append(
+                f"{field.name} is anonymized with"
+                f" {getattr(field_plan.value_func, '__name__', field_plan.value_func)},"
+                " which is not included in the estimate."
+            )
+            continue
+
+        seconds += duration * rows
+
+    return seconds, warnings
@@ -0,0 +1,82 @@
+import csv
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from leukeleu_django_gdpr.gdpr import read_data
+from leukeleu_django_gdpr.relations import iter_related_rows
+
+
+def get_pii_field_names(models):
+    """Return the names of the concrete PII fields per model label."""
+    pii_field_names = {}
+    for model_label, model_data in models.items():
+        model = apps.get_model(model_label)
+        pii_field_names[model_label] = [
+            field_name
+            for field_name, field_data in model_data["fields"].items()
+            if field_data["pii"] and model._meta.get_field(field_name).concrete
+        ]
+    return pii_field_names
+
+
+def iter_subject_data(subject_pks, subject_model=None, models=None, batch_size=1000):
+    """
+    Yield the PII of one or more subjects (by default: users) as dicts with the
+    model label, primary key and PII fields of each row that belongs to them,
+    i.e. that (indirectly) refers to them. See relations.iter_related_rows.
+
+    The rows are streamed, only the primary keys are kept in memory.
+    """
+    subject_model = subject_model or apps.get_model(settings.AUTH_USER_MODEL)
+    if models is None:
+        models = read_data().get("models", {})
+    pii_field_names = get_pii_field_names(models)
+
+    def get_columns(model):
+        return [
+            model._meta.get_field(field_name).attname
+            for field_name in pii_field_names.get(model._meta.label, [])
+        ]
+
+    related_rows = iter_related_rows(
+        subject_model, subject_pks, get_columns=get_columns, batch_size=batch_size
+    )
+    for model, rows in related_rows:
+        field_names = pii_field_names.get(model._meta.label)
+        if not field_names:
+            continue
+        for pk, *values in rows:
+            yield {
+                "model": model._meta.label,
+                "pk": pk,
+                "fields": dict(zip(field_names, values, strict=True)),
+            }
+
+
+def write_json(records, stream):
+    """Write records to stream as a JSON array, one record at a time."""
+    stream.write("[")
+    for index, record in enumerate(records):
+        stream.write(",\n" if index else "\n")
+        json.dump(record, stream, cls=DjangoJSONEncoder)
+    stream.write("\n]\n")
+
+
+def write_csv(records, stream):
+    """Write records to stream as CSV, with a line per field."""
+    writer = csv.writer(stream)
+    writer.writerow(["model", "pk", "field", "value"])
+    for record in records:
+        for field_name, value in record["fields"].items():
+            if isinstance(value, dict | list):
+                value = json.dumps(value, cls=DjangoJSONEncoder)  # noqa: PLW2901
+            writer.writerow([record["model"], record["pk"], field_name, value])
+
+
+WRITERS = {
+    "json": write_json,
+    "csv": write_csv,
+}
@@ -0,0 +1,52 @@
+import threading
+
+from functools import wraps
+
+
+class ThreadLocalProxy:
+    """
+    Looks up the attributes of the object returned by get_object when they are
+    used. Methods are looked up when they're called, so a method of the proxy
+    can be stored (e.g. in the overrides) and shared by threads that each get
+    their own object.
+    """
+
+    def __init__(self, get_object):
+        self._get_object = get_object
+
+    def __getattr__(self, name):
+        value = getattr(self._get_object(), name)
+        if name == "unique":
+            # Faker's unique proxy, which keeps the values it returned
+            return ThreadLocalProxy(lambda: getattr(self._get_object(), name))
+        if not callable(value):
+            return value
+
+        @wraps(value)
+        def method(*args, **kwargs):
+            return getattr(self._get_object(), name)(*args, **kwargs)
+
+        return method
+
+
+class ThreadLocalFaker(ThreadLocalProxy):
+    """
+    A Faker instance per thread, so the values returned by its unique proxy are
+    unique per thread and the proxy is never used by two threads at the same
+    time. faker is only imported when the proxy is first used.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(self.get_faker)
+        self._args = args
+        self._kwargs = kwargs
+        self._local = threading.local()
+
+    def get_faker(self):
+        try:
+            return self._local.faker
+        except AttributeError:
+            from faker import Faker  # noqa: PLC0415
+
+            self._local.faker = Faker(*self._args, **self._kwargs)
+            return self._local.faker
@@ -1,11 +1,11 @@
 import re
+import time
 
 from collections import Counter
+from contextlib import contextmanager
 from itertools import chain
 from pathlib import Path
 
-import yaml
-
 from django.apps import apps
 from django.conf import settings
 from django.db import models
@@ -23,6 +23,9 @@ def get_gdpr_yml_path():
 def read_data():
     path = get_gdpr_yml_path()
     if path.exists():
+        # Imported here, checks (and so every process) import this module
+        import yaml  # noqa: PLC0415
+
         with path.open() as f:
             data = yaml.safe_load(f)
     else:
@@ -121,13 +124,18 @@ class Serializer:
                 yield model_label, model_dict
 
     def apply_existing_input_data(self, input_data):
-        for model_label in self.models:
+        for model_label, model_dict in self.models.items():
+            model_dict.update(get_manual_input_for_model(input_data, model_label))
+            # Keep the fields last
+            model_dict["fields"] = model_dict.pop("fields")
             for field_label in self.models[model_label]["fields"]:
                 self.models[model_label]["fields"][field_label].update(
                     get_manual_input_for_field(input_data, model_label, field_label)
                 )
 
     def save(self, stream):
+        import yaml  # noqa: PLC0415
+
         yaml.dump(
             {
                 "exclude": self.exclude_list,
@@ -166,6 +174,15 @@ def serialize_field(field):
 
 
 EXPLANATION_KEY = "explanation"
+DOMAIN_KEY = "domain"
+PII_PATHS_KEY = "pii_paths"
+STRATEGY_KEY = "strategy"
+WHERE_KEY = "where"
+ANONYMIZE = "anonymize"
+TRUNCATE = "truncate"
+DELETE_WHERE = "delete_where"
+SKIP = "skip"
+STRATEGIES = (ANONYMIZE, TRUNCATE, DELETE_WHERE, SKIP)
 DEFAULT_EXCLUDED_APPS = (
     "django.contrib.admin",
     "django.contrib.contenttypes",
@@ -187,6 +204,11 @@ def pii_stats(models):
     return counter
 
 
+def get_manual_input_for_model(data, model_label):
+    model = data.get(model_label, {})
+    return {key: model[key] for key in (STRATEGY_KEY, WHERE_KEY) if model.get(key)}
+
+
 def get_manual_input_for_field(data, model_label, field_label):
     model = data.get(model_label)
     if model:
@@ -194,12 +216,51 @@ def get_manual_input_for_field(data, model_label, field_label):
         input_data = {
             "pii": field.get("pii", None),
         }
-        if field.get(EXPLANATION_KEY):
-            input_data[EXPLANATION_KEY] = field[EXPLANATION_KEY]
+        for key in (EXPLANATION_KEY, DOMAIN_KEY, PII_PATHS_KEY):
+            if field.get(key):
+                input_data[key] = field[key]
         return input_data
     return {}
 
 
+@contextmanager
+def timed(timings, phase):
+    """
+    Store the duration of the block (in seconds) in timings[phase].
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - start
+
+
+def get_serializer(save=False, timings=None):  # noqa: FBT002
+    """
+    Returns a Serializer with the data for all models, with any data from an
+    existing gdpr.yml taken into account. If save is True, the data is saved
+    to gdpr.yml.
+
+    If timings is a dict, the duration of each phase (load, introspect, merge
+    and save) is stored in it.
+    """
+    timings = {} if timings is None else timings
+    with timed(timings, "load"):
+        data = read_data()
+    # Previous versions used "ignore", migrate to "exclude"
+    exclude_list = data.get("exclude", data.get("ignore", []))
+    serializer = Serializer(exclude_list=exclude_list, include_list=data.get("include"))
+    with timed(timings, "introspect"):
+        serializer.generate_models_list()
+    with timed(timings, "merge"):
+        serializer.apply_existing_input_data(data.get("models", {}))
+    if save:
+        with timed(timings, "save"), get_gdpr_yml_path().open("w") as f:
+            serializer.save(f)
+
+    return serializer
+
+
 def get_pii_stats(save=False):  # noqa: FBT002
     """
     Determines the PII stats for all models. Any data from an existing
@@ -211,14 +272,56 @@ def get_pii_stats(save=False):  # noqa: FBT002
         * True: all fields that have been classified as PII
         * False: all fields that have been classified as non-PII.
     """
-    data = read_data()
-    # Previous versions used "ignore", migrate to "exclude"
-    exclude_list = data.get("exclude", data.get("ignore", []))
-    serializer = Serializer(exclude_list=exclude_list, include_list=data.get("include"))
-    serializer.generate_models_list()
-    serializer.apply_existing_input_data(data.get("models", {}))
-    if save:
-        with get_gdpr_yml_path().open("w") as f:
-            serializer.save(f)
+    return pii_stats(get_serializer(save=save).models)
+
 
-    return pii_stats(serializer.models)
+def _pii_counts(counter):
+    return {
+        "true": counter[True],
+        "false": counter[False],
+        "null": counter[None],
+    }
+
+
+def pii_report(models):
+    """
+    Returns the PII counts in total, per app and per model and the labels of
+    the fields that have not been classified.
+    """
+    apps_counters = {}
+    unclassified = []
+    for model_label, model in models.items():
+        app_label = model_label.split(".")[0]
+        model_counter = pii_stats({model_label: model})
+        app_data = apps_counters.setdefault(
+            app_label, {"counter": Counter(), "models": {}}
+        )
+        app_data["counter"] += model_counter
+        app_data["models"][model_label] = _pii_counts(model_counter)
+        unclassified.extend(
+            f"{model_label}.{field_label}"
+            for field_label, field in model["fields"].items()
+            if field["pii"] is None
+        )
+
+    return {
+        "pii": _pii_counts(pii_stats(models)),
+        "apps": {
+            app_label: {
+                "pii": _pii_counts(app_data["counter"]),
+                "models": app_data["models"],
+            }
+            for app_label, app_data in apps_counters.items()
+        },
+        "unclassified": unclassified,
+    }
+
+
+def get_pii_report(save=False):  # noqa: FBT002
+    """
+    Like get_pii_stats, but returns a pii_report with the duration of each
+    phase (in seconds) under "timings".
+    """
+    timings = {}
+    serializer = get_serializer(save=save, timings=timings)
+    return {**pii_report(serializer.models), "timings": timings}
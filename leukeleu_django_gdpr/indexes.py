@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+
+# Indexes on (one of) the columns that can be dropped and recreated: indexes
+# that don't enforce a constraint (unique, primary key or exclusion)
+DEFERRABLE_INDEXES_SQL = """
+SELECT index.relname, pg_get_indexdef(pg_index.indexrelid)
+FROM pg_index
+JOIN pg_class index ON index.oid = pg_index.indexrelid
+WHERE pg_index.indrelid = %s::regclass
+  AND NOT pg_index.indisunique
+  AND NOT pg_index.indisprimary
+  AND NOT EXISTS (
+    SELECT FROM pg_constraint WHERE pg_constraint.conindid = pg_index.indexrelid
+  )
+  AND EXISTS (
+    SELECT FROM pg_attribute
+    WHERE pg_attribute.attrelid = pg_index.indrelid
+      AND pg_attribute.attnum = ANY(pg_index.indkey)
+      AND pg_attribute.attname = ANY(%s)
+  )
+ORDER BY index.relname
+"""
+
+
+def can_defer_indexes(using):
+    """
+    Whether deferred_indexes drops indexes and disables triggers, which requires
+    PostgreSQL's transactional DDL to restore them reliably.
+    """
+    return connections[using].vendor == "postgresql"
+
+
+def get_deferrable_indexes(model, columns, using):
+    """
+    Return (name, definition) tuples for the indexes on (one of) the columns of
+    model's table that can be dropped and recreated with their definition.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            DEFERRABLE_INDEXES_SQL,
+            [connection.ops.quote_name(model._meta.db_table), list(columns)],
+        )
+        return cursor.fetchall()
+
+
+@contextmanager
+def deferred_indexes(model, columns, using):
+    """
+    Drop the indexes on (one of) the columns of model's table that don't enforce
+    a constraint and disable its user triggers (e.g. audit or full-text search
+    triggers) while the block runs, then enable the triggers and recreate the
+    indexes.
+
+    Everything runs in a transaction (or savepoint), so the indexes and triggers
+    are restored by PostgreSQL when the block fails. Does nothing on other
+    databases.
+    """
+    if not can_defer_indexes(using):
+        yield
+        return
+
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+
+    with transaction.atomic(using=using):
+        indexes = get_deferrable_indexes(model, columns, using)
+        with connection.cursor() as cursor:
+            for name, _definition in indexes:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+            cursor.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+
+        yield
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+            for _name, definition in indexes:
+                cursor.execute(definition)
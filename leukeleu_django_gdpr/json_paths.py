@@ -0,0 +1,194 @@
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from leukeleu_django_gdpr.mask import DIGIT_PATTERN, mask_text
+from leukeleu_django_gdpr.relations import anonymizes_column
+
+WILDCARD = "*"
+
+# Temporary functions that mask text and JSON values like mask_text and
+# mask_json_value do: letters and digits are replaced per character class, the
+# digits of numbers are replaced and arrays and objects are masked recursively
+MASK_JSON_FUNCTIONS_SQL = """
+CREATE OR REPLACE FUNCTION pg_temp.gdpr_mask_text(value text, digits_only boolean)
+RETURNS text AS $$
+BEGIN
+  RETURN coalesce((
+    SELECT string_agg(
+      CASE
+        WHEN NOT digits_only AND c ~ '[A-ZÀ-ÖØ-Þ]'
+          THEN chr(65 + floor(random() * 26)::int)
+        WHEN NOT digits_only AND c ~ '[[:alpha:]]'
+          THEN chr(97 + floor(random() * 26)::int)
+        WHEN c ~ '[0-9]' THEN chr(48 + floor(random() * 10)::int)
+        ELSE c
+      END,
+      '' ORDER BY i
+    )
+    FROM regexp_split_to_table(value, '') WITH ORDINALITY AS chars(c, i)
+  ), '');
+END
+$$ LANGUAGE plpgsql VOLATILE;
+
+CREATE OR REPLACE FUNCTION pg_temp.gdpr_mask_jsonb(value jsonb)
+RETURNS jsonb AS $$
+BEGIN
+  RETURN CASE jsonb_typeof(value)
+    WHEN 'string' THEN to_jsonb(pg_temp.gdpr_mask_text(value #>> '{}', false))
+    WHEN 'number'
+      THEN to_jsonb(pg_temp.gdpr_mask_text(value #>> '{}', true)::numeric)
+    WHEN 'object' THEN (
+      SELECT coalesce(
+        jsonb_object_agg(key, pg_temp.gdpr_mask_jsonb(item)), '{}'::jsonb
+      )
+      FROM jsonb_each(value) AS items(key, item)
+    )
+    WHEN 'array' THEN (
+      SELECT coalesce(
+        jsonb_agg(pg_temp.gdpr_mask_jsonb(item) ORDER BY i), '[]'::jsonb
+      )
+      FROM jsonb_array_elements(value) WITH ORDINALITY AS items(item, i)
+    )
+    ELSE value
+  END;
+END
+$$ LANGUAGE plpgsql VOLATILE;
+"""
+
+# Masks the value at the path given by the parameters (the same path twice)
+MASK_JSON_PATH_SQL = "jsonb_set({column}, %s, pg_temp.gdpr_mask_jsonb({column} #> %s))"
+
+
+def parse_paths(paths):
+    """
+    Split dotted key paths (e.g. "contact.email" or "addresses.*.street") into
+    tuples of keys. A "*" matches every key of an object or item of an array,
+    array items can also be selected by their index.
+    """
+    return [tuple(path.split(".")) for path in paths]
+
+
+def mask_json_value(value):
+    """Mask a JSON value, masking all strings and numbers in arrays and objects."""
+    if isinstance(value, str):
+        return mask_text(value)
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int | float):
+        return type(value)(mask_text(str(value), pattern=DIGIT_PATTERN))
+    if isinstance(value, dict):
+        return {key: mask_json_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [mask_json_value(item) for item in value]
+    return value
+
+
+def mask_json(value, paths):
+    """
+    Mask the values at paths (as returned by parse_paths) in a decoded JSON
+    document, leaving the rest of the document as-is.
+
+    The document is walked once, following only the keys that are (a prefix of)
+    one of the paths.
+    """
+    if not paths:
+        return value
+    if () in paths:
+        # The path ends here, mask the whole value
+        return mask_json_value(value)
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        # The path does not exist in this document
+        return value
+
+    masked = {
+        key: mask_json(
+            item, [path[1:] for path in paths if path[0] in {WILDCARD, str(key)}]
+        )
+        for key, item in items
+    }
+    return masked if isinstance(value, dict) else list(masked.values())
+
+
+def iter_json_values(value):
+    """Yield the strings and numbers in a JSON value, which mask_json_value masks."""
+    if isinstance(value, dict | list):
+        for item in value.values() if isinstance(value, dict) else value:
+            yield from iter_json_values(item)
+    elif not isinstance(value, bool) and value is not None:
+        yield value
+
+
+def iter_json_path_values(value, paths):
+    """
+    Yield the strings and numbers at paths (as returned by parse_paths) in a
+    decoded JSON document, i.e. the values mask_json masks.
+    """
+    if not paths:
+        return
+    if () in paths:
+        yield from iter_json_values(value)
+        return
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return
+
+    for key, item in items:
+        yield from iter_json_path_values(
+            item, [path[1:] for path in paths if path[0] in {WILDCARD, str(key)}]
+        )
+
+
+def json_paths_anonymizer(paths):
+    """Return an AnonymizerFunction that masks paths in a JSONField."""
+    parsed_paths = parse_paths(paths)
+
+    @anonymizes_column(
+        lambda values: [mask_json(value, parsed_paths) for value in values]
+    )
+    def anonymize_json_paths(obj, field):
+        return mask_json(getattr(obj, field.attname), parsed_paths)
+
+    return anonymize_json_paths
+
+
+def can_update_json_paths_in_db(paths, using, domain=None):
+    """
+    Whether update_json_paths_in_db can be used, which requires PostgreSQL's
+    jsonb functions. Paths with wildcards can't be expressed in jsonb_set, and
+    the values of fields with a domain are replaced by their pseudonyms.
+    """
+    return (
+        connections[using].vendor == "postgresql"
+        and not domain
+        and not any(WILDCARD in path for path in parse_paths(paths))
+    )
+
+
+def update_json_paths_in_db(qs, field, paths):
+    """
+    Mask paths in a JSONField of all rows in qs with one UPDATE per path,
+    without loading the documents. The values are masked like mask_json does.
+    """
+    connection = connections[qs.db]
+    with connection.cursor() as cursor:
+        cursor.execute(MASK_JSON_FUNCTIONS_SQL)
+
+    column = connection.ops.quote_name(field.column)
+    sql = MASK_JSON_PATH_SQL.format(column=column)
+    for path in parse_paths(paths):
+        path_param = list(path)
+        lookup = "__".join([field.name, *path, "isnull"])
+        qs.filter(**{lookup: False}).update(
+            **{
+                field.attname: RawSQL(  # noqa: S611
+                    sql, [path_param] * 2, output_field=field
+                )
+            }
+        )
@@ -1,9 +1,13 @@
+from django.apps import apps
 from django.conf import settings
 from django.core.management import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
 from django.utils.module_loading import import_string
 
 from leukeleu_django_gdpr.anonymize import BaseAnonymizer
 from leukeleu_django_gdpr.gdpr import get_pii_stats
+from leukeleu_django_gdpr.profiling import Profiler
+from leukeleu_django_gdpr.throttle import Throttle
 
 
 def get_anonymizer():
@@ -20,8 +24,239 @@ class Command(BaseCommand):
     Currently, fields that are *not* required will still be anonymized.
     """
 
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only anonymize rows that were added or changed since the previous"
+                " incremental run."
+            ),
+        )
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            help=(
+                "Database to anonymize (or dump), can be given multiple times."
+                " Defaults to the databases returned by the anonymizer's"
+                " get_databases, the 'default' database."
+            ),
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help=(
+                "Number of databases to anonymize (or models to dump, each to its"
+                " own file) in parallel."
+            ),
+        )
+        parser.add_argument(
+            "--defer-indexes",
+            action="store_true",
+            help=(
+                "Drop the indexes on PII columns and disable the user triggers of"
+                " each table while it's anonymized, then restore them"
+                " (PostgreSQL only)."
+            ),
+        )
+        parser.add_argument(
+            "--profile",
+            metavar="DIRECTORY",
+            help=(
+                "Write a cProfile profile per model and a summary of the slowest"
+                " fields to this directory."
+            ),
+        )
+        parser.add_argument(
+            "--profile-top",
+            type=int,
+            default=20,
+            help="Number of fields in the summary of --profile (default: 20).",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help=(
+                "Fingerprint the values of the PII fields before anonymizing and"
+                " report fields that still contain original values afterwards."
+            ),
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help=(
+                "Print the number of rows, the estimated time and warnings for"
+                " each model, without changing any data."
+            ),
+        )
+        online_group = parser.add_argument_group(
+            "online",
+            "Anonymize a database that is in use: delete and anonymize rows in"
+            " small batches, each in its own transaction, at a limited pace.",
+        )
+        online_group.add_argument(
+            "--online",
+            action="store_true",
+            help="Anonymize in throttled batches instead of a single transaction.",
+        )
+        online_group.add_argument(
+            "--rows-per-second",
+            type=float,
+            help="Maximum number of rows to process per second.",
+        )
+        online_group.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of rows per batch (default: 100).",
+        )
+        online_group.add_argument(
+            "--lock-timeout",
+            type=int,
+            default=1000,
+            help=(
+                "Lock timeout of each batch in milliseconds, batches that time out"
+                " are retried (default: 1000, PostgreSQL only)."
+            ),
+        )
+        online_group.add_argument(
+            "--statement-timeout",
+            type=int,
+            default=30_000,
+            help=(
+                "Statement timeout of each batch in milliseconds (default: 30000,"
+                " PostgreSQL only)."
+            ),
+        )
+        online_group.add_argument(
+            "--max-latency",
+            type=float,
+            help="Back off while batches take longer than this many seconds.",
+        )
+        online_group.add_argument(
+            "--max-replication-lag",
+            type=float,
+            help=(
+                "Back off while the replication lag is more than this many seconds"
+                " (PostgreSQL only)."
+            ),
+        )
+        subset_group = parser.add_argument_group(
+            "subset",
+            "Delete all but a random sample of the subjects (and the rows that refer"
+            " to them) before anonymizing, to create a small development database.",
+        )
+        subset_group.add_argument(
+            "--subset-count",
+            type=int,
+            help="Number of subjects to keep.",
+        )
+        subset_group.add_argument(
+            "--subset-percentage",
+            type=float,
+            help="Percentage of the subjects to keep.",
+        )
+        subset_group.add_argument(
+            "--subset-model",
+            default=settings.AUTH_USER_MODEL,
+            help="Label of the subject model (default: the user model).",
+        )
+        dump_group = parser.add_argument_group(
+            "dump",
+            "Write an anonymized dump (in the JSON Lines format of dumpdata and"
+            " loaddata) instead of anonymizing the database itself.",
+        )
+        dump_group.add_argument(
+            "--output",
+            help=(
+                "Write the anonymized dump to this file (or directory, when using"
+                " --jobs)."
+            ),
+        )
+        dump_group.add_argument(
+            "--input",
+            help=(
+                "Anonymize this dump (created with `dumpdata --format jsonl`)"
+                " instead of the data in the database."
+            ),
+        )
+
+    def check_options(self, options):
+        output = options["output"]
+        subset = (
+            options["subset_count"] is not None
+            or options["subset_percentage"] is not None
+        )
+        self.check_online_options(options, output=output, subset=subset)
+        if options["explain"] and (output or subset):
+            raise CommandError(
+                "--explain can't be combined with --output and --subset-*."
+            )
+        if options["defer_indexes"] and output:
+            raise CommandError("--defer-indexes can't be combined with --output.")
+        if options["profile"] and (output or options["explain"]):
+            raise CommandError(
+                "--profile can't be combined with --output and --explain."
+            )
+        if options["profile"] and options["jobs"] != 1:
+            raise CommandError("--profile can't be combined with --jobs.")
+        if options["verify"] and (
+            output or subset or options["incremental"] or options["explain"]
+        ):
+            raise CommandError(
+                "--verify can't be combined with --output, --subset-*,"
+                " --incremental and --explain."
+            )
+        if options["input"] and not output:
+            raise CommandError("--input requires --output.")
+        if (output or subset) and len(options["databases"] or []) > 1:
+            raise CommandError(
+                "Only one --database can be used with --output and --subset-*."
+            )
+        if output and (options["incremental"] or subset):
+            raise CommandError(
+                "--incremental and --subset-* can't be combined with --output."
+            )
+        if options["input"] and options["jobs"] != 1:
+            raise CommandError("--jobs can't be combined with --input.")
+        if subset and options["incremental"]:
+            raise CommandError("--subset-* can't be combined with --incremental.")
+        if (
+            options["subset_count"] is not None
+            and options["subset_percentage"] is not None
+        ):
+            raise CommandError(
+                "--subset-count can't be combined with --subset-percentage."
+            )
+
+    def check_online_options(self, options, *, output, subset):  # noqa: PLR6301
+        if not options["online"]:
+            return
+        if any(
+            (
+                output,
+                subset,
+                options["incremental"],
+                options["explain"],
+                options["defer_indexes"],
+                options["profile"],
+            )
+        ):
+            raise CommandError(
+                "--online can't be combined with --output, --subset-*,"
+                " --incremental, --explain, --defer-indexes and --profile."
+            )
+        if options["jobs"] != 1:
+            raise CommandError("--online can't be combined with --jobs.")
+
     def handle(self, *args, **options):
-        if not settings.DEBUG:
+        self.check_options(options)
+        output = options["output"]
+
+        # Writing a dump (or explaining) leaves the database alone
+        if not output and not options["explain"] and not settings.DEBUG:
             raise CommandError("You can only run this command in DEBUG mode.")
 
         stats = get_pii_stats(save=False)
@@ -32,10 +267,123 @@ class Command(BaseCommand):
                 "Run `manage.py gdpr` first and classify all fields."
             )
 
-        get_anonymizer().anonymize()
+        anonymizer = get_anonymizer()
+        profiler = options["profile"] and Profiler(
+            options["profile"], top=options["profile_top"]
+        )
+        # --output and --subset-* use a single database
+        using = (options["databases"] or [DEFAULT_DB_ALIAS])[0]
+
+        if options["explain"]:
+            databases = options["databases"] or anonymizer.get_databases()
+            for using in databases:
+                if len(databases) > 1:
+                    self.stdout.write(f"Database {using}:")
+                self.write_estimates(anonymizer.explain(using=using))
+            return
+
+        if options["input"]:
+            with (
+                open(options["input"], encoding="utf-8") as input_file,
+                open(output, "w", encoding="utf-8") as output_file,
+            ):
+                anonymizer.dump_file(input_file, output_file)
+        elif output:
+            anonymizer.dump(output, using=using, jobs=options["jobs"])
+        else:
+            self.anonymize(anonymizer, profiler, using, options)
+            if profiler:
+                for line in profiler.write_summary():
+                    self.stdout.write(line)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Successfully anonymized data. Make sure to check it.",
+                )
+            )
+            return
 
         self.stdout.write(
             self.style.SUCCESS(
-                "Successfully anonymized data. Make sure to check it.",
+                f"Successfully wrote anonymized data to {output}. Make sure to check"
+                " it.",
             )
         )
+
+    def anonymize(self, anonymizer, profiler, using, options):
+        if (
+            options["subset_count"] is not None
+            or options["subset_percentage"] is not None
+        ):
+            with transaction.atomic(using=using):
+                anonymizer.subset(
+                    count=options["subset_count"],
+                    fraction=(
+                        None
+                        if options["subset_percentage"] is None
+                        else options["subset_percentage"] / 100
+                    ),
+                    root_model=apps.get_model(options["subset_model"]),
+                    using=using,
+                )
+                anonymizer.anonymize(
+                    using=using,
+                    defer_indexes=options["defer_indexes"],
+                    profiler=profiler,
+                )
+        else:
+            databases = options["databases"] or anonymizer.get_databases()
+            fingerprints = options["verify"] and {
+                database: anonymizer.fingerprint(using=database)
+                for database in databases
+            }
+            if options["online"]:
+                throttle = Throttle(
+                    rows_per_second=options["rows_per_second"],
+                    batch_size=options["batch_size"],
+                    lock_timeout=options["lock_timeout"],
+                    statement_timeout=options["statement_timeout"],
+                    max_latency=options["max_latency"],
+                    max_replication_lag=options["max_replication_lag"],
+                )
+                for database in databases:
+                    anonymizer.anonymize_online(throttle, using=database)
+            else:
+                anonymizer.anonymize_databases(
+                    databases,
+                    incremental=options["incremental"],
+                    jobs=options["jobs"],
+                    defer_indexes=options["defer_indexes"],
+                    profiler=profiler,
+                )
+            if fingerprints:
+                for database, database_fingerprints in fingerprints.items():
+                    self.verify(anonymizer, database_fingerprints, database)
+
+    def verify(self, anonymizer, fingerprints, using):
+        leaks = anonymizer.verify(fingerprints, using=using)
+        suffix = "" if using == DEFAULT_DB_ALIAS else f" ({using})"
+        for leak in leaks:
+            field_path = f"{leak.model_name}.{leak.field_name}{suffix}"
+            if leak.rows:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"{field_path}: {leak.rows} rows still contain an original"
+                        f" value, e.g. pk {', '.join(map(str, leak.example_pks))}."
+                    )
+                )
+            if leak.excluded_rows:
+                self.stdout.write(
+                    f"{field_path}: {leak.excluded_rows} rows excluded by the"
+                    " queryset override contain an original value."
+                )
+        if any(leak.rows for leak in leaks):
+            raise CommandError("Original values were found after anonymizing.")
+
+    def write_estimates(self, estimates):
+        for estimate in estimates:
+            line = f"{estimate.model_name}: {estimate.strategy}, {estimate.rows} rows"
+            if estimate.seconds is not None:
+                line += f", ~{estimate.seconds:.1f}s"
+            self.stdout.write(line)
+            for warning in estimate.warnings:
+                self.stdout.write(self.style.WARNING(f"  {warning}"))
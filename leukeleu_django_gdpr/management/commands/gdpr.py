@@ -1,10 +1,23 @@
+import json
+
 from django.core.management import BaseCommand, CommandError
 
-from leukeleu_django_gdpr.gdpr import get_pii_stats
+from leukeleu_django_gdpr.gdpr import get_pii_report, read_data
+from leukeleu_django_gdpr.profiling import Profiler
+from leukeleu_django_gdpr.scan import DETECTORS, scan
 
 
 class Command(BaseCommand):
     def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "action",
+            nargs="?",
+            choices=["scan"],
+            help=(
+                "Use 'scan' to check the data in the database for values that look"
+                " like PII, instead of updating gdpr.yml."
+            ),
+        )
         parser.add_argument(
             "--check",
             action="store_true",
@@ -18,20 +31,132 @@ class Command(BaseCommand):
             action="store_true",
             help="Don't save the new data to the file.",
         )
+        parser.add_argument(
+            "--format",
+            choices=["text", "json"],
+            default="text",
+            help=(
+                "Output format (default: text). The json format includes the counts"
+                " per app and model, the unclassified fields and timings."
+            ),
+        )
+        parser.add_argument(
+            "--profile",
+            metavar="DIRECTORY",
+            help="Write a cProfile profile of the run to this directory.",
+        )
+        scan_group = parser.add_argument_group("scan")
+        scan_group.add_argument(
+            "--sample-rate",
+            type=float,
+            default=1.0,
+            help="Fraction of the rows to scan (default: 1.0, all rows).",
+        )
+        scan_group.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maximum number of rows to scan per model (default: no limit).",
+        )
+        scan_group.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="Number of worker processes to scan with (default: 1).",
+        )
+        scan_group.add_argument(
+            "--min-hit-rate",
+            type=float,
+            default=0.01,
+            help=(
+                "Report fields not classified as PII if at least this fraction of"
+                " the values looks like PII (default: 0.01)."
+            ),
+        )
 
     def handle(self, *args, **options):
-        self.stdout.write("Checking...")
-        stats = get_pii_stats(save=not options["dry_run"])
+        if options["action"] == "scan" and options["format"] != "text":
+            raise CommandError("--format is not supported by scan.")
+
+        if not options["profile"]:
+            self.handle_action(**options)
+            return
+
+        profiler = Profiler(options["profile"])
+        try:
+            with profiler.profile(options["action"] or "gdpr"):
+                self.handle_action(**options)
+        finally:
+            for line in profiler.write_summary():
+                self.stderr.write(line)
+
+    def handle_action(self, **options):
+        if options["action"] == "scan":
+            self.handle_scan(**options)
+            return
 
-        unclassified_fields = stats.get(None, 0)
+        if options["format"] == "json":
+            report = get_pii_report(save=not options["dry_run"])
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.stdout.write("Checking...")
+            report = get_pii_report(save=not options["dry_run"])
+            self.write_report(report, verbosity=options["verbosity"])
+
+        unclassified_fields = report["pii"]["null"]
+        if options["check"] and unclassified_fields:
+            raise CommandError(
+                f"There are still {unclassified_fields} unclassified PII fields"
+            )
+
+    def write_report(self, report, verbosity):
+        unclassified_fields = report["pii"]["null"]
         self.stdout.write(
             f"PII not set    {unclassified_fields}",
             style_func=self.style.ERROR if unclassified_fields else self.style.SUCCESS,
         )
-        self.stdout.write(f"PII True       {stats.get(True, 0)}")
-        self.stdout.write(f"PII False      {stats.get(False, 0)}")
+        self.stdout.write(f"PII True       {report['pii']['true']}")
+        self.stdout.write(f"PII False      {report['pii']['false']}")
 
-        if options["check"] and unclassified_fields:
+        if verbosity > 1:
+            for phase, duration in report["timings"].items():
+                self.stdout.write(f"{phase.capitalize():<15}{duration:.3f}s")
+
+    def handle_scan(self, **options):
+        self.stdout.write("Scanning...")
+        suspicious_fields = 0
+
+        results = scan(
+            read_data().get("models", {}),
+            sample_rate=options["sample_rate"],
+            limit=options["limit"],
+            jobs=options["jobs"],
+        )
+        for field_label, pii, counter in results:
+            rows = counter["rows"]
+            hit_rates = {
+                name: counter[name] / rows for name in DETECTORS if counter[name]
+            }
+            suspicious = not pii and any(
+                hit_rate >= options["min_hit_rate"] for hit_rate in hit_rates.values()
+            )
+            suspicious_fields += suspicious
+
+            hits = ", ".join(
+                f"{name} {hit_rate:.1%}" for name, hit_rate in hit_rates.items()
+            )
+            self.stdout.write(
+                f"{field_label:<60} pii: {pii!s:<5}  rows: {rows:<8}  {hits}".rstrip(),
+                style_func=self.style.WARNING if suspicious else None,
+            )
+
+        self.stdout.write(
+            f"Fields with unclassified PII    {suspicious_fields}",
+            style_func=self.style.ERROR if suspicious_fields else self.style.SUCCESS,
+        )
+
+        if options["check"] and suspicious_fields:
             raise CommandError(
-                f"There are still {unclassified_fields} unclassified PII fields"
+                f"There are {suspicious_fields} fields that contain PII but are not"
+                " classified as PII"
             )
@@ -0,0 +1,79 @@
+import sys
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from leukeleu_django_gdpr.gdpr import get_pii_stats
+from leukeleu_django_gdpr.management.commands.anonymize import get_anonymizer
+
+
+def read_subjects(path):
+    """Yield the subjects listed in a file, one per line ("-" reads stdin)."""
+    if path == "-":
+        yield from (line.strip() for line in sys.stdin if line.strip())
+        return
+    with open(path, encoding="utf-8") as f:
+        yield from (line.strip() for line in f if line.strip())
+
+
+class Command(BaseCommand):
+    """
+    Anonymizes all PII (fields with `pii: True`) that belongs to one or more
+    subjects, e.g. to handle GDPR erasure requests.
+
+    Unlike the anonymize command, this command can be used outside DEBUG mode.
+    """
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "subjects",
+            nargs="*",
+            help="Primary keys of the subjects to erase the data of.",
+        )
+        parser.add_argument(
+            "--file",
+            help=(
+                "File with the primary keys of the subjects to erase the data of,"
+                " one per line. Use '-' to read from stdin."
+            ),
+        )
+        parser.add_argument(
+            "--subject-model",
+            default=settings.AUTH_USER_MODEL,
+            help="Label of the subject model (default: the user model).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of subjects per transaction (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["subjects"] and not options["file"]:
+            raise CommandError("Provide one or more subjects, or a --file.")
+
+        stats = get_pii_stats(save=False)
+        unclassified_fields = stats.get(None, 0)
+        if unclassified_fields:
+            raise CommandError(
+                f"There are still {unclassified_fields} unclassified PII fields. "
+                "Run `manage.py gdpr` first and classify all fields."
+            )
+
+        subjects = options["subjects"]
+        if options["file"]:
+            subjects = [*subjects, *read_subjects(options["file"])]
+
+        get_anonymizer().anonymize_subjects(
+            subjects,
+            subject_model=apps.get_model(options["subject_model"]),
+            batch_size=options["batch_size"],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully anonymized the data of {len(subjects)} subjects."
+            )
+        )
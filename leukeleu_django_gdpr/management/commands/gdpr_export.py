@@ -0,0 +1,56 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from leukeleu_django_gdpr.export import WRITERS, iter_subject_data
+
+
+class Command(BaseCommand):
+    """
+    Exports all PII (fields with `pii: True`) that belongs to one or more
+    subjects, e.g. to answer a GDPR right of access request.
+    """
+
+    def add_arguments(self, parser):  # noqa: PLR6301
+        parser.add_argument(
+            "subjects",
+            nargs="+",
+            help="Primary keys of the subjects to export the data of.",
+        )
+        parser.add_argument(
+            "--subject-model",
+            default=settings.AUTH_USER_MODEL,
+            help="Label of the subject model (default: the user model).",
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(WRITERS),
+            default="json",
+            help="Output format (default: json).",
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write the export to (default: stdout).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Maximum number of values per `__in` query (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        records = iter_subject_data(
+            options["subjects"],
+            subject_model=apps.get_model(options["subject_model"]),
+            batch_size=options["batch_size"],
+        )
+        write = WRITERS[options["format"]]
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as f:
+                write(records, f)
+        else:
+            # The writers take care of line endings themselves
+            self.stdout.ending = ""
+            write(records, self.stdout)
@@ -0,0 +1,58 @@
+import random
+import re
+
+from string import ascii_lowercase, ascii_uppercase, digits
+
+# Translation tables that map every byte to a letter or digit, used to turn random
+# bytes into random characters without a Python call per character.
+MASK_TABLES = {
+    group: bytes.maketrans(bytes(range(256)), (chars * 256)[:256].encode())
+    for group, chars in [
+        ("upper", ascii_uppercase),
+        ("lower", ascii_lowercase),
+        ("digit", digits),
+    ]
+}
+MASK_PATTERN = re.compile(
+    r"(?P<upper>[A-ZÀ-ÖØ-Þ]+)|(?P<lower>[^\W\d_A-ZÀ-ÖØ-Þ]+)|(?P<digit>\d+)"
+)
+DIGIT_PATTERN = re.compile(r"(?P<digit>\d+)")
+# Joins the values of a column, it's neither masked nor part of an HTML tag
+COLUMN_SEPARATOR = "\0"
+# A tag never contains the separator, so it can't span two values of a column
+HTML_MASK_PATTERN = re.compile(
+    rf"(?P<keep><[^>{COLUMN_SEPARATOR}]*>|&#?\w+;)|{MASK_PATTERN.pattern}"
+)
+
+
+def _mask_match(match: re.Match) -> str:
+    if match.lastgroup == "keep":
+        return match[0]
+    random_bytes = random.randbytes(len(match[0]))  # noqa: S311
+    return random_bytes.translate(MASK_TABLES[match.lastgroup]).decode()
+
+
+def mask_text(value: str, pattern: re.Pattern = MASK_PATTERN) -> str:
+    """Replace every letter and digit in value by a random one of the same class.
+
+    Whitespace, punctuation and the length of the text are kept, so the result
+    has the same structure as the original text.
+    """
+    return pattern.sub(_mask_match, value)
+
+
+def mask_html(value: str) -> str:
+    """Mask the text in an HTML fragment, leaving tags and entities intact."""
+    return HTML_MASK_PATTERN.sub(_mask_match, value)
+
+
+def mask_texts(values: list[str], pattern: re.Pattern = MASK_PATTERN) -> list[str]:
+    """Mask a list of values like mask_text, with one regex pass over all of them."""
+    if any(COLUMN_SEPARATOR in value for value in values):
+        return [mask_text(value, pattern) for value in values]
+    return mask_text(COLUMN_SEPARATOR.join(values), pattern).split(COLUMN_SEPARATOR)
+
+
+def mask_htmls(values: list[str]) -> list[str]:
+    """Mask a list of HTML fragments like mask_html."""
+    return mask_texts(values, HTML_MASK_PATTERN)
@@ -0,0 +1,98 @@
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+from array import array
+from pathlib import Path
+
+MAGIC = b"GDPRPOOL"
+# The magic bytes and the number of values, followed by the offsets of the values
+# (one more than the number of values) and the UTF-8 encoded values themselves
+HEADER = struct.Struct("<8sQ")
+OFFSET_SIZE = struct.calcsize("<Q")
+# The offsets of the start and the end of a value
+OFFSETS = struct.Struct("<QQ")
+
+
+def build_value_pool(path, generate, size):
+    """
+    Write a pool of size values returned by generate (which takes no arguments
+    and returns strings) to path.
+
+    The file is replaced atomically, processes that have the previous pool open
+    keep using it.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    data = bytearray()
+    offsets = array("Q", [0])
+    for _i in range(size):
+        value = generate()
+        if not isinstance(value, str):
+            raise TypeError(f"Value pools can only store strings, not {value!r}.")
+        data += value.encode()
+        offsets.append(len(data))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, size))
+            f.write(offsets.tobytes())
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ValuePool:
+    """
+    A pool of fake values in a memory-mapped file (see build_value_pool).
+
+    The pages of the file are shared by all processes that use the pool and
+    sampling a value only reads its offsets and its bytes.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a value pool.")
+        self.data_start = HEADER.size + (self.size + 1) * OFFSET_SIZE
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        start, end = OFFSETS.unpack_from(self.mmap, HEADER.size + index * OFFSET_SIZE)
+        return self.mmap[self.data_start + start : self.data_start + end].decode()
+
+    def sample(self):
+        """Return a random value from the pool."""
+        return self[random.randrange(self.size)]  # noqa: S311
+
+
+def get_value_pool(path, generate, size, max_age=None):
+    """
+    Return the ValuePool at path. The pool is (re)built first if it doesn't exist,
+    has another size or is older than max_age (a timedelta).
+    """
+    path = Path(path)
+    if path.exists():
+        pool = ValuePool(path)
+        age = time.time() - path.stat().st_mtime
+        if len(pool) == size and (max_age is None or age < max_age.total_seconds()):
+            return pool
+
+    build_value_pool(path, generate, size)
+    return ValuePool(path)
@@ -0,0 +1,113 @@
+import cProfile
+import threading
+import time
+
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+
+class Profiler:
+    """
+    Records a cProfile profile per model (or other unit of work) and the time
+    spent in the anonymizer function of every field.
+
+    Every profile is written to output_dir as <name>.prof, to be analyzed with
+    pstats (or a tool like snakeviz). write_summary writes summary.txt with the
+    duration of every profile and the top slowest fields.
+    """
+
+    def __init__(self, output_dir, top=20):
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self.durations = {}
+        self.field_durations = defaultdict(float)
+        self.field_calls = Counter()
+        self.field_functions = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, name):
+        """Profile the block and write the profile to <name>.prof."""
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.durations[name] = time.perf_counter() - start
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(self.output_dir / f"{name}.prof")
+
+    def time_plan(self, model_name, plan):
+        """
+        Return plan (a list of FieldPlan) with every value function wrapped to
+        record the time spent in it.
+        """
+        timed_plan = []
+        for field_plan in plan:
+            field_path = f"{model_name}.{field_plan.field.name}"
+            value_func = field_plan.value_func
+            self.field_functions[field_path] = getattr(
+                value_func, "__name__", repr(value_func)
+            )
+            timed_plan.append(
+                field_plan._replace(
+                    value_func=self.time_function(field_path, value_func)
+                )
+            )
+        return timed_plan
+
+    def time_function(self, field_path, function):
+        """
+        Return function wrapped to add the duration of every call to the time of
+        field_path. A column_function (see relations.anonymizes_column) is
+        wrapped as well.
+        """
+
+        @wraps(function)
+        def timed_function(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.field_durations[field_path] += time.perf_counter() - start
+                    self.field_calls[field_path] += 1
+
+        if column_function := getattr(function, "column_function", None):
+            timed_function.column_function = self.time_function(
+                field_path, column_function
+            )
+
+        return timed_function
+
+    def get_summary(self):
+        lines = ["Profiles:"]
+        lines.extend(
+            f"  {name:<60} {duration:>9.3f}s"
+            for name, duration in self.durations.items()
+        )
+        if self.field_durations:
+            lines.append(f"Slowest fields (top {self.top}):")
+            slowest = sorted(
+                self.field_durations.items(), key=lambda item: item[1], reverse=True
+            )
+            lines.extend(
+                f"  {field_path:<60} {duration:>9.3f}s"
+                f" {self.field_calls[field_path]:>9} calls"
+                f"  {self.field_functions[field_path]}"
+                for field_path, duration in slowest[: self.top]
+            )
+        return lines
+
+    def write_summary(self):
+        """Write the summary to summary.txt and return its lines."""
+        lines = self.get_summary()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        (self.output_dir / "summary.txt").write_text(
+            "\n".join(lines) + "\n", encoding="utf-8"
+        )
+        return lines
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import sqlite3
+import threading
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class PseudonymCache:
+    """
+    Maps original values to fake values per value domain, so the same original
+    value is replaced by the same fake value in every field of that domain.
+
+    At most `maxsize` mappings are kept in memory, the least recently used
+    mappings are evicted first. When `spill_path` is given, evicted mappings are
+    written to an SQLite database at that path and read back when needed again,
+    otherwise an evicted mapping is lost and the next occurrence of that original
+    value gets a new fake value.
+
+    Original values are never stored, only a keyed hash of them.
+    """
+
+    def __init__(self, maxsize=100_000, spill_path=None):
+        self.maxsize = maxsize
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+        self.hash_key = hashlib.blake2b(
+            settings.SECRET_KEY.encode(), digest_size=32
+        ).digest()
+        self.spill = None
+        if spill_path is not None:
+            self.spill = sqlite3.connect(spill_path, check_same_thread=False)
+            self.spill.execute(
+                "CREATE TABLE IF NOT EXISTS pseudonym ("
+                " domain TEXT NOT NULL,"
+                " digest BLOB NOT NULL,"
+                " value TEXT NOT NULL,"
+                " PRIMARY KEY (domain, digest)"
+                ")"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_key(self, domain, original):
+        digest = hashlib.blake2b(
+            str(original).encode(), key=self.hash_key, digest_size=16
+        ).digest()
+        return domain, digest
+
+    def get(self, domain, original, generate):
+        """
+        Return the fake value for original in domain, calling generate to create
+        a new fake value if there is none yet.
+        """
+        key = self.get_key(domain, original)
+        with self.lock:
+            try:
+                self.values.move_to_end(key)
+                return self.values[key]
+            except KeyError:
+                pass
+
+            value = self.load(key)
+            if value is None:
+                value = generate()
+            self.values[key] = value
+
+            if len(self.values) > self.maxsize:
+                self.store(*self.values.popitem(last=False))
+
+            return value
+
+    def load(self, key):
+        if self.spill is None:
+            return None
+        row = self.spill.execute(
+            "SELECT value FROM pseudonym WHERE domain = ? AND digest = ?", key
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store(self, key, value):
+        if self.spill is None:
+            return
+        self.spill.execute(
+            "INSERT OR REPLACE INTO pseudonym VALUES (?, ?, ?)",
+            (*key, json.dumps(value, cls=DjangoJSONEncoder)),
+        )
+
+    def close(self):
+        """
+        Write the mappings that are still in memory to the spill database (so
+        they can be reused by a next run) and close it.
+        """
+        if self.spill is None:
+            return
+        with self.spill:
+            for key, value in self.values.items():
+                self.store(key, value)
+        self.spill.close()
+        self.spill = None
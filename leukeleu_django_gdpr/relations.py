@@ -0,0 +1,240 @@
+from collections import defaultdict, deque
+from itertools import islice
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import ForeignObjectRel
+from django.db.models.constants import LOOKUP_SEP
+
+
+def get_model_dependencies(model):
+    """
+    Return the models that model refers to with a foreign key or one-to-one
+    relation (including the parent link of multi-table inheritance).
+    """
+    return {
+        field.related_model
+        for field in model._meta.get_fields()
+        if field.concrete
+        and (field.many_to_one or field.one_to_one)
+        and field.related_model is not None
+    }
+
+
+def sort_models(model_labels):
+    """
+    Order model labels so every model comes after the models it depends on,
+    e.g. to anonymize a model that copies data from a related model after that
+    related model. Models without (remaining) dependencies keep their original
+    order.
+    """
+    labels = list(model_labels)
+    dependencies = {}
+    for label in labels:
+        model_dependencies = {
+            dependency._meta.label
+            for dependency in get_model_dependencies(apps.get_model(label))
+        }
+        dependencies[label] = model_dependencies.intersection(labels) - {label}
+
+    ordered = []
+    while dependencies:
+        ready = [label for label in labels if not dependencies.get(label, True)]
+        if not ready:
+            # Break a dependency cycle: follow the dependencies of the first
+            # remaining model until a model repeats, that model is in the cycle
+            label = next(label for label in labels if label in dependencies)
+            seen = set()
+            while label not in seen:
+                seen.add(label)
+                label = min(dependencies[label], key=labels.index)
+            ready = [label]
+        for label in ready:
+            del dependencies[label]
+        for label_dependencies in dependencies.values():
+            label_dependencies.difference_update(ready)
+        ordered.extend(ready)
+    return ordered
+
+
+def uses_related(*lookups):
+    """
+    Decorator to declare the related objects that an AnonymizerFunction reads,
+    e.g. @uses_related("user", "user__groups"). These are fetched together with
+    the objects that are anonymized (using select_related or prefetch_related)
+    instead of with a query per object.
+    """
+
+    def decorator(function):
+        function.related_lookups = lookups
+        return function
+
+    return decorator
+
+
+def anonymizes_column(column_function):
+    """
+    Decorator to declare that an AnonymizerFunction only reads the value of the
+    field itself. column_function(values) returns the new values for a list of
+    values, so the field can be anonymized a column at a time, without model
+    instances (see BaseAnonymizer.anonymize_columns).
+    """
+
+    def decorator(function):
+        function.column_function = column_function
+        return function
+
+    return decorator
+
+
+def is_single_valued_lookup(model, lookup):
+    """Whether every relation in lookup points to (at most) one object."""
+    for name in lookup.split(LOOKUP_SEP):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Probably a prefetchable attribute (e.g. a GenericForeignKey)
+            return False
+        if not field.is_relation or not (field.many_to_one or field.one_to_one):
+            return False
+        model = field.related_model
+    return True
+
+
+def get_related_lookups(model, functions):
+    """
+    Collect the related lookups declared with uses_related on functions and
+    split them in lookups for select_related and lookups for prefetch_related.
+    """
+    select_related = set()
+    prefetch_related = set()
+    for function in functions:
+        for lookup in getattr(function, "related_lookups", ()):
+            if is_single_valued_lookup(model, lookup):
+                select_related.add(lookup)
+            else:
+                prefetch_related.add(lookup)
+    return sorted(select_related), sorted(prefetch_related)
+
+
+def batched(iterable, n):
+    """Split iterable in lists of (at most) n items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, n)):
+        yield batch
+
+
+def iter_pk_batches(qs, batch_size):
+    """
+    Yield the primary keys of the rows in qs in lists of (at most) batch_size,
+    in order. Every batch is fetched with its own query (keyset pagination).
+    """
+    qs = qs.order_by("pk")
+    last_pk = None
+    while True:
+        page = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+        pks = list(page.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def get_referring_relations(model):
+    """
+    Return (model, field name) tuples for the foreign keys and one-to-one
+    relations (including parent links of multi-table inheritance) that refer
+    to model.
+    """
+    return [
+        (relation.related_model, relation.field.name)
+        for relation in model._meta.related_objects
+        if not relation.many_to_many
+        and relation.field.concrete
+        # Skip relations to parent models, those are followed from the parent
+        and relation.model._meta.concrete_model is model._meta.concrete_model
+    ]
+
+
+def can_truncate(model):
+    """
+    Return whether the table of model can be emptied on its own, without
+    taking care of other tables: no relation (including many-to-many and
+    hidden relations) refers to model and model has no parent models.
+    """
+    opts = model._meta
+    return (
+        not opts.parents
+        and not opts.many_to_many
+        and not any(
+            isinstance(field, ForeignObjectRel)
+            for field in opts.get_fields(include_hidden=True)
+        )
+    )
+
+
+def get_subject_attnames(model, subject_model):
+    """
+    Return the attnames of the foreign keys (and one-to-one fields) of model to
+    subject_model or one of its subclasses.
+    """
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.is_relation and issubclass(field.related_model, subject_model)
+    ]
+
+
+def iter_related_rows(model, pks, get_columns=None, batch_size=1000):
+    """
+    Yield (model, rows) tuples for the rows of model with the given pks and all
+    rows that (directly or indirectly) refer to them, e.g. all rows that belong
+    to a user. Rows are tuples of the primary key followed by the values of the
+    columns returned by get_columns(model), each row is yielded once.
+
+    Rows that belong to another subject are skipped, and not followed: other
+    rows of model and rows that also refer to another row of model, e.g. the
+    comments of other users on an article of the user.
+
+    Rows are looked up with `__in` queries of at most batch_size values per
+    model and relation, so the number of queries does not depend on the number
+    of rows per object. Only the primary keys are kept in memory.
+
+    Generic relations and many-to-many relations are not followed, as the
+    objects on the other side are usually not owned by a single subject.
+    """
+    get_columns = get_columns or (lambda model: ())
+    subject_model = model
+    subject_pks = {subject_model._meta.pk.to_python(pk) for pk in pks}
+    seen = defaultdict(set)
+    queue = deque(
+        (model, "pk__in", batch) for batch in batched(subject_pks, batch_size)
+    )
+
+    while queue:
+        model, lookup, values = queue.popleft()
+        is_subject_model = issubclass(model, subject_model)
+        subject_attnames = (
+            [] if is_subject_model else get_subject_attnames(model, subject_model)
+        )
+        qs = model._base_manager.filter(**{lookup: values}).values_list(
+            "pk", *subject_attnames, *get_columns(model)
+        )
+        columns_start = 1 + len(subject_attnames)
+        rows = (
+            (row[0], *row[columns_start:])
+            for row in qs.iterator(chunk_size=batch_size)
+            if row[0] not in seen[model]
+            and (not is_subject_model or row[0] in subject_pks)
+            and all(
+                value is None or value in subject_pks for value in row[1:columns_start]
+            )
+        )
+        for batch in batched(rows, batch_size):
+            new_pks = [row[0] for row in batch]
+            seen[model].update(new_pks)
+            yield model, batch
+            queue.extend(
+                (related_model, f"{field_name}__pk__in", new_pks)
+                for related_model, field_name in get_referring_relations(model)
+            )
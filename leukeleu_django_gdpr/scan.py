@@ -0,0 +1,176 @@
+import random
+import re
+
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.apps import apps
+from django.core.validators import EMPTY_VALUES
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"(?<![\w+])(?:(?:\+|00)\d{2}[ -]?|0)[1-9](?:[ -]?\d){8}\b")
+IBAN_PATTERN = re.compile(r"\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]){11,30}\b")
+BSN_PATTERN = re.compile(r"(?<!\d)\d{8,9}(?!\d)")
+CARD_PATTERN = re.compile(r"(?<!\d)\d(?:[ -]?\d){12,18}(?!\d)")
+BSN_WEIGHTS = (9, 8, 7, 6, 5, 4, 3, 2, -1)
+
+
+def is_valid_iban(value):
+    """Validate the ISO 13616 mod-97 checksum of an IBAN."""
+    iban = value.replace(" ", "")
+    digits = "".join(str(int(char, 36)) for char in iban[4:] + iban[:4])
+    return int(digits) % 97 == 1
+
+
+def is_valid_bsn(value):
+    """Validate the "elfproef" checksum of a Dutch citizen service number (BSN)."""
+    bsn = value.zfill(9)
+    total = sum(
+        int(digit) * weight for digit, weight in zip(bsn, BSN_WEIGHTS, strict=True)
+    )
+    return bsn != "000000000" and total % 11 == 0
+
+
+def is_valid_card_number(value):
+    """Validate the Luhn checksum of a payment card number."""
+    digits = [int(char) for char in value if char.isdigit()]
+    doubled = (sum(divmod(digit * 2, 10)) for digit in digits[-2::-2])
+    total = sum(digits[-1::-2]) + sum(doubled)
+    return total % 10 == 0
+
+
+def _matches(pattern, validator=None):
+    def detector(value):
+        return any(
+            validator is None or validator(match[0])
+            for match in pattern.finditer(value)
+        )
+
+    return detector
+
+
+DETECTORS = {
+    "email": _matches(EMAIL_PATTERN),
+    "phone": _matches(PHONE_PATTERN),
+    "iban": _matches(IBAN_PATTERN, is_valid_iban),
+    "bsn": _matches(BSN_PATTERN, is_valid_bsn),
+    "card": _matches(CARD_PATTERN, is_valid_card_number),
+}
+
+
+def scan_rows(rows):
+    """
+    Run all detectors on every value of rows (a list of tuples). Returns a list
+    with a Counter per column, counting the number of non-empty values ("rows")
+    and the number of values each detector matched.
+
+    This is a module level function, so it can run in a worker process.
+    """
+    counters = []
+    for column in zip(*rows, strict=True):
+        counter = Counter()
+        for value in column:
+            if value in EMPTY_VALUES:
+                continue
+            counter["rows"] += 1
+            text = str(value)
+            for name, detector in DETECTORS.items():
+                if detector(text):
+                    counter[name] += 1
+        counters.append(counter)
+    return counters
+
+
+def get_scannable_fields(model, model_data):
+    """Return the concrete, non-relational fields of model listed in gdpr.yml."""
+    fields = []
+    for field_name in model_data["fields"]:
+        field = model._meta.get_field(field_name)
+        if field.concrete and not field.is_relation:
+            fields.append(field)
+    return fields
+
+
+def sample_rows(qs, sample_rate=1.0, limit=None, chunk_size=2000):
+    """
+    Stream the rows of a values_list qs (using a server-side cursor where the
+    database supports it), keeping a random sample_rate fraction of them and at
+    most limit rows, and yield them in lists of chunk_size rows.
+    """
+    rows = qs.iterator(chunk_size=chunk_size)
+    if sample_rate < 1:
+        rows = (row for row in rows if random.random() < sample_rate)  # noqa: S311
+    rows = islice(rows, limit)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def map_bounded(executor, function, iterable, max_pending):
+    """
+    Like executor.map, but only read (and submit) the next item of iterable
+    while fewer than max_pending results are waiting to be consumed, so a
+    stream is never read into the executor's queue all at once.
+    """
+    pending = deque()
+    for item in iterable:
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+        pending.append(executor.submit(function, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def scan_model(
+    model,
+    fields,
+    *,
+    sample_rate=1.0,
+    limit=None,
+    chunk_size=2000,
+    executor=None,
+    max_pending=2,
+):
+    """
+    Scan the values of fields of model and return a Counter per field. When an
+    executor is given the chunks of rows are scanned by its workers, with at
+    most max_pending chunks read ahead.
+    """
+    qs = model._base_manager.values_list(*(field.attname for field in fields))
+    chunks = sample_rows(qs, sample_rate, limit, chunk_size)
+    if executor is None:
+        results = map(scan_rows, chunks)
+    else:
+        results = map_bounded(executor, scan_rows, chunks, max_pending)
+
+    totals = [Counter() for _field in fields]
+    for counters in results:
+        for total, counter in zip(totals, counters, strict=True):
+            total.update(counter)
+    return dict(zip(fields, totals, strict=True))
+
+
+def scan(models, *, jobs=1, **kwargs):
+    """
+    Scan all fields in models (the models of gdpr.yml) for values that look like
+    PII. Yields a (field label, PII classification, Counter) tuple for each field.
+    """
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        for model_label, model_data in models.items():
+            model = apps.get_model(model_label)
+            fields = get_scannable_fields(model, model_data)
+            if not fields:
+                continue
+            counters = scan_model(
+                model, fields, executor=executor, max_pending=2 * jobs, **kwargs
+            )
+            for field, counter in counters.items():
+                yield (
+                    f"{model_label}.{field.name}",
+                    model_data["fields"][field.name]["pii"],
+                    counter,
+                )
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
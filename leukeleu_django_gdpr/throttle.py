@@ -0,0 +1,127 @@
+import time
+
+from functools import partial
+
+from django.db import OperationalError, connections, transaction
+
+from leukeleu_django_gdpr.relations import iter_pk_batches
+
+REPLICATION_LAG_SQL = (
+    "SELECT COALESCE(EXTRACT(EPOCH FROM MAX(replay_lag)), 0) FROM pg_stat_replication"
+)
+
+
+def get_replication_lag(using):
+    """
+    Return the replication lag (in seconds) of the slowest replica of database
+    `using`, 0 if it has no replicas or isn't a PostgreSQL database.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(REPLICATION_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+class Throttle:
+    """
+    Paces a run on a database that is in use, see BaseAnonymizer.anonymize_online.
+
+    Every batch runs in its own transaction. After a batch the run pauses long
+    enough to stay below rows_per_second. While batches take longer than
+    max_latency seconds, or the replication lag is above max_replication_lag
+    seconds, the pause is doubled after every batch (from pause up to
+    max_pause seconds).
+
+    On PostgreSQL every batch runs with a lock_timeout and statement_timeout (in
+    milliseconds). Batches that fail with an OperationalError (e.g. a timeout or
+    a deadlock) are retried up to max_retries times, with the same backoff.
+    """
+
+    def __init__(
+        self,
+        rows_per_second=None,
+        batch_size=100,
+        lock_timeout=1000,
+        statement_timeout=30_000,
+        max_latency=None,
+        max_replication_lag=None,
+        max_retries=5,
+        pause=1.0,
+        max_pause=60.0,
+    ):
+        self.rows_per_second = rows_per_second
+        self.batch_size = batch_size
+        self.lock_timeout = lock_timeout
+        self.statement_timeout = statement_timeout
+        self.max_latency = max_latency
+        self.max_replication_lag = max_replication_lag
+        self.max_retries = max_retries
+        self.pause = pause
+        self.max_pause = max_pause
+        self.backoff = 0
+
+    def get_backoff_pause(self, backoff):
+        return min(self.pause * 2 ** (backoff - 1), self.max_pause)
+
+    def run(self, function, qs):
+        """
+        Call function with the rows in qs in batches of batch_size rows, see
+        run_batch.
+        """
+        for pks in iter_pk_batches(qs, self.batch_size):
+            self.run_batch(partial(function, qs.filter(pk__in=pks)), len(pks), qs.db)
+
+    def run_batch(self, function, rows, using):
+        """
+        Call function (which processes rows rows) in a transaction, retrying it
+        when it fails with an OperationalError, then pause.
+        """
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                with transaction.atomic(using=using):
+                    self.set_timeouts(using)
+                    function()
+            except OperationalError:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                time.sleep(self.get_backoff_pause(attempt))
+            else:
+                self.wait(rows, time.perf_counter() - start, using)
+                return
+
+    def set_timeouts(self, using):
+        connection = connections[using]
+        if connection.vendor != "postgresql":
+            return
+        with connection.cursor() as cursor:
+            # Only for the current transaction
+            cursor.execute(
+                "SELECT set_config('lock_timeout', %s, true),"
+                " set_config('statement_timeout', %s, true)",
+                [f"{self.lock_timeout}ms", f"{self.statement_timeout}ms"],
+            )
+
+    def is_overloaded(self, duration, using):
+        return (self.max_latency is not None and duration > self.max_latency) or (
+            self.max_replication_lag is not None
+            and get_replication_lag(using) > self.max_replication_lag
+        )
+
+    def wait(self, rows, duration, using):
+        """
+        Pause after a batch of rows rows that took duration seconds.
+        """
+        self.backoff = self.backoff + 1 if self.is_overloaded(duration, using) else 0
+
+        pause = 0.0
+        if self.rows_per_second:
+            pause = rows / self.rows_per_second - duration
+        if self.backoff:
+            pause = max(pause, self.get_backoff_pause(self.backoff))
+        if pause > 0:
+            time.sleep(pause)
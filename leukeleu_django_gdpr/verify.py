@@ -0,0 +1,140 @@
+import hashlib
+import secrets
+
+from array import array
+from bisect import bisect_left
+from typing import NamedTuple
+
+from django.core.validators import EMPTY_VALUES
+
+from leukeleu_django_gdpr.json_paths import iter_json_path_values, parse_paths
+
+
+class ValueSet:
+    """
+    A set of values that only keeps a keyed 64-bit hash (8 bytes) per value,
+    regardless of the size of the values. The key is random, so the hashes are
+    useless outside this set. A value that was not added is "in" the set only if
+    its hash is the same as that of an added value, with a probability of about
+    len(set) / 2**64.
+
+    The hashes are kept in sorted arrays of at most chunk_size hashes, so only
+    a chunk is ever kept as a list of Python ints.
+    """
+
+    chunk_size = 1_000_000
+
+    def __init__(self):
+        self.key = secrets.token_bytes(16)
+        self.chunks = []
+        self.pending = []
+
+    def get_hash(self, value):
+        digest = hashlib.blake2b(
+            str(value).encode(), digest_size=8, key=self.key
+        ).digest()
+        return int.from_bytes(digest, "little")
+
+    def add(self, value):
+        self.pending.append(self.get_hash(value))
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.chunks.append(array("Q", sorted(self.pending)))
+            self.pending = []
+
+    def __contains__(self, value):
+        self.flush()
+        value_hash = self.get_hash(value)
+        for chunk in self.chunks:
+            index = bisect_left(chunk, value_hash)
+            if index < len(chunk) and chunk[index] == value_hash:
+                return True
+        return False
+
+
+class Fingerprint(NamedTuple):
+    """The original values of a field, see fingerprint_values."""
+
+    # Parsed pii_paths (see json_paths.parse_paths) of a JSONField, only the
+    # values at these paths are anonymized
+    paths: list | None
+    # The (pk, value) pair of every row with a value that must not survive
+    values: ValueSet
+
+
+class Leak(NamedTuple):
+    """Original values that were found in a field after anonymizing."""
+
+    model_name: str
+    field_name: str
+    # Rows of the queryset (override) that still have their original value
+    rows: int
+    # Some primary keys of these rows
+    example_pks: list
+    # Rows excluded by the queryset override that have their original value
+    excluded_rows: int
+
+
+def can_verify(value):
+    # Booleans only have two values, these are expected to match. Text without
+    # letters or digits (e.g. punctuation) is left as-is by masking.
+    return (
+        value not in EMPTY_VALUES
+        and not isinstance(value, bool)
+        and not (isinstance(value, str) and not any(char.isalnum() for char in value))
+    )
+
+
+def get_verified_value(value, paths=None):
+    """
+    Return the part of value that must not survive anonymizing, or None if
+    there is none: the values at paths of a JSON document.
+    """
+    if paths is not None:
+        value = tuple(
+            item for item in iter_json_path_values(value, paths) if can_verify(item)
+        )
+    return value if can_verify(value) else None
+
+
+def fingerprint_values(qs, fields, chunk_size=2000):
+    """
+    Stream the values of fields (attname: pii_paths or None) in qs (in one
+    query) into a Fingerprint per field.
+    """
+    fingerprints = {
+        attname: Fingerprint(paths and parse_paths(paths), ValueSet())
+        for attname, paths in fields.items()
+    }
+    attnames = list(fingerprints)
+    for pk, *row in qs.values_list("pk", *attnames).iterator(chunk_size=chunk_size):
+        for attname, value in zip(attnames, row, strict=True):
+            paths, values = fingerprints[attname]
+            verified_value = get_verified_value(value, paths)
+            if verified_value is not None:
+                values.add((pk, verified_value))
+    return fingerprints
+
+
+def find_fingerprinted_values(qs, fingerprints, max_examples=5, chunk_size=2000):
+    """
+    Stream the values of the fields in fingerprints (as returned by
+    fingerprint_values) in qs and return the number of rows that still have
+    their original value, and the primary keys of max_examples of these rows,
+    per field.
+    """
+    attnames = list(fingerprints)
+    found = {attname: (0, []) for attname in attnames}
+    for pk, *row in qs.values_list("pk", *attnames).iterator(chunk_size=chunk_size):
+        for attname, value in zip(attnames, row, strict=True):
+            paths, values = fingerprints[attname]
+            verified_value = get_verified_value(value, paths)
+            if verified_value is not None and (pk, verified_value) in values:
+                count, example_pks = found[attname]
+                if len(example_pks) < max_examples:
+                    example_pks.append(pk)
+                found[attname] = (count + 1, example_pks)
+    return found
@@ -15,6 +15,7 @@ class CustomUser(AbstractUser):
         null=True,
         upload_to="test_user/",
     )
+    preferences = models.JSONField(default=dict, blank=True)
 
 
 class SpecialUser(CustomUser):
@@ -41,3 +42,14 @@ class ExclusiveUser(CustomUser):
 class ProxyUser(CustomUser):
     class Meta:
         proxy = True
+
+
+class Article(models.Model):
+    author = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+
+
+class Comment(models.Model):
+    article = models.ForeignKey(Article, on_delete=models.CASCADE)
+    author = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    text = models.TextField()
@@ -1,14 +1,37 @@
+import inspect
+import itertools
+import shutil
+import tempfile
+
+from datetime import timedelta
 from functools import partial
+from io import StringIO
 from pathlib import Path
 from unittest import mock
 
 from faker import Faker
 
+from django.contrib.admin.models import ADDITION, DELETION, LogEntry
+from django.contrib.auth.models import Group
+from django.core.exceptions import ImproperlyConfigured
 from django.core.files.base import ContentFile
-from django.test import TestCase
-
-from leukeleu_django_gdpr.anonymize import BaseAnonymizer, is_anonymizer_function
-from tests.custom_users.models import CustomUser
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from leukeleu_django_gdpr.anonymize import (
+    ANONYMIZE_STATE_TABLE,
+    BaseAnonymizer,
+    is_anonymizer_function,
+    mask_html,
+    mask_text,
+    mask_text_field,
+    read_anonymize_state,
+)
+from leukeleu_django_gdpr.mask import mask_htmls, mask_texts
+from leukeleu_django_gdpr.relations import uses_related
+from tests.custom_users.models import Article, Comment, CustomUser
 
 
 def _get_models():
@@ -186,6 +209,102 @@ class AnonymizerTest(TestCase):
         new_user.refresh_from_db()
         self.assertNotEqual(new_user.username, "NewUser")
 
+    def test_domain(self):
+        models = _get_models()
+        models["custom_users.CustomUser"]["fields"]["username"]["domain"] = "name"
+        models["custom_users.CustomUser"]["fields"]["first_name"]["domain"] = "name"
+
+        other_user = CustomUser.objects.create(username="John", first_name="Jane")
+
+        # Distinct values, so different originals never get the same pseudonym
+        counter = itertools.count()
+
+        def name():
+            return f"Name {next(counter)}"
+
+        class Anonymizer(BaseAnonymizer):
+            extra_field_overrides = {
+                "custom_users.CustomUser.username": name,
+                "custom_users.CustomUser.first_name": name,
+            }
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            Anonymizer().anonymize()
+
+        self.user.refresh_from_db()
+        other_user.refresh_from_db()
+
+        # "John" is replaced by the same value in both fields
+        self.assertNotEqual(self.user.first_name, "John")
+        self.assertEqual(self.user.first_name, other_user.username)
+        self.assertNotEqual(other_user.first_name, other_user.username)
+
+    def test_pii_paths(self):
+        models = _get_models()
+        models["custom_users.CustomUser"]["fields"]["preferences"] = {
+            "pii": True,
+            "pii_paths": ["contact.email", "addresses.*.street"],
+        }
+        preferences = {
+            "theme": "dark",
+            "contact": {"email": "john@example.nl", "newsletter": True},
+            "addresses": [{"street": "Dorpsstraat", "country": "NL"}],
+        }
+        CustomUser.objects.filter(pk=self.user.pk).update(preferences=preferences)
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            BaseAnonymizer().anonymize()
+
+        self.user.refresh_from_db()
+
+        self.assertEqual(self.user.preferences["theme"], "dark")
+        self.assertNotEqual(
+            self.user.preferences["contact"]["email"], "john@example.nl"
+        )
+        self.assertTrue(self.user.preferences["contact"]["newsletter"])
+        self.assertNotEqual(
+            self.user.preferences["addresses"][0]["street"], "Dorpsstraat"
+        )
+        self.assertEqual(self.user.preferences["addresses"][0]["country"], "NL")
+
+    def test_related_objects_are_fetched_up_front(self):
+        @uses_related("groups")
+        def group_names(obj, field):
+            # The groups were prefetched, this does not run a query
+            self.assertIn("groups", obj._prefetched_objects_cache)  # noqa: SLF001
+            return ",".join(group.name for group in obj.groups.all())
+
+        class Anonymizer(BaseAnonymizer):
+            extra_field_overrides = {
+                "custom_users.CustomUser.username": group_names,
+            }
+
+        self.user.groups.add(Group.objects.create(name="Group"))
+
+        Anonymizer().anonymize()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, "Group")
+
+    def test_overrides_are_resolved_once(self):
+        anonymizer = BaseAnonymizer()
+
+        with mock.patch.object(
+            anonymizer,
+            "get_fieldtype_overrides",
+            wraps=anonymizer.get_fieldtype_overrides,
+        ) as get_fieldtype_overrides:
+            anonymizer.anonymize()
+            anonymizer.anonymize()
+
+        get_fieldtype_overrides.assert_called_once()
+
     def test_bulk_update_only_called_with_updated_fields(self):
         CustomUser.objects.all().delete()
 
@@ -209,6 +328,191 @@ class AnonymizerTest(TestCase):
             self.assertRaises(AssertionError, mock_bulk_update.assert_called_once)
 
 
+class ColumnEngineTest(TestCase):
+    def setUp(self):
+        models = _get_models()
+        # Without the avatar none of the fields need a model instance
+        del models["custom_users.CustomUser"]["fields"]["avatar"]
+        models["custom_users.CustomUser"]["fields"]["bsn"] = {"pii": True}
+        models["custom_users.CustomUser"]["fields"]["first_name"]["domain"] = "name"
+
+        patcher = mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = CustomUser.objects.create(
+            username="User", first_name="John", bsn="123456789"
+        )
+        self.other_user = CustomUser.objects.create(
+            username="Other", first_name="John", last_name="Doe"
+        )
+        self.staffuser = CustomUser.objects.create(username="Staff", is_staff=True)
+
+    class Anonymizer(BaseAnonymizer):
+        extra_field_overrides = {"custom_users.CustomUser.bsn": mask_text_field}
+
+    def test_anonymize(self):
+        with mock.patch.object(CustomUser.objects, "bulk_update") as mock_bulk_update:
+            self.Anonymizer().anonymize()
+
+        # The rows are updated without model instances
+        mock_bulk_update.assert_not_called()
+
+        self.user.refresh_from_db()
+        self.other_user.refresh_from_db()
+        self.staffuser.refresh_from_db()
+
+        self.assertNotEqual(self.user.username, "User")
+        self.assertNotEqual(self.user.first_name, "John")
+        self.assertEqual(self.user.first_name, self.other_user.first_name)
+        self.assertNotEqual(self.other_user.last_name, "Doe")
+        self.assertNotEqual(self.user.bsn, "123456789")
+        self.assertRegex(self.user.bsn, r"^\d{9}$")
+        # Empty values are left alone
+        self.assertEqual(self.user.last_name, "")
+        self.assertIsNone(self.other_user.bsn)
+        self.assertEqual(self.staffuser.username, "Staff")
+
+    def test_chunks(self):
+        anonymizer = self.Anonymizer()
+
+        with mock.patch.object(
+            anonymizer,
+            "anonymize_columns",
+            partial(anonymizer.anonymize_columns, chunk_size=1),
+        ):
+            anonymizer.anonymize()
+
+        self.user.refresh_from_db()
+        self.other_user.refresh_from_db()
+        self.assertNotEqual(self.user.username, "User")
+        self.assertNotEqual(self.other_user.username, "Other")
+
+    def test_disabled(self):
+        class Anonymizer(self.Anonymizer):
+            column_engine = False
+
+        with mock.patch.object(CustomUser.objects, "bulk_update") as mock_bulk_update:
+            Anonymizer().anonymize()
+
+        mock_bulk_update.assert_called_once()
+
+
+class IncrementalAnonymizerTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="User")
+
+    def test_state_is_stored(self):
+        BaseAnonymizer().anonymize(incremental=True)
+
+        state = read_anonymize_state()
+        self.assertEqual(state["custom_users.CustomUser"]["pk"], self.user.pk)
+        self.assertIn("anonymized", state["custom_users.CustomUser"])
+
+    def test_state_is_not_stored_without_incremental(self):
+        BaseAnonymizer().anonymize()
+
+        self.assertEqual(read_anonymize_state(), {})
+
+    def test_state_is_not_stored_when_run_fails(self):
+        anonymizer = BaseAnonymizer()
+        with (
+            mock.patch.object(anonymizer, "anonymize_model", side_effect=ValueError),
+            self.assertRaises(ValueError),
+        ):
+            anonymizer.anonymize(incremental=True)
+
+        self.assertEqual(read_anonymize_state(), {})
+
+    def test_restored_database_is_fully_anonymized(self):
+        BaseAnonymizer().anonymize(incremental=True)
+
+        # A database restored from a backup has no state
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {ANONYMIZE_STATE_TABLE}")
+        CustomUser.objects.filter(pk=self.user.pk).update(username="Restored")
+
+        BaseAnonymizer().anonymize(incremental=True)
+
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.username, "Restored")
+
+    def test_only_new_rows_are_anonymized(self):
+        BaseAnonymizer().anonymize(incremental=True)
+
+        CustomUser.objects.filter(pk=self.user.pk).update(username="Changed")
+        new_user = CustomUser.objects.create(username="NewUser")
+
+        BaseAnonymizer().anonymize(incremental=True)
+
+        self.user.refresh_from_db()
+        new_user.refresh_from_db()
+
+        # Existing rows are left alone, new rows are anonymized
+        self.assertEqual(self.user.username, "Changed")
+        self.assertNotEqual(new_user.username, "NewUser")
+
+    def test_changed_rows_are_anonymized(self):
+        class Anonymizer(BaseAnonymizer):
+            incremental_fields = {
+                "custom_users.CustomUser": "last_login",
+            }
+
+        unchanged_user = CustomUser.objects.create(
+            username="Unchanged", last_login=timezone.now() - timedelta(days=1)
+        )
+
+        Anonymizer().anonymize(incremental=True)
+
+        CustomUser.objects.filter(pk=unchanged_user.pk).update(username="Unchanged")
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            username="Changed", last_login=timezone.now()
+        )
+
+        Anonymizer().anonymize(incremental=True)
+
+        self.user.refresh_from_db()
+        unchanged_user.refresh_from_db()
+
+        self.assertNotEqual(self.user.username, "Changed")
+        self.assertEqual(unchanged_user.username, "Unchanged")
+
+    def test_rows_saved_by_the_anonymizer(self):
+        anonymized = []
+
+        def bump_last_login(obj, field):
+            # Like anonymize_image_field, which saves the object
+            anonymized.append(obj.pk)
+            CustomUser.objects.filter(pk=obj.pk).update(last_login=timezone.now())
+            return "Anonymized"
+
+        class Anonymizer(BaseAnonymizer):
+            incremental_fields = {
+                "custom_users.CustomUser": "last_login",
+            }
+            extra_field_overrides = {
+                "custom_users.CustomUser.first_name": bump_last_login,
+            }
+
+        CustomUser.objects.filter(pk=self.user.pk).update(first_name="John")
+
+        Anonymizer().anonymize(incremental=True)
+        Anonymizer().anonymize(incremental=True)
+
+        # The row is not changed by anyone else, it's anonymized once
+        self.assertEqual(anonymized, [self.user.pk])
+
+
 class IsAnonymizerFunctionTest(TestCase):
     def test_named_functions(self) -> None:
         def no_arguments():
@@ -277,3 +581,359 @@ class IsAnonymizerFunctionTest(TestCase):
 
         self.assertFalse(is_anonymizer_function(lambda *args: None))
         self.assertFalse(is_anonymizer_function(lambda **kwargs: None))
+
+    def test_cached(self) -> None:
+        def anonymizer_function(obj, field):
+            pass
+
+        with mock.patch("inspect.signature", wraps=inspect.signature) as signature:
+            self.assertTrue(is_anonymizer_function(anonymizer_function))
+            self.assertTrue(is_anonymizer_function(anonymizer_function))
+
+        signature.assert_called_once()
+
+    def test_not_weakly_referenceable(self) -> None:
+        class NoArguments:
+            __slots__ = ()
+
+            def __call__(self):
+                pass
+
+        self.assertFalse(is_anonymizer_function(NoArguments()))
+
+
+class MaskTest(TestCase):
+    def test_mask_text(self):
+        value = "Jan de Vries, Dorpsstraat 12\n1234 AB Ærøskøbing"
+        masked = mask_text(value)
+
+        self.assertNotEqual(masked, value)
+        self.assertEqual(len(masked), len(value))
+        for original, new in zip(value, masked, strict=True):
+            self.assertEqual(original.isupper(), new.isupper())
+            self.assertEqual(original.islower(), new.islower())
+            self.assertEqual(original.isdigit(), new.isdigit())
+            if not original.isalnum():
+                self.assertEqual(original, new)
+
+    def test_mask_text_ascii(self):
+        self.assertTrue(mask_text("Ærøskøbing").isascii())
+
+    def test_mask_texts(self):
+        values = ["Jan de Vries", "", "1234 AB", "nul\0byte"]
+        masked = mask_texts(values)
+
+        self.assertEqual([len(value) for value in masked], [12, 0, 7, 8])
+        self.assertRegex(masked[2], r"^\d{4} [A-Z]{2}$")
+        self.assertEqual(masked[3][3], "\0")
+
+    def test_mask_htmls(self):
+        values = ["Jan < Piet", "<b>Klaas</b> > Marie"]
+        masked = mask_htmls(values)
+
+        self.assertEqual([len(value) for value in masked], [10, 20])
+        # A "<" and ">" in different values are not a tag
+        for name in ["Jan", "Piet", "Klaas", "Marie"]:
+            self.assertNotIn(name, "".join(masked))
+        self.assertTrue(masked[1].startswith("<b>"))
+
+    def test_mask_html(self):
+        value = '<p class="intro">Hallo&nbsp;<a href="mailto:jan@x.nl">Jan</a></p>'
+        masked = mask_html(value)
+
+        self.assertNotEqual(masked, value)
+        self.assertEqual(len(masked), len(value))
+        self.assertTrue(masked.startswith('<p class="intro">'))
+        self.assertIn('&nbsp;<a href="mailto:jan@x.nl">', masked)
+        self.assertTrue(masked.endswith("</a></p>"))
+        self.assertNotIn("Hallo", masked)
+
+
+class AnonymizeSubjectsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="User", first_name="John")
+        self.other_user = CustomUser.objects.create(username="Other")
+        self.staffuser = CustomUser.objects.create(username="Staff", is_staff=True)
+
+    def test_anonymize_subjects(self):
+        BaseAnonymizer().anonymize_subjects([self.user.pk, self.staffuser.pk])
+
+        self.user.refresh_from_db()
+        self.other_user.refresh_from_db()
+        self.staffuser.refresh_from_db()
+
+        self.assertNotEqual(self.user.username, "User")
+        self.assertNotEqual(self.user.first_name, "John")
+        # The queryset overrides are not used, staff users are anonymized too
+        self.assertNotEqual(self.staffuser.username, "Staff")
+        # Other users are left alone
+        self.assertEqual(self.other_user.username, "Other")
+
+    def test_rows_of_other_subjects(self):
+        article = Article.objects.create(author=self.user, title="Teeth")
+        comment = Comment.objects.create(article=article, author=self.user, text="Mine")
+        # A comment of another user on the article of the subject
+        other_comment = Comment.objects.create(
+            article=article, author=self.other_user, text="Theirs"
+        )
+        models = {
+            **_get_models(),
+            "custom_users.Article": {"fields": {"title": {"pii": True}}},
+            "custom_users.Comment": {"fields": {"text": {"pii": True}}},
+        }
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            BaseAnonymizer().anonymize_subjects([self.user.pk])
+
+        article.refresh_from_db()
+        comment.refresh_from_db()
+        other_comment.refresh_from_db()
+        self.assertNotEqual(article.title, "Teeth")
+        self.assertNotEqual(comment.text, "Mine")
+        self.assertEqual(other_comment.text, "Theirs")
+
+    def test_batches(self):
+        users = [CustomUser.objects.create(username=f"Batch{i}") for i in range(5)]
+
+        BaseAnonymizer().anonymize_subjects((user.pk for user in users), batch_size=2)
+
+        self.assertFalse(
+            CustomUser.objects.filter(username__startswith="Batch").exists()
+        )
+        self.other_user.refresh_from_db()
+        self.assertEqual(self.other_user.username, "Other")
+
+    def test_command(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        subjects_file = Path(tmp_dir) / "subjects.txt"
+        subjects_file.write_text(f"{self.other_user.pk}\n\n")
+
+        with mock.patch(
+            "leukeleu_django_gdpr.management.commands.gdpr_erase.get_pii_stats",
+            return_value={None: 0},
+        ):
+            call_command(
+                "gdpr_erase", str(self.user.pk), file=subjects_file, stdout=StringIO()
+            )
+
+        self.user.refresh_from_db()
+        self.other_user.refresh_from_db()
+        self.staffuser.refresh_from_db()
+
+        self.assertNotEqual(self.user.username, "User")
+        self.assertNotEqual(self.other_user.username, "Other")
+        self.assertEqual(self.staffuser.username, "Staff")
+
+
+def _get_models_with_strategy(model_name, **model_data):
+    models = _get_models()
+    models["admin.LogEntry"] = {"fields": {}}
+    models[model_name].update(model_data)
+    return models
+
+
+class StrategyTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="User")
+        self.other_user = CustomUser.objects.create(username="Other")
+        for user in (self.user, self.other_user):
+            for action_flag in (ADDITION, DELETION):
+                LogEntry.objects.create(
+                    user=user, action_flag=action_flag, object_repr="Object"
+                )
+
+    def anonymize(self, model_name, **model_data):
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=_get_models_with_strategy(model_name, **model_data),
+        ):
+            BaseAnonymizer().anonymize()
+
+    def test_truncate(self):
+        self.anonymize("admin.LogEntry", strategy="truncate")
+
+        self.assertFalse(LogEntry.objects.exists())
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.username, "User")
+
+    def test_truncate_referred_to(self):
+        # LogEntry refers to the user, the log entries are deleted as well
+        self.anonymize("custom_users.CustomUser", strategy="truncate")
+
+        self.assertFalse(CustomUser.objects.exists())
+        self.assertFalse(LogEntry.objects.exists())
+
+    def test_delete_where(self):
+        self.anonymize(
+            "admin.LogEntry", strategy="delete_where", where={"action_flag": DELETION}
+        )
+
+        self.assertEqual(
+            set(LogEntry.objects.values_list("action_flag", flat=True)), {ADDITION}
+        )
+
+    def test_skip(self):
+        self.anonymize("custom_users.CustomUser", strategy="skip")
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, "User")
+
+    def test_invalid_strategy(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "Unknown strategy"):
+            self.anonymize("admin.LogEntry", strategy="drop")
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "requires 'where'"):
+            self.anonymize("admin.LogEntry", strategy="delete_where")
+
+    def test_anonymize_subjects(self):
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=_get_models_with_strategy(
+                "admin.LogEntry", strategy="truncate"
+            ),
+        ):
+            BaseAnonymizer().anonymize_subjects([self.user.pk])
+
+        # Only the log entries of the subject are deleted
+        self.assertEqual(
+            set(LogEntry.objects.values_list("user", flat=True)), {self.other_user.pk}
+        )
+
+
+class SubsetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        self.users = [
+            CustomUser.objects.create(username=f"Subset{i}") for i in range(10)
+        ]
+        self.staffuser = CustomUser.objects.create(username="Staff", is_staff=True)
+        for user in [*self.users, self.staffuser]:
+            LogEntry.objects.create(user=user, action_flag=ADDITION, object_repr="")
+
+    def test_count(self):
+        BaseAnonymizer().subset(count=3, batch_size=4)
+
+        # The staff user is never anonymized, so it is kept as well
+        self.assertEqual(CustomUser.objects.count(), 4)
+        self.assertTrue(CustomUser.objects.filter(pk=self.staffuser.pk).exists())
+        # The log entries of the deleted users are deleted as well
+        self.assertEqual(
+            set(LogEntry.objects.values_list("user", flat=True)),
+            set(CustomUser.objects.values_list("pk", flat=True)),
+        )
+
+    def test_fraction(self):
+        BaseAnonymizer().subset(fraction=1)
+        self.assertEqual(CustomUser.objects.count(), 11)
+
+        BaseAnonymizer().subset(fraction=0)
+        self.assertQuerySetEqual(CustomUser.objects.all(), [self.staffuser])
+
+    def test_count_or_fraction(self):
+        with self.assertRaises(ValueError):
+            BaseAnonymizer().subset()
+
+        with self.assertRaises(ValueError):
+            BaseAnonymizer().subset(count=1, fraction=0.5)
+
+    def test_command(self):
+        with (
+            self.settings(DEBUG=True),
+            mock.patch(
+                "leukeleu_django_gdpr.management.commands.anonymize.get_pii_stats",
+                return_value={None: 0},
+            ),
+        ):
+            call_command("anonymize", subset_count=2, stdout=StringIO())
+
+        self.assertEqual(CustomUser.objects.count(), 3)
+        self.assertFalse(
+            CustomUser.objects.filter(username__startswith="Subset").exists()
+        )
+
+
+class MultipleDatabasesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="User")
+
+    def test_get_databases(self):
+        class Anonymizer(BaseAnonymizer):
+            def get_databases(self):
+                return ["default", "tenant"]
+
+        with mock.patch.object(Anonymizer, "anonymize_database") as anonymize_database:
+            Anonymizer().anonymize_databases()
+
+        self.assertEqual(
+            [call.args[0] for call in anonymize_database.call_args_list],
+            ["default", "tenant"],
+        )
+
+    def test_unique_per_database(self):
+        class Anonymizer(BaseAnonymizer):
+            def get_fieldtype_overrides(self):
+                return {
+                    **super().get_fieldtype_overrides(),
+                    # Only enough values for a single database
+                    "CharField.unique": partial(
+                        self.fake.unique.random_element, ("a", "b")
+                    ),
+                }
+
+        Anonymizer().anonymize_databases(["default", "default", "default"])
+
+        self.user.refresh_from_db()
+        self.assertIn(self.user.username, {"a", "b"})
+
+    def test_plan_is_built_once(self):
+        anonymizer = BaseAnonymizer()
+
+        with mock.patch.object(
+            anonymizer, "get_model_plan", wraps=anonymizer.get_model_plan
+        ) as get_model_plan:
+            anonymizer.anonymize_databases(["default", "default"])
+
+        get_model_plan.assert_called_once()
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.username, "User")
+
+
+class ParallelDatabasesTest(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def test_jobs(self):
+        user = CustomUser.objects.create(username="User")
+
+        BaseAnonymizer().anonymize_databases(jobs=2)
+
+        user.refresh_from_db()
+        self.assertNotEqual(user.username, "User")
@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+import threading
+
+from unittest import mock
+
+from django.apps import apps
+from django.test import TestCase
+
+from leukeleu_django_gdpr.autoupdate import Updater, update_gdpr_yml
+from leukeleu_django_gdpr.gdpr import (
+    Serializer,
+    get_gdpr_yml_path,
+    get_pii_stats,
+    read_data,
+)
+
+
+def save_models(models):
+    serializer = Serializer()
+    serializer.models = models
+    with get_gdpr_yml_path().open("w") as f:
+        serializer.save(f)
+
+
+class UpdateGdprYmlTest(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        settings = self.settings(DJANGO_GDPR_YML_DIR=tmp_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_create(self):
+        updated = update_gdpr_yml()
+
+        self.assertIn("custom_users.CustomUser", updated)
+        self.assertIn("custom_users.CustomUser", read_data()["models"])
+
+    def test_unchanged(self):
+        get_pii_stats(save=True)
+        path = get_gdpr_yml_path()
+        mtime = path.stat().st_mtime_ns
+
+        self.assertEqual(update_gdpr_yml(), [])
+        self.assertEqual(path.stat().st_mtime_ns, mtime)
+
+    def test_changed_models(self):
+        get_pii_stats(save=True)
+        models = read_data()["models"]
+        user_fields = models["custom_users.CustomUser"]["fields"]
+        user_fields["first_name"]["pii"] = True
+        # A field that was added to the model, and one that was removed
+        del user_fields["email"]
+        user_fields["removed"] = dict(user_fields["last_name"])
+        # Unchanged models are left alone
+        models["auth.Group"]["fields"]["name"]["pii"] = False
+        models["auth.Group"]["name"] = "Custom Name"
+        group = models["auth.Group"]
+        # A model that no longer exists
+        models["removed.Model"] = {"name": "Model", "fields": {}}
+        save_models(models)
+
+        updated = update_gdpr_yml()
+
+        self.assertEqual(sorted(updated), ["custom_users.CustomUser", "removed.Model"])
+        models = read_data()["models"]
+        user_fields = models["custom_users.CustomUser"]["fields"]
+        self.assertIn("email", user_fields)
+        self.assertNotIn("removed", user_fields)
+        self.assertTrue(user_fields["first_name"]["pii"])
+        self.assertIsNone(user_fields["email"]["pii"])
+        self.assertEqual(models["auth.Group"], group)
+        self.assertNotIn("removed.Model", models)
+
+
+class UpdaterTest(TestCase):
+    def test_debounce(self):
+        done = threading.Event()
+        with mock.patch(
+            "leukeleu_django_gdpr.autoupdate.update_gdpr_yml",
+            side_effect=lambda: done.set() or [],
+        ) as update_gdpr_yml:
+            updater = Updater(delay=0.05)
+            for _i in range(3):
+                updater.schedule()
+
+            self.assertTrue(done.wait(5))
+            updater.timer.join()
+
+        update_gdpr_yml.assert_called_once_with()
+
+    def test_flush(self):
+        with mock.patch(
+            "leukeleu_django_gdpr.autoupdate.update_gdpr_yml", return_value=[]
+        ) as update_gdpr_yml:
+            updater = Updater(delay=60)
+            updater.exit()
+            update_gdpr_yml.assert_not_called()
+
+            updater.schedule(flush_at_exit=True)
+            updater.exit()
+            update_gdpr_yml.assert_called_once_with()
+
+            # Nothing is pending anymore
+            updater.flush()
+            update_gdpr_yml.assert_called_once_with()
+
+
+class ConnectTest(TestCase):
+    def test_debug(self):
+        app_config = apps.get_app_config("leukeleu_django_gdpr")
+
+        with mock.patch("leukeleu_django_gdpr.autoupdate.connect") as connect:
+            with self.settings(DEBUG=True, DJANGO_GDPR_AUTOUPDATE=True):
+                app_config.ready()
+            connect.assert_called_once_with()
+
+            # E.g. migrate in a deployed environment doesn't rewrite gdpr.yml
+            with self.settings(DEBUG=False, DJANGO_GDPR_AUTOUPDATE=True):
+                app_config.ready()
+            connect.assert_called_once_with()
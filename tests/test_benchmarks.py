@@ -0,0 +1,23 @@
+from django.apps import apps
+from django.test import SimpleTestCase
+
+from benchmarks.gdpr_yml import create_apps, run_benchmark
+
+
+class GdprYmlBenchmarkTest(SimpleTestCase):
+    def test_create_apps(self):
+        registry = create_apps(2, 3, 4)
+
+        self.assertEqual(len(registry.get_models()), 6)
+        model = registry.get_model("bench_app_1", "Model2")
+        self.assertEqual(len(model._meta.get_fields()), 6)  # id, 4 fields, previous
+        # The project's app registry is left alone
+        self.assertFalse(apps.is_installed("bench_app_1"))
+
+    def test_run_benchmark(self):
+        durations = run_benchmark(2, 5, 5, 10, repeat=1)
+
+        self.assertEqual(
+            list(durations),
+            ["load", "introspect", "merge", "save", "pattern matching", "check"],
+        )
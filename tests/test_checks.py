@@ -1,3 +1,6 @@
+import subprocess  # noqa: S404
+import sys
+
 from unittest.mock import patch
 
 from django.test import TestCase
@@ -18,3 +21,19 @@ class TestCheckPiiFields(TestCase):
     def test_all_classified(self, mock_get_pii_stats):
         mock_get_pii_stats.return_value = {None: 0, True: 1, False: 1}
         self.assertEqual(checks.check_pii_stats(None), [])
+
+    def test_startup_imports(self):
+        # Registering the checks doesn't import the YAML and Faker libraries
+        output = subprocess.run(  # noqa: S603
+            [
+                sys.executable,
+                "-c",
+                "import sys, django; django.setup(); "
+                "import leukeleu_django_gdpr.anonymize; "
+                "print('yaml' in sys.modules, 'faker' in sys.modules)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(output.stdout.strip(), "False False")
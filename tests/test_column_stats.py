@@ -0,0 +1,125 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase
+
+from leukeleu_django_gdpr.anonymize import BaseAnonymizer
+from leukeleu_django_gdpr.column_stats import (
+    ColumnStatistics,
+    get_column_statistics,
+    statistics_generator,
+)
+from leukeleu_django_gdpr.throttle import Throttle
+from tests.custom_users.models import CustomUser
+
+
+class ColumnStatisticsTest(TestCase):
+    def setUp(self):
+        for i, (bsn, date_of_birth) in enumerate(
+            [
+                ("123456789", date(1980, 1, 1)),
+                ("1234", date(1990, 6, 15)),
+                ("1234", date(2000, 12, 31)),
+                ("", None),
+            ]
+        ):
+            CustomUser.objects.create(
+                username=f"User {i}", bsn=bsn, date_of_birth=date_of_birth
+            )
+
+    def test_get_column_statistics(self):
+        fields = CustomUser._meta
+
+        self.assertEqual(
+            get_column_statistics(CustomUser.objects.all(), fields.get_field("bsn")),
+            ColumnStatistics(4, 0.0, 3, "", "123456789", {4: 2, 9: 1}),
+        )
+        self.assertEqual(
+            get_column_statistics(
+                CustomUser.objects.all(), fields.get_field("date_of_birth")
+            ),
+            ColumnStatistics(4, 0.25, 3, date(1980, 1, 1), date(2000, 12, 31), None),
+        )
+
+    def test_statistics_generator(self):
+        field = CustomUser._meta.get_field("date_of_birth")
+        statistics = ColumnStatistics(
+            100, 0.0, 2, date(1980, 1, 1), date(2000, 12, 31), None
+        )
+
+        generate = statistics_generator(field, statistics)
+
+        values = {generate() for _i in range(100)}
+        # There are (at most) as many distinct values as in the column
+        self.assertLessEqual(len(values), 2)
+        for value in values:
+            self.assertTrue(date(1980, 1, 1) <= value <= date(2000, 12, 31))
+
+    def test_no_values(self):
+        field = CustomUser._meta.get_field("date_of_birth")
+        statistics = ColumnStatistics(0, 0.0, 0, None, None, None)
+
+        self.assertIsNone(statistics_generator(field, statistics))
+
+    def test_anonymize(self):
+        class Anonymizer(BaseAnonymizer):
+            preserve_statistics = True
+
+        models = {
+            "custom_users.CustomUser": {
+                "fields": {"bsn": {"pii": True}, "date_of_birth": {"pii": True}}
+            }
+        }
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            Anonymizer().anonymize()
+
+        users = CustomUser.objects.order_by("pk")
+        self.assertNotIn("123456789", [user.bsn for user in users])
+        # Lengths come from the lengths of the column, empty values are kept
+        self.assertEqual(users[3].bsn, "")
+        for user in users[:3]:
+            self.assertIn(len(user.bsn), {4, 9})
+        self.assertIsNone(users[3].date_of_birth)
+        for user in users[:3]:
+            self.assertTrue(
+                date(1980, 1, 1) <= user.date_of_birth <= date(2000, 12, 31)
+            )
+
+    @mock.patch("leukeleu_django_gdpr.throttle.time.sleep")
+    def test_anonymize_online(self, sleep):
+        class Anonymizer(BaseAnonymizer):
+            preserve_statistics = True
+
+        CustomUser.objects.all().delete()
+        dates = [date(1980 + year, 1, 1) for year in range(7)]
+        for i in range(49):
+            CustomUser.objects.create(
+                username=f"User {i}", bsn="1234", date_of_birth=dates[i % 7]
+            )
+
+        models = {
+            "custom_users.CustomUser": {
+                "fields": {"bsn": {"pii": True}, "date_of_birth": {"pii": True}}
+            }
+        }
+        with (
+            mock.patch(
+                "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+                return_value=models,
+            ),
+            mock.patch(
+                "leukeleu_django_gdpr.anonymize.get_column_statistics",
+                wraps=get_column_statistics,
+            ) as column_statistics,
+        ):
+            Anonymizer().anonymize_online(Throttle(batch_size=5))
+
+        # The statistics are computed once per field, not for every batch
+        self.assertEqual(column_statistics.call_count, 2)
+        values = CustomUser.objects.values_list("date_of_birth", flat=True)
+        self.assertLessEqual(len(set(values)), 7)
+        for value in values:
+            self.assertTrue(date(1980, 1, 1) <= value <= date(1986, 1, 1))
@@ -25,6 +25,8 @@ class SerializerTest(TestCase):
             {
                 "auth.Group",
                 "auth.Permission",
+                "custom_users.Article",
+                "custom_users.Comment",
                 "custom_users.CustomUser",
                 "custom_users.ExclusiveUser",
                 "custom_users.SpecialUser",
@@ -41,6 +43,8 @@ class SerializerTest(TestCase):
             {
                 "auth.Group",
                 "auth.Permission",
+                "custom_users.Article",
+                "custom_users.Comment",
                 "custom_users.CustomUser",
                 "custom_users.ExclusiveUser",
                 "custom_users.SpecialUser",
@@ -55,6 +59,8 @@ class SerializerTest(TestCase):
             {
                 "auth.Group",
                 "auth.Permission",
+                "custom_users.Article",
+                "custom_users.Comment",
                 "custom_users.ExclusiveUser",
                 "custom_users.SpecialUser",
             },
@@ -79,6 +85,8 @@ class SerializerTest(TestCase):
             {
                 "auth.Group",
                 "auth.Permission",
+                "custom_users.Article",
+                "custom_users.Comment",
                 "custom_users.CustomUser",
                 "custom_users.ExclusiveUser",
             },
@@ -97,6 +105,8 @@ class SerializerTest(TestCase):
                 "admin.LogEntry",
                 "auth.Group",
                 "auth.Permission",
+                "custom_users.Article",
+                "custom_users.Comment",
                 "custom_users.CustomUser",
                 "custom_users.ExclusiveUser",
                 "custom_users.SpecialUser",
@@ -153,6 +163,8 @@ class SerializerTest(TestCase):
             {
                 "auth.Group",
                 "auth.Permission",
+                "custom_users.Article",
+                "custom_users.Comment",
                 "custom_users.CustomUser",
                 "custom_users.ExclusiveUser",
                 "custom_users.SpecialUser",
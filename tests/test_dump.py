@@ -0,0 +1,225 @@
+import shutil
+import tempfile
+
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from faker import Faker
+
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+
+from leukeleu_django_gdpr.anonymize import BaseAnonymizer
+from leukeleu_django_gdpr.dump import read_records
+from tests.custom_users.models import CustomUser
+from tests.test_anonymizer import _get_models, patch_get_models
+
+
+def get_users(path):
+    with path.open(encoding="utf-8") as f:
+        return {
+            record["pk"]: record["fields"]
+            for record in read_records(f)
+            if record["model"] == "custom_users.customuser"
+        }
+
+
+class DumpTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.tmp_path = Path(tmp_dir)
+
+        self.group = Group.objects.create(name="Group")
+        self.user = CustomUser.objects.create(
+            username="User",
+            first_name="John",
+            avatar=ContentFile(
+                Faker().image(image_format="png"), name="test_image.png"
+            ),
+        )
+        self.user.groups.add(self.group)
+        self.staffuser = CustomUser.objects.create(username="Staff", is_staff=True)
+
+    def test_dump(self):
+        output = self.tmp_path / "dump.jsonl"
+
+        BaseAnonymizer().dump(output)
+
+        users = get_users(output)
+        self.assertNotEqual(users[self.user.pk]["username"], "User")
+        self.assertNotEqual(users[self.user.pk]["first_name"], "John")
+        self.assertEqual(users[self.user.pk]["groups"], [self.group.pk])
+        # The queryset overrides are used, staff users are left alone
+        self.assertEqual(users[self.staffuser.pk]["username"], "Staff")
+
+        # The database and the files in the storage are left alone
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, "User")
+        self.assertTrue(self.user.avatar.storage.exists(self.user.avatar.name))
+
+        avatar = Path(users[self.user.pk]["avatar"])
+        self.assertNotEqual(avatar, Path(self.user.avatar.name))
+        self.assertEqual(avatar.parent, Path(self.user.avatar.name).parent)
+
+    def test_strategies(self):
+        output = self.tmp_path / "dump.jsonl"
+        models = _get_models()
+        models["custom_users.CustomUser"].update(
+            {"strategy": "delete_where", "where": {"is_staff": True}}
+        )
+        models["auth.Group"] = {"strategy": "truncate", "fields": {}}
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            BaseAnonymizer().dump(output)
+
+        self.assertEqual(list(get_users(output)), [self.user.pk])
+        with output.open(encoding="utf-8") as f:
+            self.assertNotIn(
+                "auth.group", {record["model"] for record in read_records(f)}
+            )
+
+    def test_strategies_on_delete(self):
+        output = self.tmp_path / "dump.jsonl"
+        models = _get_models()
+        models["custom_users.CustomUser"].update(
+            {"strategy": "delete_where", "where": {"is_staff": True}}
+        )
+        models["auth.Group"] = {"strategy": "truncate", "fields": {}}
+        models["contenttypes.ContentType"] = {
+            "strategy": "delete_where",
+            "where": {"app_label": "auth", "model": "group"},
+            "fields": {},
+        }
+        group_type = ContentType.objects.get_for_model(Group)
+        user_entry = LogEntry.objects.create(
+            user=self.user, content_type=group_type, action_flag=ADDITION
+        )
+        staff_entry = LogEntry.objects.create(user=self.staffuser, action_flag=ADDITION)
+        permission = Permission.objects.filter(content_type=group_type).first()
+        self.user.user_permissions.add(
+            permission, Permission.objects.exclude(content_type=group_type).first()
+        )
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            BaseAnonymizer().dump(output)
+
+        with output.open(encoding="utf-8") as f:
+            records = list(read_records(f))
+        entries = {
+            record["pk"]: record["fields"]
+            for record in records
+            if record["model"] == "admin.logentry"
+        }
+        # Rows that refer to deleted rows are deleted (CASCADE) or updated
+        # (SET_NULL) like they are in the database
+        self.assertEqual(list(entries), [user_entry.pk])
+        self.assertIsNone(entries[user_entry.pk]["content_type"])
+        self.assertNotIn(staff_entry.pk, entries)
+        self.assertNotIn(
+            permission.pk,
+            {
+                record["pk"]
+                for record in records
+                if record["model"] == "auth.permission"
+            },
+        )
+        # Deleted rows are left out of many-to-many relations
+        user = get_users(output)[self.user.pk]
+        self.assertEqual(user["groups"], [])
+        self.assertEqual(len(user["user_permissions"]), 1)
+        self.assertNotIn(permission.pk, user["user_permissions"])
+
+    def test_dump_file_truncate(self):
+        models = _get_models()
+        models["auth.Group"] = {"strategy": "truncate", "fields": {}}
+
+        with (
+            mock.patch(
+                "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+                return_value=models,
+            ),
+            self.assertRaisesMessage(ImproperlyConfigured, "other models refer to it"),
+        ):
+            BaseAnonymizer().dump_file(StringIO(), StringIO())
+
+    def test_dump_file(self):
+        source = self.tmp_path / "source.jsonl"
+        output = self.tmp_path / "dump.jsonl"
+        call_command("dumpdata", "custom_users", format="jsonl", output=source)
+
+        with (
+            source.open(encoding="utf-8") as input_stream,
+            output.open("w", encoding="utf-8") as output_stream,
+        ):
+            BaseAnonymizer().dump_file(input_stream, output_stream)
+
+        users = get_users(output)
+        self.assertNotEqual(users[self.user.pk]["username"], "User")
+        self.assertEqual(users[self.user.pk]["groups"], [self.group.pk])
+        # Without a database there are no queryset overrides
+        self.assertNotEqual(users[self.staffuser.pk]["username"], "Staff")
+        # All other data is copied as is
+        self.assertEqual(
+            users[self.user.pk]["date_joined"],
+            get_users(source)[self.user.pk]["date_joined"],
+        )
+
+    def test_command(self):
+        output = self.tmp_path / "dump.jsonl"
+
+        # The database is left alone, so DEBUG mode is not required
+        with (
+            self.settings(DEBUG=False),
+            mock.patch(
+                "leukeleu_django_gdpr.management.commands.anonymize.get_pii_stats",
+                return_value={None: 0},
+            ),
+        ):
+            call_command("anonymize", output=output, stdout=StringIO())
+
+        users = get_users(output)
+        self.assertNotEqual(users[self.user.pk]["username"], "User")
+
+    def test_command_requires_output(self):
+        with self.assertRaisesMessage(CommandError, "requires --output"):
+            call_command("anonymize", input="dump.jsonl")
+
+
+class ParallelDumpTest(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def test_dump_jobs(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        user = CustomUser.objects.create(username="User")
+
+        BaseAnonymizer().dump(tmp_dir, jobs=2)
+
+        users = get_users(Path(tmp_dir) / "custom_users.customuser.jsonl")
+        self.assertNotEqual(users[user.pk]["username"], "User")
+        self.assertTrue((Path(tmp_dir) / "auth.group.jsonl").exists())
@@ -0,0 +1,137 @@
+import random
+
+from functools import partial
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from leukeleu_django_gdpr.anonymize import BaseAnonymizer
+from leukeleu_django_gdpr.explain import estimate_domain_size, estimate_row_count
+from tests.custom_users.models import CustomUser
+from tests.test_anonymizer import _get_models, patch_get_models
+
+
+class ExplainTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        CustomUser.objects.bulk_create(
+            CustomUser(username=f"User {i}", first_name="John") for i in range(20)
+        )
+
+    def test_estimate_row_count(self):
+        self.assertEqual(estimate_row_count(CustomUser, "default"), 20)
+
+    def test_estimate_domain_size(self):
+        self.assertIsNone(estimate_domain_size(list(range(100))))
+        values = [random.randint(1, 10) for _i in range(1000)]
+        self.assertAlmostEqual(estimate_domain_size(values), 10, delta=3)
+
+    def test_explain(self):
+        class Anonymizer(BaseAnonymizer):
+            extra_field_overrides = {
+                # A unique field with only two distinct values
+                "custom_users.CustomUser.username": lambda: random.choice("ab"),
+            }
+
+        with self.assertNumQueries(1):
+            [estimate] = Anonymizer().explain()
+
+        self.assertEqual(estimate.model_name, "custom_users.CustomUser")
+        self.assertEqual(estimate.strategy, "anonymize")
+        self.assertEqual(estimate.rows, 20)
+        self.assertGreater(estimate.seconds, 0)
+        self.assertEqual(len(estimate.warnings), 2)
+        self.assertIn("username is unique", estimate.warnings[0])
+        self.assertIn(
+            "avatar is anonymized with anonymize_image_field", estimate.warnings[1]
+        )
+
+        # No data was changed
+        self.assertTrue(CustomUser.objects.filter(username="User 0").exists())
+
+    def test_default_overrides(self):
+        models = {
+            "custom_users.CustomUser": {
+                "fields": {
+                    field_name: {"pii": True}
+                    for field_name in [
+                        "username",
+                        "email",
+                        "date_of_birth",
+                        "is_pregnant",
+                        "preferences",
+                    ]
+                }
+            }
+        }
+        anonymizer = BaseAnonymizer()
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            [estimate] = anonymizer.explain(sample_size=100)
+
+        self.assertGreater(estimate.seconds, 0)
+        self.assertEqual(estimate.warnings, [])
+        # Sampling didn't use up the unique values of the run
+        self.assertEqual(anonymizer.fake.unique._seen, {})  # noqa: SLF001
+
+    def test_unique_runs_out(self):
+        anonymizer = BaseAnonymizer()
+        anonymizer.extra_field_overrides = {
+            "custom_users.CustomUser.username": partial(
+                anonymizer.fake.unique.random_element, ("a", "b")
+            ),
+        }
+
+        [estimate] = anonymizer.explain()
+
+        self.assertIn(
+            "username is unique, but its generator only returns about 2 distinct"
+            " values for 20 rows.",
+            estimate.warnings,
+        )
+
+    def test_strategies(self):
+        models = _get_models()
+        models["custom_users.CustomUser"]["strategy"] = "truncate"
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            [estimate] = BaseAnonymizer().explain()
+
+        self.assertEqual(estimate.strategy, "truncate")
+        self.assertEqual(estimate.rows, 20)
+        self.assertIsNone(estimate.seconds)
+
+    def test_command(self):
+        stdout = StringIO()
+
+        # No data is changed, so DEBUG mode is not required
+        with (
+            self.settings(DEBUG=False),
+            mock.patch(
+                "leukeleu_django_gdpr.management.commands.anonymize.get_pii_stats",
+                return_value={None: 0},
+            ),
+        ):
+            call_command("anonymize", explain=True, stdout=stdout)
+
+        self.assertIn(
+            "custom_users.CustomUser: anonymize, 20 rows, ~", stdout.getvalue()
+        )
+
+    def test_command_output(self):
+        with self.assertRaisesMessage(CommandError, "--explain can't be combined"):
+            call_command("anonymize", explain=True, output="dump.jsonl")
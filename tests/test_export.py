@@ -0,0 +1,168 @@
+import csv
+import json
+
+from io import StringIO
+from unittest import mock
+
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.core.management import call_command
+from django.test import TestCase
+
+from leukeleu_django_gdpr.export import iter_subject_data
+from leukeleu_django_gdpr.relations import iter_related_rows
+from tests.custom_users.models import Article, Comment, CustomUser, SpecialUser
+
+
+def _get_models():
+    return {
+        "admin.LogEntry": {
+            "fields": {
+                "object_repr": {"pii": True},
+                "action_flag": {"pii": False},
+            },
+        },
+        "custom_users.CustomUser": {
+            "fields": {
+                "username": {"pii": True},
+                "email": {"pii": True},
+                "is_staff": {"pii": False},
+            },
+        },
+        "custom_users.SpecialUser": {
+            "fields": {
+                "speciality": {"pii": True},
+            },
+        },
+    }
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.user = SpecialUser.objects.create(
+            username="jan", email="jan@example.nl", speciality="Dentist"
+        )
+        self.other_user = CustomUser.objects.create(username="piet")
+        for user in [self.user, self.other_user]:
+            for i in range(3):
+                LogEntry.objects.create(
+                    user=user,
+                    object_repr=f"{user.username} {i}",
+                    action_flag=ADDITION,
+                )
+
+    def test_iter_related_rows(self):
+        rows = {
+            model._meta.label: sorted(batch)
+            for model, batch in iter_related_rows(CustomUser, [self.user.pk])
+        }
+
+        self.assertEqual(
+            rows,
+            {
+                "custom_users.CustomUser": [(self.user.pk,)],
+                "custom_users.SpecialUser": [(self.user.pk,)],
+                "admin.LogEntry": [
+                    (entry.pk,)
+                    for entry in LogEntry.objects.filter(user=self.user).order_by("pk")
+                ],
+            },
+        )
+
+    def test_rows_of_other_subjects(self):
+        article = Article.objects.create(author=self.user, title="Teeth")
+        comment = Comment.objects.create(article=article, author=self.user, text="1")
+        # A comment of another user on the article of the subject
+        Comment.objects.create(article=article, author=self.other_user, text="2")
+        other_article = Article.objects.create(author=self.other_user, title="Piet")
+        other_comment = Comment.objects.create(
+            article=other_article, author=self.user, text="3"
+        )
+
+        rows = {
+            model._meta.label: sorted(batch)
+            for model, batch in iter_related_rows(CustomUser, [str(self.user.pk)])
+            if model in {Article, Comment}
+        }
+
+        self.assertEqual(
+            rows,
+            {
+                "custom_users.Article": [(article.pk,)],
+                "custom_users.Comment": [(comment.pk,), (other_comment.pk,)],
+            },
+        )
+
+    def test_queries_do_not_depend_on_rows(self):
+        # One query for the subject and one for each relation that refers to it
+        with self.assertNumQueries(6):
+            list(iter_subject_data([self.user.pk], models=_get_models()))
+
+        for i in range(10):
+            LogEntry.objects.create(
+                user=self.user, object_repr=str(i), action_flag=ADDITION
+            )
+
+        with self.assertNumQueries(6):
+            list(iter_subject_data([self.user.pk], models=_get_models()))
+
+    def test_iter_subject_data(self):
+        records = list(iter_subject_data([self.user.pk], models=_get_models()))
+
+        self.assertIn(
+            {
+                "model": "custom_users.CustomUser",
+                "pk": self.user.pk,
+                "fields": {"username": "jan", "email": "jan@example.nl"},
+            },
+            records,
+        )
+        self.assertIn(
+            {
+                "model": "custom_users.SpecialUser",
+                "pk": self.user.pk,
+                "fields": {"speciality": "Dentist"},
+            },
+            records,
+        )
+        self.assertEqual(
+            sorted(
+                record["fields"]["object_repr"]
+                for record in records
+                if record["model"] == "admin.LogEntry"
+            ),
+            ["jan 0", "jan 1", "jan 2"],
+        )
+        self.assertEqual(len(records), 5)
+
+    def test_batch_size(self):
+        records = list(
+            iter_subject_data([self.user.pk], models=_get_models(), batch_size=2)
+        )
+
+        self.assertEqual(len(records), 5)
+
+    def test_command_json(self):
+        stdout = StringIO()
+        with self.settings(DJANGO_GDPR_YML_DIR="/nonexistent"):
+            call_command("gdpr_export", str(self.user.pk), stdout=stdout)
+
+        # Without gdpr.yml there is no PII
+        self.assertEqual(json.loads(stdout.getvalue()), [])
+
+    def test_command_csv(self):
+        stdout = StringIO()
+        with mock.patch(
+            "leukeleu_django_gdpr.export.read_data",
+            return_value={"models": _get_models()},
+        ):
+            call_command(
+                "gdpr_export", str(self.other_user.pk), format="csv", stdout=stdout
+            )
+
+        rows = list(csv.reader(StringIO(stdout.getvalue())))
+        self.assertEqual(rows[0], ["model", "pk", "field", "value"])
+        self.assertIn(
+            ["custom_users.CustomUser", str(self.other_user.pk), "username", "piet"],
+            rows,
+        )
+        self.assertEqual(len(rows), 1 + 2 + 3)
@@ -0,0 +1,37 @@
+import threading
+
+from unittest import TestCase
+
+from leukeleu_django_gdpr.fake import ThreadLocalFaker
+
+
+class ThreadLocalFakerTest(TestCase):
+    def test_faker_per_thread(self):
+        fake = ThreadLocalFaker(["nl-NL"])
+        # Methods can be looked up in one thread and called in another
+        unique_pystr = fake.unique.pystr
+        fakers = []
+
+        def run():
+            unique_pystr()
+            fakers.append(fake.get_faker())
+
+        threads = [threading.Thread(target=run) for _i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIsNot(fakers[0], fakers[1])
+        self.assertIsNot(fakers[0], fake.get_faker())
+        self.assertEqual(fake.locales, ["nl_NL"])
+
+    def test_unique_clear(self):
+        fake = ThreadLocalFaker(["nl-NL"])
+        values = ("a", "b")
+
+        self.assertEqual(
+            {fake.unique.random_element(values) for _i in range(2)}, {"a", "b"}
+        )
+        fake.unique.clear()
+        self.assertIn(fake.unique.random_element(values), values)
@@ -0,0 +1,97 @@
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from leukeleu_django_gdpr.anonymize import BaseAnonymizer
+from leukeleu_django_gdpr.indexes import deferred_indexes, get_deferrable_indexes
+from tests.custom_users.models import CustomUser
+from tests.test_anonymizer import _get_models, patch_get_models
+
+
+class DeferredIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def test_anonymize(self):
+        user = CustomUser.objects.create(username="User")
+
+        BaseAnonymizer().anonymize(defer_indexes=True)
+
+        user.refresh_from_db()
+        self.assertNotEqual(user.username, "User")
+
+    def test_models_without_columns(self):
+        models = {
+            **_get_models(),
+            "auth.Group": {"fields": {"name": {"pii": False}}},
+        }
+
+        with (
+            mock.patch(
+                "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+                return_value=models,
+            ),
+            mock.patch(
+                "leukeleu_django_gdpr.anonymize.deferred_indexes",
+                wraps=deferred_indexes,
+            ) as defer,
+        ):
+            BaseAnonymizer().anonymize(defer_indexes=True)
+
+        # Only the tables with columns to anonymize are altered
+        self.assertEqual(
+            [call.args[0] for call in defer.call_args_list],
+            [CustomUser],
+        )
+
+    @skipUnless(connection.vendor != "postgresql", "Requires another database")
+    def test_other_databases(self):
+        with (
+            self.assertNumQueries(0),
+            deferred_indexes(CustomUser, ["first_name"], "default"),
+        ):
+            pass
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_postgresql(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE INDEX first_name_idx ON custom_users_customuser (first_name)"
+            )
+
+        indexes = get_deferrable_indexes(CustomUser, ["first_name"], "default")
+        # Indexes that enforce a constraint are left alone
+        self.assertEqual([name for name, _definition in indexes], ["first_name_idx"])
+
+        with deferred_indexes(CustomUser, ["first_name"], "default"):
+            self.assertEqual(
+                get_deferrable_indexes(CustomUser, ["first_name"], "default"), []
+            )
+
+        self.assertEqual(
+            get_deferrable_indexes(CustomUser, ["first_name"], "default"), indexes
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_postgresql_failure(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE INDEX first_name_idx ON custom_users_customuser (first_name)"
+            )
+
+        indexes = get_deferrable_indexes(CustomUser, ["first_name"], "default")
+
+        with (
+            self.assertRaises(ValueError),
+            deferred_indexes(CustomUser, ["first_name"], "default"),
+        ):
+            raise ValueError
+
+        self.assertEqual(
+            get_deferrable_indexes(CustomUser, ["first_name"], "default"), indexes
+        )
@@ -0,0 +1,125 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from leukeleu_django_gdpr.json_paths import (
+    can_update_json_paths_in_db,
+    mask_json,
+    parse_paths,
+    update_json_paths_in_db,
+)
+from leukeleu_django_gdpr.mask import DIGIT_PATTERN, MASK_PATTERN
+from tests.custom_users.models import CustomUser
+
+
+def get_shape(value):
+    """Replace the letters and digits in a JSON value by their character class."""
+    if isinstance(value, dict):
+        return {key: get_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [get_shape(item) for item in value]
+    if isinstance(value, str):
+        return MASK_PATTERN.sub(lambda match: match.lastgroup[0] * len(match[0]), value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return DIGIT_PATTERN.sub(lambda match: "d" * len(match[0]), str(value))
+    return value
+
+
+class MaskJsonTest(SimpleTestCase):
+    def setUp(self):
+        self.document = {
+            "name": "Jan",
+            "age": 42,
+            "active": True,
+            "contact": {"email": "jan@example.nl", "phone": None},
+            "addresses": [
+                {"street": "Dorpsstraat", "number": 12},
+                {"street": "Kerkstraat", "number": 3},
+            ],
+        }
+
+    def test_no_paths(self):
+        self.assertEqual(mask_json(self.document, []), self.document)
+
+    def test_nested_key(self):
+        masked = mask_json(self.document, parse_paths(["contact.email"]))
+
+        self.assertNotEqual(masked["contact"]["email"], "jan@example.nl")
+        self.assertEqual(len(masked["contact"]["email"]), len("jan@example.nl"))
+        self.assertIsNone(masked["contact"]["phone"])
+        self.assertEqual(masked["name"], "Jan")
+        self.assertEqual(masked["addresses"], self.document["addresses"])
+
+    def test_wildcard(self):
+        masked = mask_json(self.document, parse_paths(["addresses.*.street"]))
+
+        self.assertNotEqual(masked["addresses"][0]["street"], "Dorpsstraat")
+        self.assertNotEqual(masked["addresses"][1]["street"], "Kerkstraat")
+        self.assertEqual(masked["addresses"][0]["number"], 12)
+
+    def test_index(self):
+        masked = mask_json(self.document, parse_paths(["addresses.1"]))
+
+        self.assertEqual(masked["addresses"][0], self.document["addresses"][0])
+        self.assertNotEqual(masked["addresses"][1], self.document["addresses"][1])
+        self.assertEqual(masked["addresses"][1].keys(), {"street", "number"})
+
+    def test_whole_object(self):
+        masked = mask_json(self.document, parse_paths(["contact", "age", "active"]))
+
+        self.assertNotEqual(masked["contact"]["email"], "jan@example.nl")
+        self.assertIsInstance(masked["age"], int)
+        self.assertTrue(masked["active"])
+
+    def test_missing_path(self):
+        self.assertEqual(
+            mask_json(self.document, parse_paths(["name.first", "unknown.key"])),
+            self.document,
+        )
+
+    @skipUnless(connection.vendor != "postgresql", "Requires another database")
+    def test_can_update_json_paths_in_db(self):
+        self.assertFalse(can_update_json_paths_in_db(["contact.email"], "default"))
+
+
+@skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+class UpdateJsonPathsInDbTest(TestCase):
+    def test_can_update_json_paths_in_db(self):
+        self.assertTrue(can_update_json_paths_in_db(["contact.email"], "default"))
+        self.assertFalse(can_update_json_paths_in_db(["tags.*"], "default"))
+        # The values of fields with a domain are replaced by their pseudonyms
+        self.assertFalse(
+            can_update_json_paths_in_db(["contact.email"], "default", "email")
+        )
+
+    def test_update_json_paths_in_db(self):
+        document = {
+            "name": "Jan",
+            "age": 7,
+            "active": True,
+            "contact": {"email": "Jan.Jansen@example.nl", "phone": "+31 6 1234"},
+            "tags": ["Één", "b2", None],
+        }
+        paths = ["age", "active", "contact", "tags", "unknown.key"]
+        user = CustomUser.objects.create(username="User", preferences=document)
+        other_user = CustomUser.objects.create(
+            username="Other", preferences={"name": "Piet"}
+        )
+
+        update_json_paths_in_db(
+            CustomUser.objects.all(),
+            CustomUser._meta.get_field("preferences"),
+            paths,
+        )
+
+        user.refresh_from_db()
+        other_user.refresh_from_db()
+        # Masked like mask_json: recursively and per character class
+        self.assertEqual(
+            get_shape(user.preferences),
+            get_shape(mask_json(document, parse_paths(paths))),
+        )
+        self.assertNotEqual(user.preferences["contact"], document["contact"])
+        self.assertEqual(user.preferences["name"], "Jan")
+        self.assertEqual(other_user.preferences, {"name": "Piet"})
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+
+from datetime import timedelta
+from itertools import count
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+
+from leukeleu_django_gdpr.anonymize import BaseAnonymizer
+from leukeleu_django_gdpr.pools import ValuePool, build_value_pool, get_value_pool
+from tests.custom_users.models import CustomUser
+from tests.test_anonymizer import patch_get_models
+
+
+class ValuePoolTest(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.path = Path(tmp_dir) / "pools" / "names.pool"
+
+    def test_build(self):
+        names = iter(["Jan", "", "Ærø"])
+
+        build_value_pool(self.path, lambda: next(names), 3)
+
+        pool = ValuePool(self.path)
+        self.assertEqual(len(pool), 3)
+        self.assertEqual(list(pool), ["Jan", "", "Ærø"])
+        self.assertIn(pool.sample(), ["Jan", "", "Ærø"])
+
+    def test_only_strings(self):
+        with self.assertRaises(TypeError):
+            build_value_pool(self.path, lambda: 1, 3)
+
+        self.assertEqual(list(self.path.parent.iterdir()), [])
+
+    def test_get(self):
+        numbers = count()
+
+        def generate():
+            return str(next(numbers))
+
+        self.assertEqual(list(get_value_pool(self.path, generate, 2)), ["0", "1"])
+        # The pool is reused
+        self.assertEqual(list(get_value_pool(self.path, generate, 2)), ["0", "1"])
+        # Unless its size changes
+        self.assertEqual(list(get_value_pool(self.path, generate, 1)), ["2"])
+
+        # Or it's too old
+        os.utime(self.path, (0, 0))
+        pool = get_value_pool(self.path, generate, 1, max_age=timedelta(days=1))
+        self.assertEqual(list(pool), ["3"])
+
+
+class PooledOverridesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.tmp_dir = tmp_dir
+
+    def test_anonymize(self):
+        class Anonymizer(BaseAnonymizer):
+            value_pools = ["custom_users.CustomUser.first_name"]
+            value_pool_dir = self.tmp_dir
+            value_pool_size = 10
+
+        user = CustomUser.objects.create(username="User", first_name="John")
+
+        Anonymizer().anonymize()
+
+        user.refresh_from_db()
+        pool = ValuePool(
+            Path(self.tmp_dir) / "custom_users.CustomUser.first_name.nl_NL.pool"
+        )
+        self.assertIn(user.first_name, list(pool))
+
+    def test_not_poolable(self):
+        for key in ["CharField.unique", "ImageField"]:
+
+            class Anonymizer(BaseAnonymizer):
+                value_pools = [key]
+                value_pool_dir = self.tmp_dir
+
+            with self.subTest(key), self.assertRaises(ImproperlyConfigured):
+                _overrides = Anonymizer().overrides
@@ -0,0 +1,100 @@
+import json
+import pstats
+import shutil
+import tempfile
+
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from leukeleu_django_gdpr.anonymize import BaseAnonymizer
+from leukeleu_django_gdpr.profiling import Profiler
+from leukeleu_django_gdpr.relations import anonymizes_column
+from tests.custom_users.models import CustomUser
+from tests.test_anonymizer import patch_get_models
+
+
+class ProfilerTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.tmp_path = Path(tmp_dir)
+
+    def test_time_function(self):
+        @anonymizes_column(lambda values: [value.upper() for value in values])
+        def upper(obj, field):
+            return obj.upper()
+
+        profiler = Profiler(self.tmp_path)
+        timed_upper = profiler.time_function("app.Model.field", upper)
+
+        self.assertEqual(timed_upper("a", None), "A")
+        self.assertEqual(timed_upper.column_function(["a", "b"]), ["A", "B"])
+        self.assertEqual(profiler.field_calls["app.Model.field"], 2)
+        self.assertGreater(profiler.field_durations["app.Model.field"], 0)
+
+    def test_anonymize(self):
+        CustomUser.objects.create(username="User", first_name="John")
+        profiler = Profiler(self.tmp_path)
+
+        BaseAnonymizer().anonymize(profiler=profiler)
+
+        stats = pstats.Stats(str(self.tmp_path / "custom_users.CustomUser.prof"))
+        self.assertTrue(stats.total_calls)
+
+        summary = profiler.write_summary()
+        self.assertIn("Slowest fields (top 20):", summary)
+        self.assertTrue(
+            any("custom_users.CustomUser.username" in line for line in summary)
+        )
+        self.assertEqual(
+            (self.tmp_path / "summary.txt").read_text(encoding="utf-8"),
+            "\n".join(summary) + "\n",
+        )
+
+    def test_anonymize_command(self):
+        CustomUser.objects.create(username="User")
+        stdout = StringIO()
+
+        with (
+            self.settings(DEBUG=True),
+            mock.patch(
+                "leukeleu_django_gdpr.management.commands.anonymize.get_pii_stats",
+                return_value={None: 0},
+            ),
+        ):
+            call_command("anonymize", profile=self.tmp_path, stdout=stdout)
+
+        self.assertIn("custom_users.CustomUser.username", stdout.getvalue())
+        self.assertTrue((self.tmp_path / "summary.txt").exists())
+
+    def test_anonymize_command_jobs(self):
+        with self.assertRaisesMessage(CommandError, "--profile can't be combined"):
+            call_command("anonymize", profile=self.tmp_path, jobs=2)
+
+    def test_gdpr_command(self):
+        stdout = StringIO()
+
+        with self.settings(DJANGO_GDPR_YML_DIR=self.tmp_path):
+            call_command(
+                "gdpr",
+                "--format=json",
+                "--dry-run",
+                f"--profile={self.tmp_path}",
+                stdout=stdout,
+                stderr=StringIO(),
+            )
+
+        # The summary doesn't end up in the JSON output
+        json.loads(stdout.getvalue())
+        self.assertTrue((self.tmp_path / "gdpr.prof").exists())
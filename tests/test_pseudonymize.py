@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+
+from pathlib import Path
+
+from django.test import SimpleTestCase as TestCase
+
+from leukeleu_django_gdpr.pseudonymize import PseudonymCache
+
+
+class PseudonymCacheTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.counter = 0
+
+    def generate(self):
+        self.counter += 1
+        return f"fake-{self.counter}"
+
+    def test_same_value_same_domain(self):
+        with PseudonymCache() as cache:
+            self.assertEqual(
+                cache.get("email", "a@example.nl", self.generate), "fake-1"
+            )
+            self.assertEqual(
+                cache.get("email", "b@example.nl", self.generate), "fake-2"
+            )
+            self.assertEqual(
+                cache.get("email", "a@example.nl", self.generate), "fake-1"
+            )
+
+    def test_same_value_other_domain(self):
+        with PseudonymCache() as cache:
+            self.assertEqual(cache.get("email", "John", self.generate), "fake-1")
+            self.assertEqual(cache.get("name", "John", self.generate), "fake-2")
+
+    def test_originals_are_not_stored(self):
+        with PseudonymCache() as cache:
+            cache.get("email", "a@example.nl", self.generate)
+            self.assertNotIn("a@example.nl", repr(cache.values))
+
+    def test_evicted_without_spill(self):
+        with PseudonymCache(maxsize=1) as cache:
+            cache.get("name", "John", self.generate)
+            cache.get("name", "Jane", self.generate)
+            self.assertEqual(len(cache.values), 1)
+            # The mapping for John was evicted, a new value is generated
+            self.assertEqual(cache.get("name", "John", self.generate), "fake-3")
+
+    def test_evicted_with_spill(self):
+        with PseudonymCache(maxsize=1, spill_path=Path(self.tmp_dir) / "db") as cache:
+            cache.get("name", "John", self.generate)
+            cache.get("name", "Jane", self.generate)
+            self.assertEqual(len(cache.values), 1)
+            # The mapping for John is read back from the spill database
+            self.assertEqual(cache.get("name", "John", self.generate), "fake-1")
+
+    def test_spill_is_reused(self):
+        spill_path = Path(self.tmp_dir) / "db"
+        with PseudonymCache(spill_path=spill_path) as cache:
+            cache.get("name", "John", self.generate)
+
+        with PseudonymCache(spill_path=spill_path) as cache:
+            self.assertEqual(cache.get("name", "John", self.generate), "fake-1")
@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.models import Group
+from django.test import SimpleTestCase as TestCase
+
+from leukeleu_django_gdpr.relations import (
+    can_truncate,
+    get_model_dependencies,
+    get_related_lookups,
+    sort_models,
+    uses_related,
+)
+from tests.custom_users.models import CustomUser, SpecialUser
+
+
+class SortModelsTest(TestCase):
+    def test_get_model_dependencies(self):
+        self.assertEqual(get_model_dependencies(SpecialUser), {CustomUser})
+        self.assertEqual(get_model_dependencies(CustomUser), set())
+
+    def test_dependencies_first(self):
+        self.assertEqual(
+            sort_models(
+                [
+                    "custom_users.SpecialUser",
+                    "custom_users.CustomUser",
+                    "auth.Group",
+                ]
+            ),
+            [
+                "custom_users.CustomUser",
+                "auth.Group",
+                "custom_users.SpecialUser",
+            ],
+        )
+
+    def test_unlisted_dependencies_are_ignored(self):
+        self.assertEqual(
+            sort_models(["custom_users.SpecialUser", "auth.Group"]),
+            ["custom_users.SpecialUser", "auth.Group"],
+        )
+
+    def test_cycle(self):
+        cycle = {
+            CustomUser: {Group},
+            Group: {CustomUser},
+            SpecialUser: {CustomUser},
+        }
+        with mock.patch(
+            "leukeleu_django_gdpr.relations.get_model_dependencies",
+            side_effect=cycle.get,
+        ):
+            self.assertEqual(
+                sort_models(
+                    [
+                        "custom_users.SpecialUser",
+                        "auth.Group",
+                        "custom_users.CustomUser",
+                    ]
+                ),
+                [
+                    "custom_users.CustomUser",
+                    "custom_users.SpecialUser",
+                    "auth.Group",
+                ],
+            )
+
+
+class CanTruncateTest(TestCase):
+    def test_can_truncate(self):
+        self.assertTrue(can_truncate(LogEntry))
+
+    def test_referred_to(self):
+        # LogEntry refers to the user
+        self.assertFalse(can_truncate(CustomUser))
+
+    def test_many_to_many(self):
+        # The users' groups table refers to the group
+        self.assertFalse(can_truncate(Group))
+
+    def test_parents(self):
+        self.assertFalse(can_truncate(SpecialUser))
+
+
+class RelatedLookupsTest(TestCase):
+    def test_uses_related(self):
+        @uses_related("user", "user__groups")
+        def anonymizer(obj, field):
+            pass
+
+        self.assertEqual(anonymizer.related_lookups, ("user", "user__groups"))
+
+    def test_get_related_lookups(self):
+        @uses_related("customuser_ptr", "groups")
+        def anonymizer(obj, field):
+            pass
+
+        @uses_related("customuser_ptr__user_permissions")
+        def other_anonymizer(obj, field):
+            pass
+
+        self.assertEqual(
+            get_related_lookups(
+                apps.get_model("custom_users.SpecialUser"),
+                [anonymizer, other_anonymizer, lambda: None],
+            ),
+            (["customuser_ptr"], ["customuser_ptr__user_permissions", "groups"]),
+        )
+
+    def test_reverse_one_to_one(self):
+        @uses_related("specialuser")
+        def anonymizer(obj, field):
+            pass
+
+        self.assertEqual(
+            get_related_lookups(CustomUser, [anonymizer]), (["specialuser"], [])
+        )
@@ -1,9 +1,19 @@
+import json
 import shutil
 import tempfile
 
+from io import StringIO
+
+from django.core.management import CommandError, call_command
 from django.test import TestCase
 
-from leukeleu_django_gdpr.gdpr import Serializer, get_gdpr_yml_path, read_data
+from leukeleu_django_gdpr.gdpr import (
+    Serializer,
+    get_gdpr_yml_path,
+    get_pii_report,
+    get_pii_stats,
+    read_data,
+)
 
 
 class TestSerializerDataRoundTrip(TestCase):
@@ -19,3 +29,88 @@ class TestSerializerDataRoundTrip(TestCase):
                 serializer.save(f)
 
             self.assertEqual(serializer.models, read_data().get("models"))
+
+    def test_manual_input_is_kept(self):
+        with self.settings(DJANGO_GDPR_YML_DIR=self.tmp_dir):
+            get_pii_stats(save=True)
+
+            data = read_data()
+            data["models"]["custom_users.CustomUser"]["fields"]["email"].update(
+                {"pii": True, "explanation": "Contact", "domain": "email"}
+            )
+            serializer = Serializer()
+            serializer.models = data["models"]
+            with open(get_gdpr_yml_path(), "w") as f:  # noqa: PLW1514
+                serializer.save(f)
+
+            get_pii_stats(save=True)
+
+            self.assertEqual(
+                read_data()["models"]["custom_users.CustomUser"]["fields"]["email"],
+                {
+                    "name": "Email Address",
+                    "description": "Email address",
+                    "help_text": "",
+                    "required": False,
+                    "pii": True,
+                    "explanation": "Contact",
+                    "domain": "email",
+                },
+            )
+
+    def test_model_manual_input_is_kept(self):
+        with self.settings(DJANGO_GDPR_YML_DIR=self.tmp_dir):
+            get_pii_stats(save=True)
+
+            data = read_data()
+            data["models"]["custom_users.CustomUser"].update(
+                {"strategy": "delete_where", "where": {"is_active": False}}
+            )
+            serializer = Serializer()
+            serializer.models = data["models"]
+            with open(get_gdpr_yml_path(), "w") as f:  # noqa: PLW1514
+                serializer.save(f)
+
+            get_pii_stats(save=True)
+
+            model = read_data()["models"]["custom_users.CustomUser"]
+            self.assertEqual(list(model), ["name", "strategy", "where", "fields"])
+            self.assertEqual(model["strategy"], "delete_where")
+            self.assertEqual(model["where"], {"is_active": False})
+
+
+class PiiReportTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_report(self):
+        with self.settings(DJANGO_GDPR_YML_DIR=self.tmp_dir):
+            report = get_pii_report(save=True)
+
+        stats = get_pii_stats()
+        self.assertEqual(
+            report["pii"],
+            {"true": stats[True], "false": stats[False], "null": stats[None]},
+        )
+        self.assertEqual(
+            report["apps"]["custom_users"]["models"]["custom_users.CustomUser"],
+            {"true": 0, "false": 0, "null": 11},
+        )
+        self.assertEqual(len(report["unclassified"]), stats[None])
+        self.assertIn("custom_users.CustomUser.email", report["unclassified"])
+        self.assertEqual(
+            list(report["timings"]), ["load", "introspect", "merge", "save"]
+        )
+
+    def test_command_json(self):
+        stdout = StringIO()
+        with (
+            self.settings(DJANGO_GDPR_YML_DIR=self.tmp_dir),
+            self.assertRaises(CommandError),
+        ):
+            call_command("gdpr", "--format=json", "--dry-run", "--check", stdout=stdout)
+
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report["pii"]["null"], len(report["unclassified"]))
+        self.assertNotIn("save", report["timings"])
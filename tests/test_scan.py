@@ -0,0 +1,144 @@
+import shutil
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from leukeleu_django_gdpr.gdpr import get_pii_stats, read_data
+from leukeleu_django_gdpr.scan import (
+    DETECTORS,
+    is_valid_bsn,
+    is_valid_card_number,
+    is_valid_iban,
+    map_bounded,
+    scan,
+    scan_rows,
+)
+from tests.custom_users.models import CustomUser
+
+
+class DetectorsTest(TestCase):
+    def test_checksums(self):
+        self.assertTrue(is_valid_iban("NL91ABNA0417164300"))
+        self.assertTrue(is_valid_iban("NL91 ABNA 0417 1643 00"))
+        self.assertFalse(is_valid_iban("NL92ABNA0417164300"))
+        self.assertTrue(is_valid_bsn("111222333"))
+        self.assertFalse(is_valid_bsn("111222334"))
+        self.assertFalse(is_valid_bsn("000000000"))
+        self.assertTrue(is_valid_card_number("4111 1111 1111 1111"))
+        self.assertFalse(is_valid_card_number("4111 1111 1111 1112"))
+
+    def test_detectors(self):
+        self.assertTrue(DETECTORS["email"]("Mail jan@example.nl for info"))
+        self.assertFalse(DETECTORS["email"]("jan at example dot nl"))
+        self.assertTrue(DETECTORS["phone"]("Bel 06-12345678"))
+        self.assertTrue(DETECTORS["phone"]("+31 20 123 4567"))
+        self.assertFalse(DETECTORS["phone"]("12345"))
+        self.assertTrue(DETECTORS["iban"]("IBAN: NL91ABNA0417164300"))
+        self.assertFalse(DETECTORS["iban"]("IBAN: NL92ABNA0417164300"))
+        self.assertTrue(DETECTORS["bsn"]("111222333"))
+        self.assertFalse(DETECTORS["bsn"]("111222334"))
+        self.assertTrue(DETECTORS["card"]("4111-1111-1111-1111"))
+
+    def test_map_bounded(self):
+        read = []
+
+        def items():
+            for i in range(10):
+                read.append(i)
+                yield i
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = map_bounded(executor, str, items(), 3)
+            self.assertEqual(next(results), "0")
+            # Only the items that are needed to keep 3 results pending are read
+            self.assertEqual(read, [0, 1, 2, 3])
+            self.assertEqual(list(results), [str(i) for i in range(1, 10)])
+
+    def test_scan_rows(self):
+        counters = scan_rows(
+            [
+                ("jan@example.nl", "111222333", None),
+                ("piet@example.nl", "", 42),
+                ("Piet", "111222333", 43),
+            ]
+        )
+
+        self.assertEqual(counters[0], {"rows": 3, "email": 2})
+        self.assertEqual(counters[1], {"rows": 2, "bsn": 2})
+        self.assertEqual(counters[2], {"rows": 2})
+
+
+class ScanTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        settings = self.settings(DJANGO_GDPR_YML_DIR=self.tmp_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        get_pii_stats(save=True)
+
+        for i in range(10):
+            CustomUser.objects.create(
+                username=f"user{i}",
+                email=f"user{i}@example.nl",
+                bsn="111222333" if i % 2 else None,
+            )
+
+    def test_scan(self):
+        results = {
+            field_label: (pii, counter)
+            for field_label, pii, counter in scan(read_data()["models"])
+        }
+
+        self.assertEqual(
+            results["custom_users.CustomUser.email"], (None, {"rows": 10, "email": 10})
+        )
+        self.assertEqual(
+            results["custom_users.CustomUser.bsn"], (None, {"rows": 5, "bsn": 5})
+        )
+        self.assertEqual(
+            results["custom_users.CustomUser.username"], (None, {"rows": 10})
+        )
+
+    def test_scan_limit(self):
+        results = {
+            field_label: counter
+            for field_label, _pii, counter in scan(read_data()["models"], limit=4)
+        }
+
+        self.assertEqual(results["custom_users.CustomUser.email"]["rows"], 4)
+
+    def test_scan_sample_rate(self):
+        results = {
+            field_label: counter
+            for field_label, _pii, counter in scan(read_data()["models"], sample_rate=0)
+        }
+
+        self.assertEqual(results["custom_users.CustomUser.email"]["rows"], 0)
+
+    def test_scan_jobs(self):
+        results = {
+            field_label: counter
+            for field_label, _pii, counter in scan(
+                read_data()["models"], jobs=2, chunk_size=3
+            )
+        }
+
+        self.assertEqual(
+            results["custom_users.CustomUser.email"], {"rows": 10, "email": 10}
+        )
+
+    def test_command(self):
+        stdout = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("gdpr", "scan", "--check", stdout=stdout)
+
+        output = stdout.getvalue()
+        self.assertIn("custom_users.CustomUser.bsn", output)
+        self.assertIn("bsn 100.0%", output)
+        self.assertIn("Fields with unclassified PII    2", output)
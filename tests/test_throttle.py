@@ -0,0 +1,144 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import OperationalError
+from django.test import TestCase
+
+from leukeleu_django_gdpr.anonymize import BaseAnonymizer
+from leukeleu_django_gdpr.throttle import Throttle
+from tests.custom_users.models import CustomUser
+from tests.test_anonymizer import _get_models, patch_get_models
+
+
+@mock.patch("leukeleu_django_gdpr.throttle.time.sleep")
+class ThrottleTest(TestCase):
+    def test_retry(self, sleep):
+        function = mock.Mock(side_effect=[OperationalError, OperationalError, None])
+
+        Throttle(pause=1.0).run_batch(function, 1, "default")
+
+        self.assertEqual(function.call_count, 3)
+        self.assertEqual(sleep.call_args_list, [mock.call(1.0), mock.call(2.0)])
+
+    def test_max_retries(self, sleep):
+        function = mock.Mock(side_effect=OperationalError)
+
+        with self.assertRaises(OperationalError):
+            Throttle(max_retries=2).run_batch(function, 1, "default")
+
+        self.assertEqual(function.call_count, 3)
+
+    def test_rows_per_second(self, sleep):
+        throttle = Throttle(rows_per_second=100)
+
+        throttle.wait(100, 0.25, "default")
+        sleep.assert_called_once_with(0.75)
+
+        # Batches that take longer than their share don't pause
+        sleep.reset_mock()
+        throttle.wait(100, 2.0, "default")
+        sleep.assert_not_called()
+
+    def test_max_latency(self, sleep):
+        throttle = Throttle(max_latency=1.0, pause=1.0, max_pause=3.0)
+
+        for _i in range(3):
+            throttle.wait(1, 2.0, "default")
+        self.assertEqual(
+            sleep.call_args_list, [mock.call(1.0), mock.call(2.0), mock.call(3.0)]
+        )
+
+        # The backoff is reset once the latency is back to normal
+        sleep.reset_mock()
+        throttle.wait(1, 0.5, "default")
+        throttle.wait(1, 2.0, "default")
+        sleep.assert_called_once_with(1.0)
+
+    def test_max_replication_lag(self, sleep):
+        throttle = Throttle(max_replication_lag=5.0)
+
+        with mock.patch(
+            "leukeleu_django_gdpr.throttle.get_replication_lag", return_value=10.0
+        ):
+            throttle.wait(1, 0.0, "default")
+        sleep.assert_called_once_with(1.0)
+
+
+@mock.patch("leukeleu_django_gdpr.throttle.time.sleep")
+class AnonymizeOnlineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        self.users = [
+            CustomUser.objects.create(username=f"User {i}", first_name="John")
+            for i in range(5)
+        ]
+        self.staffuser = CustomUser.objects.create(username="Staff", is_staff=True)
+
+    def test_anonymize_online(self, sleep):
+        throttle = Throttle(rows_per_second=1000, batch_size=2)
+
+        with mock.patch.object(
+            throttle, "run_batch", wraps=throttle.run_batch
+        ) as run_batch:
+            BaseAnonymizer().anonymize_online(throttle)
+
+        # The 5 users (the staff user is excluded) are anonymized in 3 batches
+        user_batches = [
+            call.args[1]
+            for call in run_batch.call_args_list
+            if call.args[0].args[1].model is CustomUser
+        ]
+        self.assertEqual(user_batches, [2, 2, 1])
+        for i, user in enumerate(self.users):
+            user.refresh_from_db()
+            self.assertNotEqual(user.username, f"User {i}")
+            self.assertNotEqual(user.first_name, "John")
+        self.staffuser.refresh_from_db()
+        self.assertEqual(self.staffuser.username, "Staff")
+
+    def test_delete_where(self, sleep):
+        models = _get_models()
+        models["custom_users.CustomUser"].update(
+            {"strategy": "delete_where", "where": {"is_staff": True}}
+        )
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            BaseAnonymizer().anonymize_online(Throttle(batch_size=2))
+
+        self.assertFalse(CustomUser.objects.filter(pk=self.staffuser.pk).exists())
+        self.assertEqual(CustomUser.objects.count(), 5)
+
+    def test_command(self, sleep):
+        with (
+            self.settings(DEBUG=True),
+            mock.patch(
+                "leukeleu_django_gdpr.management.commands.anonymize.get_pii_stats",
+                return_value={None: 0},
+            ),
+        ):
+            call_command(
+                "anonymize",
+                online=True,
+                batch_size=2,
+                rows_per_second=100,
+                stdout=StringIO(),
+            )
+
+        self.users[0].refresh_from_db()
+        self.assertNotEqual(self.users[0].username, "User 0")
+
+    def test_command_options(self, sleep):
+        with self.assertRaisesMessage(CommandError, "--online can't be combined"):
+            call_command("anonymize", online=True, incremental=True)
+        with self.assertRaisesMessage(CommandError, "--online can't be combined"):
+            call_command("anonymize", online=True, jobs=2)
@@ -0,0 +1,179 @@
+import shutil
+import tempfile
+
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from leukeleu_django_gdpr.anonymize import BaseAnonymizer
+from leukeleu_django_gdpr.gdpr import Serializer, get_gdpr_yml_path
+from leukeleu_django_gdpr.verify import Leak, ValueSet
+from tests.custom_users.models import CustomUser
+from tests.test_anonymizer import patch_get_models
+
+
+def keep_value(obj, field):
+    return getattr(obj, field.attname)
+
+
+def swap_date(obj, field):
+    # Every row gets the original value of the other row
+    return {date(2020, 1, 1): date(2020, 1, 2), date(2020, 1, 2): date(2020, 1, 1)}[
+        getattr(obj, field.attname)
+    ]
+
+
+class LeakyAnonymizer(BaseAnonymizer):
+    extra_field_overrides = {"custom_users.CustomUser.first_name": keep_value}
+
+
+class SwappingAnonymizer(BaseAnonymizer):
+    extra_field_overrides = {"custom_users.CustomUser.date_of_birth": swap_date}
+
+
+class ValueSetTest(TestCase):
+    def test_value_set(self):
+        value_set = ValueSet()
+        value_set.chunk_size = 300
+        for i in range(1000):
+            value_set.add(f"value {i}")
+
+        self.assertTrue(all(f"value {i}" in value_set for i in range(1000)))
+        self.assertFalse(any(f"other {i}" in value_set for i in range(10_000)))
+        self.assertEqual(len(value_set.chunks), 4)
+
+
+class VerifyTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        patch_get_models.start()
+        cls.addClassCleanup(patch_get_models.stop)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(username="User", first_name="John")
+        self.staffuser = CustomUser.objects.create(username="Staff", is_staff=True)
+
+    def test_verify(self):
+        anonymizer = BaseAnonymizer()
+        fingerprints = anonymizer.fingerprint()
+
+        anonymizer.anonymize()
+
+        # Only the staff user, which is excluded by the queryset override, still
+        # has its original username
+        self.assertEqual(
+            anonymizer.verify(fingerprints),
+            [Leak("custom_users.CustomUser", "username", 0, [], 1)],
+        )
+
+    def test_leak(self):
+        anonymizer = LeakyAnonymizer()
+        fingerprints = anonymizer.fingerprint()
+
+        anonymizer.anonymize()
+
+        self.assertIn(
+            Leak("custom_users.CustomUser", "first_name", 1, [self.user.pk], 0),
+            anonymizer.verify(fingerprints),
+        )
+
+    def test_values_of_other_rows(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            date_of_birth=date(2020, 1, 1)
+        )
+        CustomUser.objects.create(username="Other", date_of_birth=date(2020, 1, 2))
+        models = {
+            "custom_users.CustomUser": {"fields": {"date_of_birth": {"pii": True}}}
+        }
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            anonymizer = SwappingAnonymizer()
+            fingerprints = anonymizer.fingerprint()
+            anonymizer.anonymize()
+
+            # Both rows have the original value of the other row, not their own
+            self.assertEqual(anonymizer.verify(fingerprints), [])
+
+    def test_pii_paths(self):
+        self.user.preferences = {"contact": {"email": "john@example.com"}}
+        self.user.save()
+        # Documents without the paths, and values without letters or digits,
+        # are left as-is by design
+        self.staffuser.preferences = {"theme": "dark", "contact": {"email": "-"}}
+        self.staffuser.save()
+        models = {
+            "custom_users.CustomUser": {
+                "fields": {"preferences": {"pii": True, "pii_paths": ["contact.email"]}}
+            }
+        }
+
+        with mock.patch(
+            "leukeleu_django_gdpr.anonymize.get_models_from_gdpr_yml",
+            return_value=models,
+        ):
+            anonymizer = BaseAnonymizer()
+            fingerprints = anonymizer.fingerprint()
+            anonymizer.anonymize()
+
+            self.assertEqual(anonymizer.verify(fingerprints), [])
+
+    def test_command(self):
+        stdout = StringIO()
+
+        with (
+            self.settings(
+                DEBUG=True,
+                DJANGO_GDPR_ANONYMIZER_CLASS="tests.test_verify.LeakyAnonymizer",
+            ),
+            mock.patch(
+                "leukeleu_django_gdpr.management.commands.anonymize.get_pii_stats",
+                return_value={None: 0},
+            ),
+            self.assertRaisesMessage(CommandError, "Original values were found"),
+        ):
+            call_command("anonymize", verify=True, stdout=stdout)
+
+        self.assertIn(
+            "custom_users.CustomUser.first_name: 1 rows still contain an original"
+            f" value, e.g. pk {self.user.pk}.",
+            stdout.getvalue(),
+        )
+
+
+class GeneratedGdprYmlTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+        CustomUser.objects.create(username="User", first_name="John")
+
+    def test_command(self):
+        stdout = StringIO()
+
+        with (
+            self.settings(DEBUG=True, DJANGO_GDPR_YML_DIR=self.tmp_dir),
+            mock.patch(
+                "leukeleu_django_gdpr.management.commands.anonymize.get_pii_stats",
+                return_value={None: 0},
+            ),
+        ):
+            # Most models in a generated gdpr.yml have no fields to anonymize
+            serializer = Serializer()
+            serializer.generate_models_list()
+            fields = serializer.models["custom_users.CustomUser"]["fields"]
+            fields["first_name"]["pii"] = True
+            with get_gdpr_yml_path().open("w", encoding="utf-8") as f:
+                serializer.save(f)
+
+            call_command("anonymize", verify=True, stdout=stdout)
+
+        self.assertNotIn("original value", stdout.getvalue())
+        self.assertNotEqual(CustomUser.objects.get().first_name, "John")